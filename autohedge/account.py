@@ -0,0 +1,213 @@
+"""
+Cached account state (balances and positions) for a broker adapter.
+
+`AccountCache.snapshot` returns an immutable `AccountSnapshot`, refreshed
+from the broker at most once per ``ttl`` seconds; concurrent callers
+during a refresh share the one in-flight request. Our own activity keeps
+it current without extra round trips: `apply_fill` patches the cached
+position and cash in place of a refresh, and `invalidate` (e.g. on an
+order ack whose fill price is unknown) makes the next read refresh.
+A refresh that fills were patched in during is not trusted to include
+them: the patched snapshot is kept and the next read refreshes again.
+
+Snapshots are never mutated - patches produce a new version - so every
+per-ticker check in a cycle that holds one snapshot sees the same state.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from autohedge.tools.broker import (
+    Balances,
+    BrokerAdapter,
+    Position,
+    run_blocking,
+)
+
+
+class AccountSnapshot(BaseModel):
+    balances: Balances = Field(default_factory=Balances)
+    positions: Dict[str, Position] = Field(default_factory=dict)
+    version: int = 0
+    fetched_at: float = Field(default_factory=time.time)
+
+    def quantity(self, symbol: str) -> float:
+        position = self.positions.get(symbol)
+        return position.quantity if position else 0.0
+
+    def market_value(self, symbol: str) -> float:
+        position = self.positions.get(symbol)
+        return position.market_value if position else 0.0
+
+    def describe(self, symbol: str) -> str:
+        """One-line account context for agent prompts."""
+        position = self.positions.get(symbol)
+        held = (
+            f"{position.quantity:g} shares of {symbol} (avg"
+            f" ${position.average_price:,.2f}, value"
+            f" ${position.market_value:,.2f})"
+            if position
+            else f"no {symbol} position"
+        )
+        return (
+            f"Current account: {held}; equity"
+            f" ${self.balances.equity:,.2f}, buying power"
+            f" ${self.balances.buying_power:,.2f}."
+        )
+
+
+class AccountCache:
+    """
+    Args:
+        broker: Adapter balances and positions are fetched from.
+        ttl: Seconds a fetched snapshot is served before refreshing.
+    """
+
+    def __init__(self, broker: BrokerAdapter, ttl: float = 5.0):
+        self.broker = broker
+        self.ttl = ttl
+        self._snapshot: Optional[AccountSnapshot] = None
+        self._expires = 0.0
+        self._refresh: Optional[asyncio.Future] = None
+        # Bumped by every apply_fill, so a refresh can tell whether
+        # fills landed while it was in flight
+        self._fill_seq = 0
+        self.stats = {
+            "hits": 0,
+            "refreshes": 0,
+            "joined": 0,
+            "patches": 0,
+            "stale_refreshes": 0,
+        }
+
+    @property
+    def current(self) -> Optional[AccountSnapshot]:
+        """Last snapshot, fresh or not, without touching the broker."""
+        return self._snapshot
+
+    async def snapshot(
+        self, max_age: Optional[float] = None
+    ) -> AccountSnapshot:
+        """
+        Cached snapshot if younger than `max_age` (default: the TTL),
+        otherwise one shared refresh.
+        """
+        fresh_until = (
+            self._expires
+            if max_age is None
+            else self._expires - self.ttl + max_age
+        )
+        if (
+            self._snapshot is not None
+            and time.monotonic() < fresh_until
+        ):
+            self.stats["hits"] += 1
+            return self._snapshot
+        if self._refresh is not None and not self._refresh.done():
+            self.stats["joined"] += 1
+            return await asyncio.shield(self._refresh)
+        self._refresh = asyncio.ensure_future(self._fetch())
+        return await asyncio.shield(self._refresh)
+
+    async def _fetch(self) -> AccountSnapshot:
+        self.stats["refreshes"] += 1
+        fill_seq = self._fill_seq
+        balances, positions = await asyncio.gather(
+            self.broker.get_balances(), self.broker.get_positions()
+        )
+        if self._fill_seq != fill_seq and self._snapshot is not None:
+            # The broker's answer may predate those fills
+            self._expires = 0.0
+            self.stats["stale_refreshes"] += 1
+            return self._snapshot
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        self._snapshot = AccountSnapshot(
+            balances=balances,
+            positions={p.symbol: p for p in positions if p.quantity},
+            version=version,
+        )
+        self._expires = (
+            time.monotonic() + self.ttl
+            if self._fill_seq == fill_seq
+            else 0.0
+        )
+        logger.debug(
+            f"Refreshed {self.broker.name} account snapshot"
+            f" v{version} ({len(self._snapshot.positions)} positions)"
+        )
+        return self._snapshot
+
+    def snapshot_blocking(self) -> AccountSnapshot:
+        """
+        `snapshot` from synchronous code. Runs on the shared broker loop
+        (see `run_blocking`), so callers on any thread share one refresh
+        and the adapter's session stays open for the order router.
+        """
+        if (
+            self._snapshot is not None
+            and time.monotonic() < self._expires
+        ):
+            self.stats["hits"] += 1
+            return self._snapshot
+        return run_blocking(self.snapshot())
+
+    def invalidate(self) -> None:
+        """Refresh on the next read."""
+        self._expires = 0.0
+
+    def apply_fill(
+        self, symbol: str, side: str, quantity: float, price: float
+    ) -> Optional[AccountSnapshot]:
+        """
+        Patch the cached snapshot with one of our fills; the TTL is not
+        extended. Returns the new snapshot (None if nothing is cached).
+        """
+        self._fill_seq += 1
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        signed = quantity if side.upper() == "BUY" else -quantity
+        held = snapshot.positions.get(symbol)
+        old_quantity = held.quantity if held else 0.0
+        average = held.average_price if held else 0.0
+        new_quantity = old_quantity + signed
+
+        positions = dict(snapshot.positions)
+        if new_quantity == 0:
+            positions.pop(symbol, None)
+        else:
+            if old_quantity == 0 or (old_quantity > 0) != (
+                new_quantity > 0
+            ):
+                average = price
+            elif abs(new_quantity) > abs(old_quantity):
+                average = (
+                    old_quantity * average + signed * price
+                ) / new_quantity
+            positions[symbol] = Position(
+                symbol=symbol,
+                quantity=new_quantity,
+                average_price=average,
+                market_value=new_quantity * price,
+            )
+        balances = snapshot.balances.model_copy(
+            update={
+                "cash": snapshot.balances.cash - signed * price,
+                "buying_power": (
+                    snapshot.balances.buying_power - signed * price
+                ),
+            }
+        )
+        self._snapshot = snapshot.model_copy(
+            update={
+                "balances": balances,
+                "positions": positions,
+                "version": snapshot.version + 1,
+            }
+        )
+        self.stats["patches"] += 1
+        return self._snapshot
@@ -3,6 +3,7 @@ from loguru import logger
 from swarms import Agent
 from tickr_agent.main import TickrAgent
 from autohedge.config import settings
+from autohedge.orders import DECISION_FORMAT_PROMPT
 
 DIRECTOR_PROMPT = """
 You are a Trading Director AI, responsible for orchestrating the trading process. 
@@ -21,6 +22,7 @@ For each stock under consideration, please provide the following:
 - Trade parameters, including entry and exit points, position sizing, and risk management guidelines.
 """
 
+
 class TradingDirector:
     """
     Trading Director Agent responsible for generating trading theses and coordinating strategy.
@@ -39,7 +41,8 @@ class TradingDirector:
             model_name=settings.DIRECTOR_MODEL,
             output_type="str",
             max_loops=settings.MAX_LOOPS,
-            verbose=settings.VERBOSE,
+            verbose=settings.AGENT_VERBOSE,
+            print_on=settings.AGENT_PRINT_ON,
             context_length=settings.CONTEXT_LENGTH,
         )
 
@@ -64,7 +67,8 @@ class TradingDirector:
 
         try:
             market_data = self.tickr.run(
-                f"{task} Analyze current market conditions and key metrics for {stock}"
+                f"{task} Analyze current market conditions and key"
+                f" metrics for {stock}"
             )
 
             prompt = f"""
@@ -85,5 +89,6 @@ class TradingDirector:
 
     def make_decision(self, task: str, thesis: str, *args, **kwargs):
         return self.director_agent.run(
-            f"According to the thesis, {thesis}, should we execute this order: {task}"
+            f"According to the thesis, {thesis}, should we execute"
+            f" this order: {task}\n\n{DECISION_FORMAT_PROMPT}"
         )
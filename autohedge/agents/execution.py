@@ -1,6 +1,7 @@
 from typing import Dict
 from swarms import Agent
 from autohedge.config import settings
+from autohedge.orders import ORDER_FORMAT_PROMPT
 
 EXECUTION_PROMPT = """You are a Trade Execution AI. Your primary objective is to execute trades with precision and accuracy. Your key responsibilities include:
 
@@ -20,6 +21,7 @@ To execute trades effectively, provide exact trade execution details in a struct
 By following these guidelines, you will ensure that trades are executed efficiently, minimizing potential losses and maximizing profit opportunities.
 """
 
+
 class ExecutionAgent:
     def __init__(self):
         self.execution_agent = Agent(
@@ -28,7 +30,8 @@ class ExecutionAgent:
             model_name=settings.EXECUTION_MODEL,
             output_type="str",
             max_loops=settings.MAX_LOOPS,
-            verbose=settings.VERBOSE,
+            verbose=settings.AGENT_VERBOSE,
+            print_on=settings.AGENT_PRINT_ON,
             context_length=settings.CONTEXT_LENGTH,
         )
 
@@ -47,6 +50,8 @@ class ExecutionAgent:
         4. Stop loss
         5. Take profit
         6. Time in force
+
+        {ORDER_FORMAT_PROMPT}
         """
         order = self.execution_agent.run(prompt)
         return order
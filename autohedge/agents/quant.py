@@ -18,6 +18,7 @@ In your analysis, include confidence scores for each aspect of your evaluation,
 Your comprehensive analysis will be instrumental in refining the trading strategy, ensuring that it is grounded in empirical evidence and statistical rigor. By working together with the Director Agent, you will contribute to a cohesive and data-driven approach to trading, ultimately enhancing the overall performance of the trading system.
 """
 
+
 class QuantAnalyst:
     """
     Quantitative Analysis Agent responsible for technical and statistical analysis.
@@ -34,7 +35,8 @@ class QuantAnalyst:
             model_name=settings.QUANT_MODEL,
             output_type="str",
             max_loops=settings.MAX_LOOPS,
-            verbose=settings.VERBOSE,
+            verbose=settings.AGENT_VERBOSE,
+            print_on=settings.AGENT_PRINT_ON,
             context_length=settings.CONTEXT_LENGTH,
         )
 
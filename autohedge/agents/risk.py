@@ -36,6 +36,7 @@ Using this information, please provide clear risk metrics and trade size recomme
 Your output should be in a structured format, including all relevant metrics and recommendations.
 """
 
+
 class RiskManager:
     def __init__(self):
         self.risk_agent = Agent(
@@ -44,7 +45,8 @@ class RiskManager:
             model_name=settings.RISK_MODEL,
             output_type="str",
             max_loops=settings.MAX_LOOPS,
-            verbose=settings.VERBOSE,
+            verbose=settings.AGENT_VERBOSE,
+            print_on=settings.AGENT_PRINT_ON,
             context_length=settings.CONTEXT_LENGTH,
         )
 
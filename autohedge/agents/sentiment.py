@@ -1,6 +1,11 @@
+from typing import Optional
 from loguru import logger
 from swarms import Agent
 from autohedge.config import settings
+from autohedge.sentiment_scorer import (
+    LexiconSentimentScorer,
+    format_local_analysis,
+)
 
 SENTIMENT_PROMPT = """
 You are a Financial Sentiment Analysis AI specializing in evaluating market news and social sentiment for stocks and financial instruments.
@@ -46,18 +51,48 @@ Your output should include:
 Your analysis should be data-driven, nuanced, and avoid simplistic conclusions. Recognize that sentiment is just one factor in market dynamics and should be considered alongside technical, fundamental, and macroeconomic factors.
 """
 
+
 class SentimentAgent:
-    def __init__(self):
+    """
+    Sentiment stage. News is first scored by a local lexicon scorer; only
+    ambiguous or high-impact news is escalated to the LLM.
+    """
+
+    def __init__(
+        self, scorer: Optional[LexiconSentimentScorer] = None
+    ):
         logger.info("Initializing Sentiment Agent")
+        if scorer is None and settings.SENTIMENT_FAST_PATH:
+            scorer = LexiconSentimentScorer()
+        self.scorer = scorer
+        self.stats = {"local": 0, "escalated": 0}
         self.sentiment_agent = Agent(
             agent_name="Sentiment-Agent",
             system_prompt=SENTIMENT_PROMPT,
             model_name=settings.SENTIMENT_MODEL,
             output_type="str",
             max_loops=settings.MAX_LOOPS,
-            verbose=settings.VERBOSE,
+            verbose=settings.AGENT_VERBOSE,
+            print_on=settings.AGENT_PRINT_ON,
             context_length=settings.CONTEXT_LENGTH,
         )
-    
-    def analyze(self, news: str) -> str:
-        return self.sentiment_agent.run(news)
+
+    def analyze(self, news: str, fast_path: bool = True) -> str:
+        """
+        `fast_path=False` sends the text straight to the LLM, e.g. for
+        the generic prompt used when there are no real articles to score.
+        """
+        if self.scorer is None or not fast_path:
+            return self.sentiment_agent.run(news)
+
+        local = self.scorer.score(news)
+        if not local.escalate:
+            self.stats["local"] += 1
+            return format_local_analysis(local)
+
+        self.stats["escalated"] += 1
+        logger.info(f"Escalating sentiment to LLM: {local.reason}")
+        return self.sentiment_agent.run(
+            f"{news}\n\nLocal lexicon pre-score: {local.score:.2f} "
+            f"(escalated because of {local.reason})"
+        )
@@ -0,0 +1,292 @@
+"""
+Request coalescing for per-ticker analyses.
+
+Identical requests - same ticker, normalized task, strategy and data
+snapshot version - share one computation. `AnalysisCoalescer.submit`
+returns a `Ticket`: the first caller starts the analysis on the
+coalescer's thread pool, concurrent callers attach to it (receiving the
+stage events already emitted, then live ones), and completed results are
+served from a short-lived cache.
+
+Tickets are refcounted. `Ticket.cancel` detaches one waiter; only when
+the last one is gone is the computation cancelled, which takes effect at
+its next stage boundary (`AnalysisCancelled` is raised from the stage
+callback).
+"""
+
+import concurrent.futures
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from loguru import logger
+
+from autohedge.config import settings
+
+StageCallback = Callable[[str, str, Any], None]
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+class AnalysisCancelled(Exception):
+    """Every waiter left; the analysis stopped at a stage boundary."""
+
+
+def normalize_task(task: str) -> str:
+    return _SPACE_RE.sub(" ", (task or "").strip().lower()).rstrip(
+        ".!?"
+    )
+
+
+class _Flight:
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.future: concurrent.futures.Future = (
+            concurrent.futures.Future()
+        )
+        self.waiters = 0
+        self.cancelled = threading.Event()
+        self.stages: List[Tuple[str, str, Any]] = []
+        self.listeners: List[StageCallback] = []
+
+
+class Ticket:
+    """One caller's claim on a (possibly shared) analysis."""
+
+    def __init__(
+        self,
+        coalescer: "AnalysisCoalescer",
+        flight: Optional[_Flight],
+        on_stage: Optional[StageCallback] = None,
+        cached: Any = None,
+    ):
+        self._coalescer = coalescer
+        self._flight = flight
+        self._on_stage = on_stage
+        self._cached = cached
+        self._released = flight is None
+
+    @property
+    def cached(self) -> bool:
+        return self._flight is None
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for the analysis. Raises TimeoutError, AnalysisCancelled or
+        the analysis' own exception.
+        """
+        if self._flight is None:
+            return self._cached
+        try:
+            return self._flight.future.result(timeout)
+        except concurrent.futures.CancelledError:
+            raise AnalysisCancelled(str(self._flight.key)) from None
+        finally:
+            if self._flight.future.done():
+                self._release()
+
+    def cancel(self) -> None:
+        """Detach; cancels the analysis if no other waiter remains."""
+        if not self._released:
+            self._release()
+            self._coalescer._detach(self._flight)
+
+    def _release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        with self._coalescer._lock:
+            if self._on_stage in self._flight.listeners:
+                self._flight.listeners.remove(self._on_stage)
+
+
+class AnalysisCoalescer:
+    """
+    Args:
+        ttl: Seconds a completed result is served from cache (0 disables).
+        max_entries: Cached results kept (least recent evicted).
+        workers: Analyses computed concurrently.
+        version_fn: ``ticker -> version`` of the data an analysis reads
+            (e.g. a market data or news revision); part of the key.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.COALESCE_CACHE_TTL,
+        max_entries: int = 1024,
+        workers: int = 8,
+        version_fn: Optional[Callable[[str], Hashable]] = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="coalesced-analysis",
+        )
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._cache: "OrderedDict[Hashable, Tuple[float, Any]]" = (
+            OrderedDict()
+        )
+        self.stats = {
+            "computed": 0,
+            "joined": 0,
+            "cache_hits": 0,
+            "cancelled": 0,
+            "failed": 0,
+        }
+
+    def key(
+        self,
+        ticker: str,
+        task: str,
+        strategy: Optional[str] = None,
+        version: Hashable = None,
+    ) -> Tuple:
+        ticker = ticker.strip().upper()
+        data_version = (
+            self.version_fn(ticker) if self.version_fn else None
+        )
+        return (
+            ticker,
+            normalize_task(task),
+            strategy or None,
+            version,
+            data_version,
+        )
+
+    def submit(
+        self,
+        key: Hashable,
+        compute: Callable[[StageCallback], Any],
+        on_stage: Optional[StageCallback] = None,
+    ) -> Ticket:
+        """
+        Attach to the analysis for `key`, starting `compute(stage_callback)`
+        if none is in flight or cached. `compute` must pass every stage
+        through the callback it is given.
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._cache.move_to_end(key)
+                    self.stats["cache_hits"] += 1
+                    return Ticket(self, None, cached=entry[1])
+                del self._cache[key]
+
+            flight = self._flights.get(key)
+            start = flight is None
+            if start:
+                flight = self._flights[key] = _Flight(key)
+                self.stats["computed"] += 1
+            else:
+                self.stats["joined"] += 1
+            flight.waiters += 1
+            replay = list(flight.stages)
+            if on_stage is not None:
+                flight.listeners.append(on_stage)
+
+        if on_stage is not None:
+            for stage in replay:
+                on_stage(*stage)
+        if start:
+            self._executor.submit(self._run, flight, compute)
+        return Ticket(self, flight, on_stage)
+
+    def run(
+        self,
+        key: Hashable,
+        compute: Callable[[StageCallback], Any],
+        on_stage: Optional[StageCallback] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """`submit` and wait; the ticket is released if the wait fails."""
+        ticket = self.submit(key, compute, on_stage)
+        try:
+            return ticket.result(timeout)
+        except BaseException:
+            ticket.cancel()
+            raise
+
+    def _run(self, flight: _Flight, compute: Callable) -> None:
+        def broadcast(stage: str, ticker: str, payload: Any) -> None:
+            if flight.cancelled.is_set():
+                raise AnalysisCancelled(str(flight.key))
+            with self._lock:
+                flight.stages.append((stage, ticker, payload))
+                listeners = list(flight.listeners)
+            for listener in listeners:
+                try:
+                    listener(stage, ticker, payload)
+                except Exception as e:
+                    logger.warning(f"Stage listener failed: {e}")
+
+        try:
+            if flight.cancelled.is_set():
+                raise AnalysisCancelled(str(flight.key))
+            result = compute(broadcast)
+        except AnalysisCancelled:
+            with self._lock:
+                self._forget(flight)
+            flight.future.cancel()
+            return
+        except BaseException as e:
+            with self._lock:
+                self._forget(flight)
+                self.stats["failed"] += 1
+            flight.future.set_exception(e)
+            return
+
+        with self._lock:
+            self._forget(flight)
+            if self.ttl > 0:
+                self._cache[flight.key] = (
+                    time.monotonic() + self.ttl,
+                    result,
+                )
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        flight.future.set_result(result)
+
+    def _forget(self, flight: _Flight) -> None:
+        # A cancelled flight may already have been replaced under its key
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def _detach(self, flight: _Flight) -> None:
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters > 0 or flight.future.done():
+                return
+            # Last waiter gone: stop at the next stage boundary
+            flight.cancelled.set()
+            self._forget(flight)
+            self.stats["cancelled"] += 1
+        logger.info(
+            f"Cancelled analysis {flight.key}: no waiters left"
+        )
+
+    def invalidate(self, ticker: Optional[str] = None) -> None:
+        """Drop cached results, for one ticker or all."""
+        with self._lock:
+            if ticker is None:
+                self._cache.clear()
+                return
+            ticker = ticker.upper()
+            for key in [k for k in self._cache if k[0] == ticker]:
+                del self._cache[key]
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,23 +1,85 @@
 import os
 from pydantic import BaseModel, Field
 
+
 class Settings(BaseModel):
-    OPENAI_API_KEY: str = Field(default_factory=lambda: os.getenv("OPENAI_API_KEY", ""))
-    GROQ_API_KEY: str = Field(default_factory=lambda: os.getenv("GROQ_API_KEY", ""))
-    
+    OPENAI_API_KEY: str = Field(
+        default_factory=lambda: os.getenv("OPENAI_API_KEY", "")
+    )
+    GROQ_API_KEY: str = Field(
+        default_factory=lambda: os.getenv("GROQ_API_KEY", "")
+    )
+
     # Model Configuration
-    DIRECTOR_MODEL: str = os.getenv("DIRECTOR_MODEL", "groq/deepseek-r1-distill-llama-70b")
-    QUANT_MODEL: str = os.getenv("QUANT_MODEL", "groq/deepseek-r1-distill-llama-70b")
-    RISK_MODEL: str = os.getenv("RISK_MODEL", "groq/deepseek-r1-distill-llama-70b")
-    EXECUTION_MODEL: str = os.getenv("EXECUTION_MODEL", "groq/deepseek-r1-distill-llama-70b")
+    DIRECTOR_MODEL: str = os.getenv(
+        "DIRECTOR_MODEL", "groq/deepseek-r1-distill-llama-70b"
+    )
+    QUANT_MODEL: str = os.getenv(
+        "QUANT_MODEL", "groq/deepseek-r1-distill-llama-70b"
+    )
+    RISK_MODEL: str = os.getenv(
+        "RISK_MODEL", "groq/deepseek-r1-distill-llama-70b"
+    )
+    EXECUTION_MODEL: str = os.getenv(
+        "EXECUTION_MODEL", "groq/deepseek-r1-distill-llama-70b"
+    )
     SENTIMENT_MODEL: str = os.getenv("SENTIMENT_MODEL", "gpt-4o-mini")
-    
+
     # Agent Configuration
     MAX_LOOPS: int = int(os.getenv("MAX_LOOPS", "1"))
     CONTEXT_LENGTH: int = int(os.getenv("CONTEXT_LENGTH", "16000"))
     VERBOSE: bool = os.getenv("VERBOSE", "True").lower() == "true"
-    
+    # swarms Agent console output; payloads go to the log pipeline
+    AGENT_VERBOSE: bool = (
+        os.getenv("AGENT_VERBOSE", "False").lower() == "true"
+    )
+    AGENT_PRINT_ON: bool = (
+        os.getenv("AGENT_PRINT_ON", "False").lower() == "true"
+    )
+    SENTIMENT_FAST_PATH: bool = (
+        os.getenv("SENTIMENT_FAST_PATH", "True").lower() == "true"
+    )
+
+    # Logging
+    LOG_FILE: str = os.getenv("LOG_FILE", "logs/autohedge.jsonl")
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_PAYLOAD_SAMPLE_RATE: float = float(
+        os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1")
+    )
+    LOG_PAYLOAD_PREVIEW_CHARS: int = int(
+        os.getenv("LOG_PAYLOAD_PREVIEW_CHARS", "512")
+    )
+
     # Output
     OUTPUT_DIR: str = os.getenv("OUTPUT_DIR", "outputs")
 
+    # Service mode
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "2"))
+    SERVER_QUEUE_SIZE: int = int(
+        os.getenv("SERVER_QUEUE_SIZE", "100")
+    )
+    SERVER_MAX_JOBS: int = int(os.getenv("SERVER_MAX_JOBS", "1000"))
+    COALESCE_CACHE_TTL: float = float(
+        os.getenv("COALESCE_CACHE_TTL", "60")
+    )
+
+    # Cycle deadline in seconds (0 = none) and stages dropped on overrun
+    CYCLE_DEADLINE: float = float(os.getenv("CYCLE_DEADLINE", "0"))
+    SKIPPABLE_STAGES: list = [
+        s.strip()
+        for s in os.getenv(
+            "SKIPPABLE_STAGES", "sentiment,quant"
+        ).split(",")
+        if s.strip()
+    ]
+    # Threads for deadline-bound agent calls, and how many overrun calls
+    # may still hold one before further stages are refused
+    STAGE_WORKERS: int = int(os.getenv("STAGE_WORKERS", "8"))
+    MAX_ABANDONED_STAGES: int = int(
+        os.getenv("MAX_ABANDONED_STAGES", "4")
+    )
+
+
 settings = Settings()
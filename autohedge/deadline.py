@@ -0,0 +1,127 @@
+"""
+Deadline budgets for a trading cycle.
+
+A cycle `Deadline` is split evenly across the tickers still to run, and
+each ticker's share is split across its agent stages by `StageBudgets`
+weights. Time a stage leaves unused rolls forward to the later stages.
+Sentiment runs alongside the thesis, so it shares the thesis window.
+
+Each agent call waits on its future only as long as its budget allows.
+When a stage overruns, the caller stops waiting and the stage's policy
+applies. A skippable stage (sentiment and quant by default) is dropped
+and the pipeline carries on without it. Any other stage marks the ticker
+as timed out. Python threads cannot be killed, so an overrunning agent
+call is abandoned rather than interrupted, and its result is discarded.
+While ``MAX_ABANDONED_STAGES`` abandoned calls still hold a hedge's
+stage threads, further stages are refused as overruns until they return.
+"""
+
+import concurrent.futures
+import time
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from autohedge.config import settings
+
+STAGES = (
+    "thesis",
+    "sentiment",
+    "quant",
+    "risk",
+    "execution",
+    "decision",
+)
+
+
+class StageTimeout(TimeoutError):
+    """A stage overran its budget."""
+
+    def __init__(self, stage: str, budget: float):
+        super().__init__(f"{stage} exceeded its {budget:.2f}s budget")
+        self.stage = stage
+        self.budget = budget
+
+
+class StageBudgets(BaseModel):
+    # Relative share of a ticker's time per sequential stage
+    weights: Dict[str, float] = Field(
+        default_factory=lambda: {
+            "thesis": 0.3,
+            "quant": 0.2,
+            "risk": 0.15,
+            "execution": 0.15,
+            "decision": 0.2,
+        }
+    )
+    # Stages that are dropped on overrun instead of timing the ticker out
+    skippable: List[str] = Field(
+        default_factory=lambda: list(settings.SKIPPABLE_STAGES)
+    )
+
+
+class Deadline:
+    """A point in (monotonic) time work has to finish by."""
+
+    def __init__(self, seconds: float, clock=time.monotonic):
+        self.clock = clock
+        self.at = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.at - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def share(self, parts: int) -> "Deadline":
+        """An even share of the time left, e.g. per remaining ticker."""
+        return Deadline(self.remaining() / max(parts, 1), self.clock)
+
+
+class StageClock:
+    """
+    Hands out per-stage budgets within one ticker's deadline.
+
+    Args:
+        deadline: The ticker's deadline; None means no budgets.
+        budgets: Stage weights and degradation policy.
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[Deadline] = None,
+        budgets: Optional[StageBudgets] = None,
+    ):
+        self.deadline = deadline
+        self.budgets = budgets or StageBudgets()
+        self._pending = dict(self.budgets.weights)
+
+    def budget(self, stage: str) -> Optional[float]:
+        """Seconds `stage` may take; the stage is then counted as started."""
+        if self.deadline is None:
+            return None
+        remaining = self.deadline.remaining()
+        total = sum(self._pending.values())
+        weight = self._pending.pop(stage, 0.0)
+        if total <= 0:
+            return remaining
+        return remaining * weight / total
+
+    def wait(
+        self,
+        stage: str,
+        future: concurrent.futures.Future,
+        budget: Optional[float],
+    ):
+        """The future's result, or StageTimeout once `budget` runs out."""
+        try:
+            return future.result(timeout=budget)
+        except concurrent.futures.TimeoutError:
+            if future.done():
+                raise  # the call itself timed out
+            future.cancel()
+            raise StageTimeout(stage, budget) from None
+
+    def skippable(self, stage: str) -> bool:
+        return stage in self.budgets.skippable
@@ -0,0 +1,548 @@
+"""
+Multi-process worker mode backed by a durable local work queue.
+
+A coordinator enqueues one (cycle_id, ticker, task) job per stock into a
+SQLite database, together with the ticker's news as rendered by the
+coordinator's NewsIngestor (workers never ingest news themselves). Any number of worker processes - spawned by the
+coordinator or started separately with
+``python -m autohedge.distributed worker --queue <path>`` on machines that
+share the file - claim jobs under a time-limited lease, run the per-stock
+pipeline and write the serialized result back. Jobs whose lease expires
+(because the worker crashed or hung) become claimable again until
+``max_attempts`` is reached.
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from loguru import logger
+from pydantic import BaseModel
+
+from autohedge.account import AccountSnapshot
+from autohedge.utils import AutoHedgeOutput
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cycle_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    task TEXT NOT NULL,
+    news TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (cycle_id, ticker)
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, lease_expires);
+CREATE INDEX IF NOT EXISTS jobs_cycle ON jobs (cycle_id, status);
+"""
+
+
+class Job(BaseModel):
+    id: int
+    cycle_id: str
+    ticker: str
+    task: str
+    attempts: int
+    news: Optional[str] = None
+
+
+class WorkQueue:
+    """
+    SQLite-backed job queue with lease/timeout-based retry.
+
+    Every method opens its own short transaction, so one instance may be
+    shared between threads and any number of processes may open the same
+    file. Use ``journal_mode="DELETE"`` when the file lives on a network
+    filesystem, where WAL is not supported.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 600.0,
+        max_attempts: int = 3,
+        journal_mode: str = "WAL",
+    ):
+        self.path = str(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(f"PRAGMA journal_mode={journal_mode}")
+            conn.executescript(SCHEMA)
+            columns = {
+                row["name"]
+                for row in conn.execute("PRAGMA table_info(jobs)")
+            }
+            if "news" not in columns:
+                # Queue files created before jobs carried their news
+                conn.execute("ALTER TABLE jobs ADD COLUMN news TEXT")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(
+            self.path, timeout=30.0, isolation_level=None
+        )
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(
+        self,
+        cycle_id: str,
+        tickers: List[str],
+        task: str,
+        news: Optional[Dict[str, str]] = None,
+    ) -> int:
+        """
+        Add one job per ticker for the cycle, with the ticker's rendered
+        news if `news` has it. Re-enqueueing an existing (cycle_id,
+        ticker) pair is a no-op.
+        """
+        now = time.time()
+        news = news or {}
+        with self._connect() as conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO jobs (cycle_id, ticker, task,"
+                " news, created_at, updated_at) VALUES (?, ?, ?, ?,"
+                " ?, ?)",
+                [
+                    (cycle_id, t, task, news.get(t), now, now)
+                    for t in tickers
+                ],
+            )
+            return cursor.rowcount
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """
+        Lease the oldest runnable job to `worker_id`, or return None.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Jobs that exhausted their attempts while leased are dead
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error ="
+                " COALESCE(error, 'lease expired'), updated_at = ?"
+                " WHERE status = 'leased' AND lease_expires < ? AND"
+                " attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT id, cycle_id, ticker, task, news, attempts"
+                " FROM jobs WHERE status = 'pending' OR (status ="
+                " 'leased' AND lease_expires < ?) ORDER BY id"
+                " LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', "
+                "attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+
+        return Job(
+            id=row["id"],
+            cycle_id=row["cycle_id"],
+            ticker=row["ticker"],
+            task=row["task"],
+            attempts=row["attempts"] + 1,
+            news=row["news"],
+        )
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """
+        Extend the lease on a job. Returns False if the lease was lost.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ?"
+                " WHERE id = ? AND lease_owner = ? AND status ="
+                " 'leased'",
+                (now + self.lease_seconds, now, job_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def complete(
+        self, job_id: int, worker_id: str, result: str
+    ) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error ="
+                " NULL, updated_at = ? WHERE id = ? AND lease_owner ="
+                " ? AND status = 'leased'",
+                (result, time.time(), job_id, worker_id),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> None:
+        """
+        Release a job after an error; it is retried until `max_attempts`.
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ?"
+                " THEN 'failed' ELSE 'pending' END, error = ?,"
+                " lease_owner = NULL, lease_expires = NULL,"
+                " updated_at = ? WHERE id = ? AND lease_owner = ? AND"
+                " status = 'leased'",
+                (
+                    self.max_attempts,
+                    error,
+                    time.time(),
+                    job_id,
+                    worker_id,
+                ),
+            )
+
+    def cycle_status(self, cycle_id: str) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE cycle_id = ?"
+                " GROUP BY status",
+                (cycle_id,),
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    def cycle_finished(self, cycle_id: str) -> bool:
+        status = self.cycle_status(cycle_id)
+        return not status.get("pending") and not status.get("leased")
+
+    def results(self, cycle_id: str) -> Dict[str, AutoHedgeOutput]:
+        """
+        Completed outputs for a cycle keyed by ticker.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ticker, result FROM jobs "
+                "WHERE cycle_id = ? AND status = 'done'",
+                (cycle_id,),
+            ).fetchall()
+        return {
+            row["ticker"]: AutoHedgeOutput.model_validate_json(
+                row["result"]
+            )
+            for row in rows
+        }
+
+    def errors(self, cycle_id: str) -> Dict[str, str]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT ticker, error FROM jobs "
+                "WHERE cycle_id = ? AND status = 'failed'",
+                (cycle_id,),
+            ).fetchall()
+        return {row["ticker"]: row["error"] for row in rows}
+
+
+def run_worker(
+    queue_path: str,
+    worker_id: str = None,
+    hedge_kwargs: Dict = None,
+    poll_interval: float = 1.0,
+    exit_when_done: str = None,
+    lease_seconds: float = 600.0,
+    max_attempts: int = 3,
+    account: Optional[AccountSnapshot] = None,
+    deadline_at: Optional[float] = None,
+    ticker_seconds: Optional[float] = None,
+) -> None:
+    """
+    Claim and process jobs until stopped.
+
+    If `exit_when_done` is a cycle id the worker exits once that cycle has
+    no pending or leased jobs left; otherwise it runs until killed.
+    `account` is the cycle's snapshot for risk context. Each job gets
+    `ticker_seconds`, capped by the cycle's wall-clock `deadline_at`.
+    """
+    from autohedge.deadline import Deadline
+    from autohedge.main import AutoHedge
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(
+        queue_path,
+        lease_seconds=lease_seconds,
+        max_attempts=max_attempts,
+    )
+    hedge = AutoHedge(stocks=[], **(hedge_kwargs or {}))
+    log = logger.bind(worker=worker_id)
+    log.info(f"Worker {worker_id} started on {queue_path}")
+
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            if exit_when_done and queue.cycle_finished(
+                exit_when_done
+            ):
+                log.info(
+                    f"Worker {worker_id} exiting, cycle complete"
+                )
+                return
+            time.sleep(poll_interval)
+            continue
+
+        # Keep the lease alive while the (slow) agent pipeline runs
+        stop = threading.Event()
+
+        def keep_alive(job_id=job.id):
+            while not stop.wait(queue.lease_seconds / 3):
+                if not queue.heartbeat(job_id, worker_id):
+                    return
+
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        try:
+            deadline = None
+            if deadline_at is not None or ticker_seconds is not None:
+                seconds = min(
+                    ticker_seconds or math.inf,
+                    (deadline_at or math.inf) - time.time(),
+                )
+                deadline = Deadline(max(seconds, 0.0))
+            if deadline is not None and deadline.expired:
+                output = hedge.timed_out(job.ticker)
+            else:
+                output = hedge.analyze_stock(
+                    job.ticker, job.task, account, deadline, job.news
+                )
+            queue.complete(
+                job.id, worker_id, output.model_dump_json()
+            )
+        except Exception as e:
+            log.bind(ticker=job.ticker).error(
+                f"Job {job.id} failed on attempt {job.attempts}: {e}"
+            )
+            queue.fail(job.id, worker_id, str(e))
+        finally:
+            stop.set()
+            heartbeat.join()
+
+
+class WorkerCrashLoop(RuntimeError):
+    """Local workers kept dying; the cycle was abandoned."""
+
+
+class Coordinator:
+    """
+    Enqueues a cycle's jobs, supervises local worker processes and
+    collects their results.
+
+    Crashed workers are restarted with exponential backoff (from
+    `restart_backoff` up to 30s); after `max_restarts` restarts in one
+    cycle it fails with WorkerCrashLoop, e.g. when workers die at
+    startup on an import error or missing environment.
+    """
+
+    def __init__(
+        self,
+        queue_path: str,
+        workers: int = None,
+        hedge_kwargs: Dict = None,
+        lease_seconds: float = 600.0,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+        max_restarts: int = None,
+        restart_backoff: float = 1.0,
+    ):
+        self.queue_path = queue_path
+        self.workers = (
+            workers if workers is not None else (os.cpu_count() or 1)
+        )
+        self.hedge_kwargs = hedge_kwargs or {}
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.max_restarts = (
+            max_restarts
+            if max_restarts is not None
+            else 3 * self.workers
+        )
+        self.restart_backoff = restart_backoff
+        self.queue = WorkQueue(
+            queue_path,
+            lease_seconds=lease_seconds,
+            max_attempts=max_attempts,
+        )
+        self._context = multiprocessing.get_context("spawn")
+
+    def _spawn(self, cycle_id: str, index: int, **kwargs):
+        process = self._context.Process(
+            target=run_worker,
+            kwargs={
+                "queue_path": self.queue_path,
+                "worker_id": (
+                    f"{socket.gethostname()}-{cycle_id[:8]}-{index}"
+                ),
+                "hedge_kwargs": self.hedge_kwargs,
+                "poll_interval": self.poll_interval,
+                "exit_when_done": cycle_id,
+                "lease_seconds": self.lease_seconds,
+                "max_attempts": self.max_attempts,
+                **kwargs,
+            },
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def run_cycle(
+        self,
+        stocks: List[str],
+        task: str,
+        cycle_id: str = None,
+        account: Optional[AccountSnapshot] = None,
+        deadline: Optional[float] = None,
+        news: Optional[Dict[str, str]] = None,
+    ) -> List[AutoHedgeOutput]:
+        """
+        Run the per-stock pipeline for every stock and return the outputs
+        in `stocks` order. Stocks that failed permanently are logged and
+        omitted. With a `deadline` (seconds) every worker gets an even
+        share per ticker, and tickers still unfinished shortly after it
+        are returned timed out. `news` maps tickers to the rendered news
+        their job carries.
+        """
+        from autohedge.main import AutoHedge
+
+        cycle_id = cycle_id or uuid.uuid4().hex
+        self.queue.enqueue(cycle_id, stocks, task, news)
+        logger.info(
+            f"Cycle {cycle_id}: {len(stocks)} jobs,"
+            f" {self.workers} local workers"
+        )
+
+        workers = min(self.workers, len(stocks))
+        worker_kwargs = {"account": account}
+        deadline_at = None
+        if deadline:
+            deadline_at = time.time() + deadline
+            worker_kwargs["deadline_at"] = deadline_at
+            worker_kwargs["ticker_seconds"] = (
+                deadline * workers / max(len(stocks), 1)
+            )
+
+        processes = [
+            self._spawn(cycle_id, i, **worker_kwargs)
+            for i in range(workers)
+        ]
+        crashes = 0
+        backoff = [self.restart_backoff] * workers
+        restart_at = [0.0] * workers
+        try:
+            while not self.queue.cycle_finished(cycle_id):
+                now = time.time()
+                if deadline_at is not None and now > deadline_at + (
+                    5 * self.poll_interval
+                ):
+                    logger.warning(
+                        f"Cycle {cycle_id}: deadline passed"
+                    )
+                    break
+                # Replace crashed workers; their jobs come back on lease expiry
+                for i, process in enumerate(processes):
+                    if process is None:
+                        if now >= restart_at[i]:
+                            processes[i] = self._spawn(
+                                cycle_id, i, **worker_kwargs
+                            )
+                        continue
+                    if process.is_alive() or process.exitcode == 0:
+                        continue
+                    crashes += 1
+                    if crashes > self.max_restarts:
+                        raise WorkerCrashLoop(
+                            f"Cycle {cycle_id}: workers crashed "
+                            f"{crashes} times (last exit code "
+                            f"{process.exitcode})"
+                        )
+                    logger.warning(
+                        f"Worker {i} exited with code"
+                        f" {process.exitcode}; restarting in"
+                        f" {backoff[i]:.1f}s"
+                    )
+                    processes[i] = None
+                    restart_at[i] = now + backoff[i]
+                    backoff[i] = min(backoff[i] * 2, 30.0)
+                time.sleep(self.poll_interval)
+        finally:
+            for process in processes:
+                if process is None:
+                    continue
+                process.join(timeout=self.poll_interval * 5)
+                if process.is_alive():
+                    process.terminate()
+
+        for ticker, error in self.queue.errors(cycle_id).items():
+            logger.error(
+                f"Cycle {cycle_id}: {ticker} failed: {error}"
+            )
+
+        results = self.queue.results(cycle_id)
+        errors = self.queue.errors(cycle_id)
+        outputs = []
+        for stock in stocks:
+            if stock in results:
+                outputs.append(results[stock])
+            elif deadline_at is not None and stock not in errors:
+                outputs.append(AutoHedge.timed_out(stock))
+        return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="AutoHedge distributed worker"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    worker = subparsers.add_parser(
+        "worker", help="run a queue worker"
+    )
+    worker.add_argument(
+        "--queue", required=True, help="path to the queue database"
+    )
+    worker.add_argument("--worker-id", default=None)
+    worker.add_argument("--output-dir", default="outputs")
+    worker.add_argument("--poll-interval", type=float, default=1.0)
+    worker.add_argument("--lease-seconds", type=float, default=600.0)
+    args = parser.parse_args()
+
+    run_worker(
+        queue_path=args.queue,
+        worker_id=args.worker_id,
+        hedge_kwargs={"output_dir": args.output_dir},
+        poll_interval=args.poll_interval,
+        lease_seconds=args.lease_seconds,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import atexit
+import json
+import random
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Optional
+
+from loguru import logger
+
+from autohedge.config import settings
+
+
+class QueuedJSONSink:
+    """
+    Loguru sink that moves log records off the request path.
+
+    The calling thread only appends a small tuple to a bounded deque; a
+    background thread serializes records as compact JSON lines and writes
+    them to disk in batches. When `max_queue` records are waiting, new
+    ones are dropped rather than blocking the caller; `dropped` counts
+    them and is reported on close. Flush markers bypass the bound.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = 100_000,
+        flush_interval: float = 0.25,
+        rotation_bytes: int = 500 * 1024 * 1024,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self.rotation_bytes = rotation_bytes
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+        self._buffer = deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._thread = threading.Thread(
+            target=self._drain,
+            name="autohedge-log-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def write(self, message) -> None:
+        """
+        Enqueue a loguru message. Called on the logging thread.
+        """
+        if len(self._buffer) >= self.max_queue:
+            with self._drop_lock:
+                self.dropped += 1
+            return
+        record = message.record
+        self._buffer.append((
+            record["time"].timestamp(),
+            record["level"].name,
+            record["name"],
+            record["message"],
+            record["extra"],
+        ))
+
+    def _drain(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._flush_buffer()
+        self._flush_buffer()
+
+    def _flush_buffer(self) -> None:
+        if not self._buffer:
+            return
+        lines = []
+        popleft = self._buffer.popleft
+        while self._buffer:
+            item = popleft()
+            if isinstance(item, threading.Event):
+                # A flush() marker: everything before it goes out first
+                self._write(lines)
+                lines = []
+                item.set()
+                continue
+            ts, level, name, msg, extra = item
+            entry = {
+                "ts": round(ts, 6),
+                "lvl": level,
+                "src": name,
+                "msg": msg,
+            }
+            if extra:
+                entry.update(extra)
+            lines.append(
+                json.dumps(entry, separators=(",", ":"), default=str)
+            )
+        self._write(lines)
+
+    def _write(self, lines) -> None:
+        if not lines:
+            return
+        try:
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            if self._file.tell() >= self.rotation_bytes:
+                self._rotate()
+        except Exception as e:
+            # Never let the writer thread die on a bad write
+            sys.stderr.write(f"autohedge log writer error: {e}\n")
+
+    def _rotate(self) -> None:
+        self._file.close()
+        rotated = self.path.with_name(
+            f"{self.path.stem}.{time.strftime('%Y%m%d_%H%M%S')}"
+            f"{self.path.suffix}"
+        )
+        self.path.rename(rotated)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Block until everything enqueued so far has been written to the
+        file. Returns False on timeout.
+        """
+        if self._stopped.is_set():
+            return True
+        written = threading.Event()
+        self._buffer.append(written)
+        self._wakeup.set()
+        return written.wait(timeout)
+
+    def close(self) -> None:
+        """
+        Flush pending records and stop the writer thread.
+        """
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5.0)
+        self._file.close()
+        if self.dropped:
+            sys.stderr.write(
+                f"autohedge log writer dropped {self.dropped} records"
+                " on a full queue\n"
+            )
+
+
+_sink: Optional[QueuedJSONSink] = None
+
+PAYLOAD_LEVEL = "PAYLOAD"
+
+
+def setup_log_pipeline(
+    path: str = None, level: str = None
+) -> QueuedJSONSink:
+    """
+    Install the queued JSON file sink. Handlers installed by the
+    application (including loguru's default stderr one) are left alone;
+    agent payloads are logged below DEBUG so only this sink sees them.
+
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _sink
+    if _sink is not None:
+        return _sink
+
+    try:
+        logger.level(PAYLOAD_LEVEL)
+    except ValueError:
+        logger.level(PAYLOAD_LEVEL, no=5)
+    threshold = logger.level(level or settings.LOG_LEVEL).no
+
+    _sink = QueuedJSONSink(path or settings.LOG_FILE)
+    logger.add(
+        _sink.write,
+        level=PAYLOAD_LEVEL,
+        format="{message}",
+        filter=lambda record: record["level"].no >= threshold
+        or "payload" in record["extra"],
+        catch=True,
+    )
+    atexit.register(_sink.close)
+    return _sink
+
+
+def log_payload(stage: str, ticker: str, payload: Any) -> None:
+    """
+    Record an agent payload for a pipeline stage, subject to sampling.
+
+    `settings.VERBOSE` only controls how much of the payload is kept:
+    the full text when enabled, a short preview otherwise.
+    """
+    rate = settings.LOG_PAYLOAD_SAMPLE_RATE
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+
+    text = str(payload)
+    if not settings.VERBOSE:
+        limit = settings.LOG_PAYLOAD_PREVIEW_CHARS
+        if len(text) > limit:
+            text = text[:limit] + "..."
+
+    logger.bind(stage=stage, ticker=ticker, payload=text).log(
+        PAYLOAD_LEVEL if _sink is not None else "DEBUG", "payload"
+    )
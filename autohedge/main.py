@@ -1,25 +1,55 @@
 import concurrent.futures
-from typing import List
+import threading
+from typing import Any, Callable, Dict, List, Optional
 from pathlib import Path
 from loguru import logger
 from swarms import Conversation
 
-from autohedge.utils import setup_logging, AutoHedgeOutputMain
+from autohedge.utils import (
+    setup_logging,
+    AutoHedgeOutput,
+    AutoHedgeOutputMain,
+)
+from autohedge.log_pipeline import log_payload
+from autohedge.screener import UniverseScreener
+from autohedge.news import NewsIngestor
+from autohedge.orders import (
+    OrderParseError,
+    OrderRouter,
+    RoutingReport,
+    parse_decision,
+    parse_order,
+)
+from autohedge.account import AccountCache, AccountSnapshot
+from autohedge.pretrade import PreTradeRisk, RiskCheckedBroker
+from autohedge.tools.broker import run_blocking
+from autohedge.coalesce import AnalysisCoalescer
+from autohedge.deadline import (
+    STAGES,
+    Deadline,
+    StageBudgets,
+    StageClock,
+    StageTimeout,
+)
+from autohedge.config import settings
 from autohedge.agents import (
     TradingDirector,
     QuantAnalyst,
     RiskManager,
     ExecutionAgent,
-    SentimentAgent
+    SentimentAgent,
 )
 
-setup_logging()
 
 class AutoHedge:
     """
-    Main trading system that coordinates all agents and manages the trading cycle.
+    Main trading system that coordinates all agents and manages the
+    trading cycle.
     """
 
+    # Outputs shared through a coalescer are routed by one hedge only
+    _route_lock = threading.Lock()
+
     def __init__(
         self,
         stocks: List[str],
@@ -29,6 +59,13 @@ class AutoHedge:
         output_file_path: str = None,
         strategy: str = None,
         output_type: str = "list",
+        screener: Optional[UniverseScreener] = None,
+        news: Optional[NewsIngestor] = None,
+        router: Optional[OrderRouter] = None,
+        account: Optional[AccountCache] = None,
+        pretrade: Optional[PreTradeRisk] = None,
+        coalescer: Optional[AnalysisCoalescer] = None,
+        stage_budgets: Optional[StageBudgets] = None,
     ):
         self.name = name
         self.description = description
@@ -38,14 +75,36 @@ class AutoHedge:
         self.strategy = strategy
         self.output_type = output_type
         self.output_file_path = output_file_path
-        
+        self.screener = screener
+        self.news = news
+        self.router = router
+        self.account = account
+        self.pretrade = pretrade
+        self.coalescer = coalescer
+        self.stage_budgets = stage_budgets or StageBudgets()
+        # Overrunning calls keep their thread until they return, so
+        # the pool has room for MAX_ABANDONED_STAGES of them on top
+        self._stage_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=settings.STAGE_WORKERS
+            + settings.MAX_ABANDONED_STAGES,
+            thread_name_prefix="autohedge-stage",
+        )
+        self._abandoned: set = set()
+        self._abandoned_lock = threading.Lock()
+        if (
+            pretrade is not None
+            and router is not None
+            and not isinstance(router.broker, RiskCheckedBroker)
+        ):
+            router.broker = RiskCheckedBroker(router.broker, pretrade)
+
         logger.info("Initializing Automated Trading System")
         self.director = TradingDirector(stocks, str(output_dir))
         self.quant = QuantAnalyst(str(output_dir))
         self.risk = RiskManager()
         self.execution = ExecutionAgent()
         self.sentiment = SentimentAgent()
-        
+
         self.logs = AutoHedgeOutputMain(
             name=self.name,
             description=self.description,
@@ -57,70 +116,533 @@ class AutoHedge:
 
     def fetch_stock_news(self, stock: str) -> str:
         """
-        Placeholder for fetching stock news.
-        In a real implementation, this would connect to a news API or use a web search tool.
+        Fetch new, de-duplicated news for a stock from the configured
+        NewsIngestor. Without one, a generic placeholder prompt is
+        used.
         """
-        return f"Market sentiment analysis for {stock}: Reviewing recent financial news, earnings reports, and social media trends."
+        if self.news is not None:
+            return self.news.render(stock)
+        return (
+            f"Market sentiment analysis for {stock}: Reviewing recent"
+            " financial news, earnings reports, and social media"
+            " trends."
+        )
 
-    def run(self, task: str, *args, **kwargs):
+    def account_snapshot(self) -> Optional[AccountSnapshot]:
         """
-        Execute one complete trading cycle for all stocks.
+        One account snapshot for the whole cycle, so every ticker's
+        risk assessment sees the same balances and positions.
         """
-        logger.info("Starting trading cycle")
-        self.conversation.add(role="user", content=f"Task: {task}")
-
+        if self.account is None:
+            return None
         try:
-            for stock in self.stocks:
-                logger.info(f"Processing {stock}")
-                
-                # Parallel Execution of Thesis Generation and Sentiment Analysis
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    thesis_future = executor.submit(self.director.generate_thesis, task=task, stock=stock)
-                    sentiment_future = executor.submit(self.sentiment.analyze, self.fetch_stock_news(stock))
-                    
-                    thesis, market_data = thesis_future.result()
-                    sentiment_analysis = sentiment_future.result()
-
-                self.conversation.add(
-                    role="Trading-Director",
-                    content=f"Stock: {stock}\nMarket Data: {market_data}\nThesis: {thesis}"
-                )
-                
-                self.conversation.add(
-                    role="Sentiment-Agent",
-                    content=sentiment_analysis
+            return self.account.snapshot_blocking()
+        except Exception as e:
+            logger.warning(
+                f"Account refresh failed, using last snapshot: {e}"
+            )
+            return self.account.current
+
+    def cycle_snapshot(self) -> Optional[AccountSnapshot]:
+        """
+        Start-of-cycle account state: one snapshot shared by every
+        ticker, with the pre-trade exposure counters synced to it.
+        """
+        account = self.account_snapshot()
+        if account is None or self.pretrade is None:
+            return account
+        if self.router is None:
+            self.pretrade.sync(account)
+            return account
+
+        async def sync() -> None:
+            # On the broker loop, so no order moves from reserved to
+            # tracked between reading the router and rebuilding
+            self.pretrade.sync(account, self.router.open_orders())
+
+        run_blocking(sync())
+        return account
+
+    def process_stock(
+        self,
+        stock: str,
+        task: str,
+        account: Optional[AccountSnapshot] = None,
+        on_stage: Optional[Callable[[str, str, Any], None]] = None,
+        deadline: Optional[Deadline] = None,
+        news: Optional[str] = None,
+    ) -> AutoHedgeOutput:
+        """
+        Run the full agent pipeline for a single stock. `on_stage` is
+        called with (stage, stock, payload) as each agent finishes.
+        With a `deadline`, stages are budgeted and degraded per
+        `stage_budgets`. `news` is already rendered news for the
+        SentimentAgent, e.g. sent along by a distributed coordinator;
+        without it the hedge's own NewsIngestor is used.
+        """
+        log = logger.bind(ticker=stock)
+        clock = StageClock(deadline, self.stage_budgets)
+        output = AutoHedgeOutput(current_stock=stock)
+
+        def stage_done(stage: str, payload: Any) -> None:
+            log_payload(stage, stock, payload)
+            if on_stage is not None:
+                on_stage(stage, stock, payload)
+
+        def wait(stage: str, future, budget: Optional[float]) -> Any:
+            try:
+                return clock.wait(stage, future, budget)
+            except StageTimeout as e:
+                if not clock.skippable(stage):
+                    raise
+                log.bind(stage=stage).warning(
+                    f"Skipping {stage} for {stock}: {e}"
                 )
+                output.skipped_stages.append(stage)
+                return None
+
+        futures = []
 
-                # Perform Quant Analysis
-                analysis = self.quant.analyze(stock + market_data, thesis)
-                self.conversation.add(role="Quant-Analyst", content=analysis)
+        def submit(
+            stage: str, fn: Callable, *args
+        ) -> concurrent.futures.Future:
+            future = self._submit_stage(stage, fn, *args)
+            futures.append(future)
+            return future
 
-                # Assess Risk
-                risk_assessment = self.risk.assess_risk(stock + market_data, thesis, analysis)
-                self.conversation.add(role="Risk-Manager", content=risk_assessment)
+        def call(stage: str, fn: Callable, *args) -> Any:
+            if deadline is None:
+                return fn(*args)
+            budget = clock.budget(stage)
+            return wait(stage, submit(stage, fn, *args), budget)
 
-                # Generate Order
-                order = self.execution.generate_order(stock, thesis, risk_assessment)
-                self.conversation.add(role="Execution-Agent", content=str(order))
+        log.bind(stage="start").info(f"Processing {stock}")
 
-                # Final Decision
-                decision = self.director.make_decision(
-                    str(order) + market_data + str(risk_assessment) + sentiment_analysis, 
-                    thesis
+        try:
+            # Parallel Execution of Thesis Generation and Sentiment
+            # Analysis
+            budget = clock.budget("thesis")
+            window = Deadline(budget) if budget is not None else None
+            thesis_future = submit(
+                "thesis", self.director.generate_thesis, task, stock
+            )
+            sentiment_future = submit(
+                "sentiment",
+                self.sentiment.analyze,
+                (
+                    news
+                    if news is not None
+                    else self.fetch_stock_news(stock)
+                ),
+                news is not None or self.news is not None,
+            )
+
+            thesis, market_data = "", ""
+            result = wait(
+                "thesis", thesis_future, window and window.remaining()
+            )
+            if result is not None:
+                thesis, market_data = result
+                output.thesis, output.market_data = (
+                    thesis,
+                    market_data,
                 )
-                self.conversation.add(role="Trading-Director", content=decision)
+                stage_done("thesis", thesis)
+            output.sentiment = wait(
+                "sentiment",
+                sentiment_future,
+                window and window.remaining(),
+            )
+            if output.sentiment is not None:
+                stage_done("sentiment", output.sentiment)
+
+            # Perform Quant Analysis
+            output.analysis = call(
+                "quant",
+                self.quant.analyze,
+                stock + market_data,
+                thesis,
+            )
+            if output.analysis is not None:
+                stage_done("quant", output.analysis)
+
+            # Assess Risk
+            risk_context = stock + market_data
+            if account is not None:
+                risk_context += "\n" + account.describe(stock)
+            output.risk_assessment = call(
+                "risk",
+                self.risk.assess_risk,
+                risk_context,
+                thesis,
+                output.analysis or "Quant analysis unavailable.",
+            )
+            if output.risk_assessment is not None:
+                stage_done("risk", output.risk_assessment)
+
+            # Generate Order
+            order = call(
+                "execution",
+                self.execution.generate_order,
+                stock,
+                thesis,
+                output.risk_assessment,
+            )
+            if order is not None:
+                output.order = str(order)
+                stage_done("execution", order)
+                try:
+                    output.trade_order = parse_order(
+                        order, symbol=stock
+                    )
+                except OrderParseError as e:
+                    log.bind(stage="execution").warning(
+                        f"No valid order for {stock}: {e}"
+                    )
+
+            # Final Decision
+            output.decision = call(
+                "decision",
+                self.director.make_decision,
+                str(order)
+                + market_data
+                + str(output.risk_assessment)
+                + (output.sentiment or ""),
+                thesis,
+            )
+            if output.decision is not None:
+                stage_done("decision", output.decision)
+                try:
+                    output.approved = parse_decision(output.decision)
+                except OrderParseError as e:
+                    log.bind(stage="decision").warning(
+                        f"Order for {stock} not approved: {e}"
+                    )
+
+        except StageTimeout as e:
+            log.bind(stage=e.stage).warning(f"{stock} timed out: {e}")
+            return self.timed_out(stock, output, e.stage)
+        finally:
+            for future in futures:
+                self._abandon(future)
+
+        log.bind(stage="done").info(f"Finished {stock}")
+        return output
 
-            if self.output_type == "list":
-                return self.conversation.return_messages_as_list()
-            elif self.output_type == "dict":
-                return self.conversation.return_messages_as_dictionary()
-            elif self.output_type == "str":
-                return self.conversation.return_history_as_string()
+    def _submit_stage(
+        self, stage: str, fn: Callable, *args
+    ) -> concurrent.futures.Future:
+        """
+        Run an agent call on the stage pool. While
+        MAX_ABANDONED_STAGES overrun calls still hold threads, the
+        call is refused with an already failed future, so the
+        stage's overrun policy applies.
+        """
+        with self._abandoned_lock:
+            saturated = (
+                len(self._abandoned) >= settings.MAX_ABANDONED_STAGES
+            )
+        if saturated:
+            future = concurrent.futures.Future()
+            future.set_exception(StageTimeout(stage, 0.0))
+            return future
+        return self._stage_executor.submit(fn, *args)
+
+    def _abandon(self, future: concurrent.futures.Future) -> None:
+        """Count a call nobody waits for until its thread frees up."""
+        if future.done() or future.cancel():
+            return
+        with self._abandoned_lock:
+            self._abandoned.add(future)
+        future.add_done_callback(self._reclaim)
+
+    def _reclaim(self, future: concurrent.futures.Future) -> None:
+        with self._abandoned_lock:
+            self._abandoned.discard(future)
+
+    @property
+    def abandoned_stages(self) -> int:
+        """Overrun agent calls still holding a stage thread."""
+        with self._abandoned_lock:
+            return len(self._abandoned)
+
+    def close(self) -> None:
+        """
+        Shut the stage pool down. Queued calls are cancelled;
+        abandoned calls run to completion on their own.
+        """
+        self._stage_executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def timed_out(
+        stock: str,
+        output: Optional[AutoHedgeOutput] = None,
+        stage: str = STAGES[0],
+    ) -> AutoHedgeOutput:
+        """
+        Mark a ticker timed out from `stage` on; it places no order.
+        """
+        output = output or AutoHedgeOutput(current_stock=stock)
+        output.timed_out = True
+        output.trade_order = None
+        output.approved = False
+        output.skipped_stages += [
+            s
+            for s in STAGES[STAGES.index(stage) :]
+            if s not in output.skipped_stages
+        ]
+        return output
+
+    def analyze_stock(
+        self,
+        stock: str,
+        task: str,
+        account: Optional[AccountSnapshot] = None,
+        deadline: Optional[Deadline] = None,
+        news: Optional[str] = None,
+    ) -> AutoHedgeOutput:
+        """
+        `process_stock`, shared with identical concurrent or recent
+        requests when a coalescer is configured.
+        """
+        if self.coalescer is None:
+            return self.process_stock(
+                stock, task, account, deadline=deadline, news=news
+            )
+        key = self.coalescer.key(
+            stock,
+            task,
+            self.strategy,
+            version=account.version if account is not None else None,
+        )
+        try:
+            output = self.coalescer.run(
+                key,
+                lambda on_stage: self.process_stock(
+                    stock,
+                    task,
+                    account,
+                    on_stage=on_stage,
+                    deadline=deadline,
+                    news=news,
+                ),
+                timeout=(
+                    deadline.remaining()
+                    if deadline is not None
+                    else None
+                ),
+            )
+        except concurrent.futures.TimeoutError:
+            logger.bind(ticker=stock).warning(
+                f"{stock} timed out waiting for a shared analysis"
+            )
+            return self.timed_out(stock)
+        if output.skipped_stages:
+            # Never serve a degraded analysis to a later request
+            self.coalescer.invalidate(stock)
+        return output
+
+    def reset_history(self, task: Optional[str] = None) -> None:
+        """
+        Start a fresh conversation and cycle log, so a long-running
+        hedge (e.g. under `ContinuousScheduler`) does not keep every
+        past cycle.
+        """
+        self.conversation = Conversation(time_enabled=True)
+        self.logs.logs = []
+        if task is not None:
+            self.conversation.add(
+                role="user", content=f"Task: {task}"
+            )
+            self.logs.task = task
+
+    def record(self, output: AutoHedgeOutput) -> None:
+        """
+        Append a stock's pipeline output to the conversation and cycle
+        logs.
+        """
+        if output.thesis is not None:
+            self.conversation.add(
+                role="Trading-Director",
+                content=(
+                    f"Stock: {output.current_stock}\nMarket Data:"
+                    f" {output.market_data}\nThesis: {output.thesis}"
+                ),
+            )
+        for role, content in (
+            ("Sentiment-Agent", output.sentiment),
+            ("Quant-Analyst", output.analysis),
+            ("Risk-Manager", output.risk_assessment),
+            ("Execution-Agent", output.order),
+            ("Trading-Director", output.decision),
+        ):
+            if content is not None:
+                self.conversation.add(role=role, content=content)
+        if output.skipped_stages:
+            status = "timed out" if output.timed_out else "degraded"
+            self.conversation.add(
+                role="AutoHedge",
+                content=(
+                    f"{output.current_stock} {status}, skipped:"
+                    f" {', '.join(output.skipped_stages)}"
+                ),
+            )
+        self.logs.logs.append(output)
+
+    def route_orders(
+        self, outputs: List[AutoHedgeOutput]
+    ) -> Optional[RoutingReport]:
+        """
+        Send the cycle's parsed orders the TradingDirector approved
+        through the configured OrderRouter. A coalesced analysis hands
+        the same output to every cycle that asked for it; its order is
+        sent once, by whichever cycle routes it first.
+        """
+        if self.router is None:
+            return None
+        with self._route_lock:
+            claimed = [
+                o
+                for o in outputs
+                if o.trade_order is not None
+                and o.approved
+                and not o.routed
+            ]
+            for output in claimed:
+                output.routed = True
+        orders = [o.trade_order for o in claimed]
+        if orders:
+            self.logs.routing = self.router.route_blocking(orders)
+            return self.logs.routing
+        return None
+
+    def format_output(self):
+        if self.output_type == "list":
+            return self.conversation.return_messages_as_list()
+        elif self.output_type == "dict":
+            return self.conversation.return_messages_as_dictionary()
+        elif self.output_type == "str":
+            return self.conversation.return_history_as_string()
+
+    def select_stocks(self) -> List[str]:
+        if self.screener is not None:
+            return self.screener.screen(self.stocks)
+        return self.stocks
+
+    def run(
+        self,
+        task: str,
+        *args,
+        deadline: Optional[float] = None,
+        **kwargs,
+    ):
+        """
+        Execute one complete trading cycle for all stocks. `deadline`
+        (seconds, default ``CYCLE_DEADLINE``) bounds the analysis: it
+        is shared evenly by the tickers still to run, and a ticker
+        reached after it has passed is marked timed out.
+        """
+        setup_logging()
+        deadline = deadline or settings.CYCLE_DEADLINE or None
+        cycle = Deadline(deadline) if deadline else None
+        logger.info("Starting trading cycle")
+        self.conversation.add(role="user", content=f"Task: {task}")
+        self.logs.task = task
+
+        try:
+            outputs = []
+            account = self.cycle_snapshot()
+            stocks = self.select_stocks()
+            for i, stock in enumerate(stocks):
+                if cycle is None:
+                    output = self.analyze_stock(stock, task, account)
+                elif cycle.expired:
+                    logger.bind(ticker=stock).warning(
+                        f"Cycle deadline passed before {stock}"
+                    )
+                    output = self.timed_out(stock)
+                else:
+                    output = self.analyze_stock(
+                        stock,
+                        task,
+                        account,
+                        cycle.share(len(stocks) - i),
+                    )
+                outputs.append(output)
+                self.record(output)
+
+            self.route_orders(outputs)
+            return self.format_output()
 
         except Exception as e:
             logger.error(f"Error in trading cycle: {str(e)}")
             raise
 
+    def worker_kwargs(self) -> Dict[str, Any]:
+        """
+        Constructor arguments for this hedge's worker-process
+        replicas: everything the per-stock pipeline uses. The
+        screener, news ingestor, router, pre-trade checks and account
+        cache stay in the coordinating process, which selects stocks,
+        routes orders and sends workers its account snapshot and each
+        job its rendered news.
+        """
+        return {
+            "name": self.name,
+            "description": self.description,
+            "output_dir": str(self.output_dir),
+            "output_type": self.output_type,
+            "strategy": self.strategy,
+            "stage_budgets": self.stage_budgets,
+        }
+
+    def run_distributed(
+        self,
+        task: str,
+        queue_path: str = None,
+        workers: int = None,
+        deadline: Optional[float] = None,
+    ):
+        """
+        Execute a trading cycle across worker processes sharing a
+        durable local work queue. See `autohedge.distributed`.
+        """
+        from autohedge.distributed import Coordinator
+
+        setup_logging()
+        logger.info("Starting distributed trading cycle")
+        self.conversation.add(role="user", content=f"Task: {task}")
+        self.logs.task = task
+
+        account = self.cycle_snapshot()
+        stocks = self.select_stocks()
+        # Ingest here: worker copies of the ingestor would start from
+        # scratch every cycle and re-deliver the same articles
+        news = None
+        if self.news is not None:
+            news = {s: self.fetch_stock_news(s) for s in stocks}
+        coordinator = Coordinator(
+            queue_path=queue_path
+            or str(self.output_dir / "work_queue.db"),
+            workers=workers,
+            hedge_kwargs=self.worker_kwargs(),
+        )
+        outputs = list(
+            coordinator.run_cycle(
+                stocks,
+                task,
+                account=account,
+                news=news,
+                deadline=deadline or settings.CYCLE_DEADLINE or None,
+            )
+        )
+        for output in outputs:
+            self.record(output)
+
+        self.route_orders(outputs)
+        return self.format_output()
+
+
 if __name__ == "__main__":
     # Example usage
     api = AutoHedge(stocks=["AAPL", "TSLA"])
@@ -0,0 +1,453 @@
+"""
+News ingestion for the SentimentAgent.
+
+Articles are read from pluggable sources, normalized into `NewsArticle`
+objects and de-duplicated per ticker with MinHash/LSH over word
+shingles, so the same wire story syndicated by dozens of outlets is only
+analysed once. `NewsIngestor.render` hands each ticker's new, distinct
+articles to the agent within a token budget.
+"""
+
+import hashlib
+import html
+import json
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict, deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel, Field
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+# Prime just above 2**32 so (a * h) stays inside uint64 for 32-bit hashes
+_PRIME = np.uint64(4294967311)
+
+
+class NewsArticle(BaseModel):
+    id: str
+    tickers: List[str] = Field(default_factory=list)
+    title: str = ""
+    body: str = ""
+    source: Optional[str] = None
+    url: Optional[str] = None
+    published_at: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return f"{self.title}\n{self.body}".strip()
+
+
+def clean_text(text: str) -> str:
+    """Strip markup and collapse whitespace."""
+    text = html.unescape(_TAG_RE.sub(" ", text or ""))
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def normalize_article(raw: Dict) -> Optional[NewsArticle]:
+    """
+    Map a raw feed record onto a NewsArticle, accepting the field names
+    common feeds use. Returns None for records without tickers or text.
+    """
+    tickers = (
+        raw.get("tickers")
+        or raw.get("symbols")
+        or raw.get("ticker")
+        or []
+    )
+    if isinstance(tickers, str):
+        tickers = [t.strip() for t in tickers.split(",")]
+    tickers = [t.upper() for t in tickers if t]
+
+    title = clean_text(raw.get("title") or raw.get("headline") or "")
+    body = clean_text(
+        raw.get("body")
+        or raw.get("summary")
+        or raw.get("content")
+        or ""
+    )
+    if not tickers or not (title or body):
+        return None
+
+    url = raw.get("url") or raw.get("link")
+    article_id = (
+        raw.get("id")
+        or hashlib.sha1(
+            (url or f"{title}\n{body}").encode("utf-8")
+        ).hexdigest()
+    )
+
+    published = (
+        raw.get("published_at")
+        or raw.get("published")
+        or raw.get("time")
+    )
+    return NewsArticle(
+        id=str(article_id),
+        tickers=tickers,
+        title=title,
+        body=body,
+        source=raw.get("source"),
+        url=url,
+        published_at=None if published is None else str(published),
+    )
+
+
+class NewsSource:
+    """
+    Base class for news feeds. `poll` returns raw records that arrived
+    since the previous call.
+    """
+
+    def poll(self) -> List[Dict]:
+        raise NotImplementedError
+
+
+class JSONLNewsSource(NewsSource):
+    """
+    Tails a JSON-lines file, reading only the bytes appended since the
+    last poll.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._offset = 0
+
+    def poll(self) -> List[Dict]:
+        if not self.path.exists():
+            return []
+        records = []
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partially written line; pick it up next time
+                    break
+                self._offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(
+                        f"Skipping malformed news line in {self.path}"
+                    )
+        return records
+
+
+class DirectoryNewsSource(NewsSource):
+    """
+    Reads every ``*.jsonl`` and ``*.json`` file in a directory. JSONL files
+    are tailed; JSON files (one article or a list) are read once.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._tails: Dict[Path, JSONLNewsSource] = {}
+        self._seen_json: set = set()
+
+    def poll(self) -> List[Dict]:
+        if not self.directory.is_dir():
+            return []
+        records = []
+        for path in sorted(self.directory.glob("*.jsonl")):
+            if path not in self._tails:
+                self._tails[path] = JSONLNewsSource(str(path))
+            records.extend(self._tails[path].poll())
+        for path in sorted(self.directory.glob("*.json")):
+            if path in self._seen_json:
+                continue
+            self._seen_json.add(path)
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Skipping news file {path}: {e}")
+                continue
+            records.extend(data if isinstance(data, list) else [data])
+        return records
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles, computed with numpy in one
+    vectorized pass per document.
+    """
+
+    def __init__(
+        self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1
+    ):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.integers(
+            1, int(_PRIME), num_perm, dtype=np.uint64
+        )
+        self.b = rng.integers(
+            0, int(_PRIME), num_perm, dtype=np.uint64
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        tokens = _WORD_RE.findall(text.lower())
+        k = self.shingle_size
+        shingles = {
+            " ".join(tokens[i : i + k])
+            for i in range(max(1, len(tokens) - k + 1))
+        }
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (
+            np.outer(hashes, self.a) % _PRIME + self.b
+        ) % _PRIME
+        return permuted.min(axis=0)
+
+
+class DuplicateIndex:
+    """
+    Bounded LSH index of MinHash signatures. A document is a duplicate
+    when a candidate sharing any band has estimated Jaccard similarity of
+    at least `threshold`.
+    """
+
+    def __init__(
+        self,
+        hasher: MinHasher,
+        threshold: float = 0.8,
+        bands: int = 16,
+        max_items: int = 5000,
+    ):
+        if hasher.num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.hasher = hasher
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = hasher.num_perm // bands
+        self.max_items = max_items
+        self._buckets: Dict[Tuple[int, bytes], set] = defaultdict(set)
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._order: deque = deque()
+
+    def _band_keys(
+        self, signature: np.ndarray
+    ) -> List[Tuple[int, bytes]]:
+        r = self.rows
+        return [
+            (band, signature[band * r : (band + 1) * r].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def find_duplicate(self, signature: np.ndarray) -> Optional[str]:
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        for candidate in candidates:
+            similarity = np.mean(
+                self._signatures[candidate] == signature
+            )
+            if similarity >= self.threshold:
+                return candidate
+        return None
+
+    def add(self, item_id: str, signature: np.ndarray) -> None:
+        self._signatures[item_id] = signature
+        self._order.append(item_id)
+        for key in self._band_keys(signature):
+            self._buckets[key].add(item_id)
+        while len(self._order) > self.max_items:
+            self._evict(self._order.popleft())
+
+    def _evict(self, item_id: str) -> None:
+        signature = self._signatures.pop(item_id)
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._buckets[key]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class NewsIngestor:
+    """
+    Polls news sources, drops near-duplicates per ticker and queues the
+    remaining articles until they are handed to the SentimentAgent.
+    """
+
+    def __init__(
+        self,
+        sources: Iterable[NewsSource],
+        similarity_threshold: float = 0.8,
+        token_budget: int = 2000,
+        max_history: int = 5000,
+        min_poll_interval: float = 1.0,
+        hasher: MinHasher = None,
+    ):
+        self.sources = list(sources)
+        self.similarity_threshold = similarity_threshold
+        self.token_budget = token_budget
+        self.max_history = max_history
+        self.min_poll_interval = min_poll_interval
+        self.hasher = hasher or MinHasher()
+
+        self._indexes: Dict[str, DuplicateIndex] = {}
+        # Both bounded like the duplicate index: oldest entries go first
+        self._seen_ids: Dict[str, OrderedDict] = {}
+        self._pending: Dict[str, deque] = {}
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"ingested": 0, "duplicates": 0, "delivered": 0}
+
+    def __getstate__(self):
+        # Picklable for worker processes; the lock is per process
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _index(self, ticker: str) -> DuplicateIndex:
+        if ticker not in self._indexes:
+            self._indexes[ticker] = DuplicateIndex(
+                self.hasher,
+                threshold=self.similarity_threshold,
+                max_items=self.max_history,
+            )
+        return self._indexes[ticker]
+
+    def ingest(self, force: bool = False) -> int:
+        """
+        Poll every source and index new articles. Returns the number of
+        distinct (ticker, article) pairs queued.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and now - self._last_poll < self.min_poll_interval
+            ):
+                return 0
+            self._last_poll = now
+
+            queued = 0
+            for source in self.sources:
+                try:
+                    records = source.poll()
+                except Exception as e:
+                    logger.error(
+                        "News source"
+                        f" {type(source).__name__} failed: {e}"
+                    )
+                    continue
+                for raw in records:
+                    article = normalize_article(raw)
+                    if article is None:
+                        continue
+                    self.stats["ingested"] += 1
+                    signature = None
+                    for ticker in article.tickers:
+                        seen = self._seen_ids.setdefault(
+                            ticker, OrderedDict()
+                        )
+                        if article.id in seen:
+                            continue
+                        seen[article.id] = None
+                        if len(seen) > self.max_history:
+                            seen.popitem(last=False)
+                        if signature is None:
+                            signature = self.hasher.signature(
+                                article.text
+                            )
+                        index = self._index(ticker)
+                        if (
+                            index.find_duplicate(signature)
+                            is not None
+                        ):
+                            self.stats["duplicates"] += 1
+                            continue
+                        index.add(article.id, signature)
+                        pending = self._pending.get(ticker)
+                        if pending is None:
+                            pending = self._pending[ticker] = deque(
+                                maxlen=self.max_history
+                            )
+                        pending.append(article)
+                        queued += 1
+            return queued
+
+    def item_ids(self, ticker: str) -> List[str]:
+        """
+        Ids of the distinct articles indexed for `ticker`; suitable as a
+        `ContinuousScheduler` news source.
+        """
+        self.ingest()
+        with self._lock:
+            index = self._indexes.get(ticker.upper())
+            return list(index._order) if index else []
+
+    def take(
+        self, ticker: str, token_budget: int = None
+    ) -> List[NewsArticle]:
+        """
+        Pop the newest undelivered articles for `ticker` that fit in the
+        token budget. Older articles that did not fit stay queued for
+        the next call.
+        """
+        budget = token_budget or self.token_budget
+        self.ingest()
+        with self._lock:
+            pending = self._pending.get(ticker.upper())
+            if not pending:
+                return []
+            selected, used = [], 0
+            # Newest first: the freshest stories matter most for sentiment
+            while pending:
+                cost = estimate_tokens(pending[-1].text)
+                if selected and used + cost > budget:
+                    break
+                selected.append(pending.pop())
+                used += cost
+            self.stats["delivered"] += len(selected)
+            return selected
+
+    def render(self, ticker: str, token_budget: int = None) -> str:
+        """
+        Format the ticker's new articles as SentimentAgent input.
+        """
+        articles = self.take(ticker, token_budget)
+        if not articles:
+            return (
+                f"No new news articles for {ticker} since the last"
+                " analysis."
+            )
+
+        lines = [
+            f"Stock: {ticker}",
+            f"Recent news articles ({len(articles)}):",
+        ]
+        for i, article in enumerate(articles, 1):
+            header = f"{i}. {article.title}"
+            meta = ", ".join(
+                p for p in (article.source, article.published_at) if p
+            )
+            if meta:
+                header += f" ({meta})"
+            lines.append(header)
+            if article.body:
+                lines.append(f"   {article.body}")
+        return "\n".join(lines)
@@ -0,0 +1,602 @@
+"""
+Structured orders from ExecutionAgent output, and batched routing.
+
+`parse_order` turns the agent's answer into a validated `TradeOrder`.
+The agent is asked (see `ORDER_FORMAT_PROMPT`) to finish with a
+JSON object matching the `TradeOrder` schema; that block is parsed
+first, and labelled free text ("Order type: limit", "Quantity: 100",
+...) is the fallback. Anything ambiguous or inconsistent raises
+`OrderParseError` rather than guessing.
+
+`parse_decision` reads the TradingDirector's verdict on that order
+from its labelled final line (see `DECISION_FORMAT_PROMPT`); only
+approved orders are routed.
+
+`OrderRouter` takes a cycle's orders, nets opposing orders on the same
+symbol and terms, and submits the rest through a broker adapter in
+concurrent batches, recording each order's acknowledgment latency. It
+tracks acknowledged orders until they fill or are cancelled: fills
+(reported in the ack or later through `on_fill`) patch the cached
+account in place, and fills and `cancel`s are passed on to the adapter
+so pre-trade exposure follows them.
+"""
+
+import json
+import re
+import time
+from collections import OrderedDict, deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+)
+
+from loguru import logger
+from pydantic import (
+    BaseModel,
+    Field,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
+
+from autohedge.tools.broker import (
+    BrokerAdapter,
+    BrokerError,
+    BrokerOrder,
+    OrderAck,
+    run_blocking,
+)
+
+if TYPE_CHECKING:
+    from autohedge.account import AccountCache
+
+_SYMBOL_RE = re.compile(r"^[A-Z][A-Z0-9.\-]{0,9}$")
+_JSON_BLOCK_RE = re.compile(
+    r"```(?:json)?\s*(\{.*?\})\s*```", re.S | re.I
+)
+_NUMBER = r"\$?\s*([\d,]+(?:\.\d+)?)"
+_FIELD_RES = {
+    "symbol": re.compile(
+        r"\b(?:symbol|ticker)\W{0,5}"
+        r"\$?([A-Za-z][A-Za-z0-9.\-]{0,9})\b",
+        re.I,
+    ),
+    "side": re.compile(
+        r"\b(?:side|action|direction)\W{0,5}(buy|sell|long|short)\b",
+        re.I,
+    ),
+    "quantity": re.compile(
+        r"\b(?:quantity|qty|shares)\W{0,5}" + _NUMBER, re.I
+    ),
+    "order_type": re.compile(
+        r"\border\s*type\W{0,5}(market|limit|stop[\s\-_]*limit"
+        r"|stop(?:[\s\-_]*market)?)\b",
+        re.I,
+    ),
+    "limit_price": re.compile(
+        r"\b(?:entry|limit)\s*price\W{0,5}" + _NUMBER, re.I
+    ),
+    "stop_price": re.compile(
+        r"\bstop\s*price\W{0,5}" + _NUMBER, re.I
+    ),
+    "stop_loss": re.compile(
+        r"\bstop[\s\-]*loss\W{0,5}" + _NUMBER, re.I
+    ),
+    "take_profit": re.compile(
+        r"\b(?:take[\s\-]*profit|profit\s*target)\W{0,5}" + _NUMBER,
+        re.I,
+    ),
+    "time_in_force": re.compile(
+        r"\btime\s*in\s*force\W{0,5}(day|gtc"
+        r"|good[\s\-]*(?:till?|until)[\s\-]*cancel(?:l?ed)?)\b",
+        re.I,
+    ),
+}
+_SIDE_WORD_RE = re.compile(r"\b(buy|sell)\b", re.I)
+_DECISION_RE = re.compile(
+    r"\bdecision\W{0,5}(approved?|execute|yes"
+    r"|reject(?:ed)?|declined?|hold|no)\b",
+    re.I,
+)
+_APPROVALS = ("APPROVE", "APPROVED", "EXECUTE", "YES")
+
+
+class OrderParseError(ValueError):
+    """Agent output could not be turned into a valid order."""
+
+
+class TradeOrder(BaseModel):
+    symbol: str
+    side: Literal["BUY", "SELL"]
+    quantity: int = Field(gt=0)
+    order_type: Literal["MARKET", "LIMIT", "STOP", "STOP_LIMIT"] = (
+        "MARKET"
+    )
+    limit_price: Optional[float] = Field(default=None, gt=0)
+    stop_price: Optional[float] = Field(default=None, gt=0)
+    time_in_force: Literal["DAY", "GTC"] = "DAY"
+    stop_loss: Optional[float] = Field(default=None, gt=0)
+    take_profit: Optional[float] = Field(default=None, gt=0)
+
+    @field_validator("symbol", mode="before")
+    @classmethod
+    def _symbol(cls, value: Any) -> str:
+        value = str(value).strip().lstrip("$").upper()
+        if not _SYMBOL_RE.match(value):
+            raise ValueError(f"invalid symbol {value!r}")
+        return value
+
+    @field_validator("side", mode="before")
+    @classmethod
+    def _side(cls, value: Any) -> str:
+        value = str(value).strip().upper()
+        return {"LONG": "BUY", "SHORT": "SELL"}.get(value, value)
+
+    @field_validator("order_type", mode="before")
+    @classmethod
+    def _order_type(cls, value: Any) -> str:
+        value = re.sub(r"[\s\-]+", "_", str(value).strip().upper())
+        return {"STOP_MARKET": "STOP", "STOPLIMIT": "STOP_LIMIT"}.get(
+            value, value
+        )
+
+    @field_validator("time_in_force", mode="before")
+    @classmethod
+    def _time_in_force(cls, value: Any) -> str:
+        value = str(value).strip().upper()
+        return (
+            "GTC"
+            if value.startswith("GOOD") or value == "GTC"
+            else value
+        )
+
+    @field_validator("quantity", mode="before")
+    @classmethod
+    def _quantity(cls, value: Any) -> Any:
+        if isinstance(value, str):
+            value = value.replace(",", "").strip()
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(
+                "quantity must be a whole number of shares"
+            )
+        return value
+
+    @model_validator(mode="after")
+    def _consistent(self) -> "TradeOrder":
+        if (
+            self.order_type in ("LIMIT", "STOP_LIMIT")
+            and self.limit_price is None
+        ):
+            raise ValueError(
+                f"{self.order_type} order needs a limit_price"
+            )
+        if (
+            self.order_type in ("STOP", "STOP_LIMIT")
+            and self.stop_price is None
+        ):
+            raise ValueError(
+                f"{self.order_type} order needs a stop_price"
+            )
+        if self.order_type in ("MARKET", "STOP"):
+            self.limit_price = None
+        if self.order_type in ("MARKET", "LIMIT"):
+            self.stop_price = None
+        entry = self.limit_price or self.stop_price
+        if entry is not None:
+            sign = 1 if self.side == "BUY" else -1
+            if (
+                self.stop_loss is not None
+                and sign * (entry - self.stop_loss) <= 0
+            ):
+                raise ValueError(
+                    "stop_loss is on the wrong side of the entry"
+                    " price"
+                )
+            if (
+                self.take_profit is not None
+                and sign * (self.take_profit - entry) <= 0
+            ):
+                raise ValueError(
+                    "take_profit is on the wrong side of the entry"
+                    " price"
+                )
+        return self
+
+    @property
+    def signed_quantity(self) -> int:
+        return self.quantity if self.side == "BUY" else -self.quantity
+
+    @property
+    def terms(self) -> Tuple:
+        """Execution terms; only equal terms can be netted."""
+        return (
+            self.symbol,
+            self.order_type,
+            self.limit_price,
+            self.stop_price,
+            self.time_in_force,
+        )
+
+    def to_broker_order(self) -> BrokerOrder:
+        return BrokerOrder(
+            symbol=self.symbol,
+            side=self.side,
+            quantity=self.quantity,
+            order_type=self.order_type,
+            limit_price=self.limit_price,
+            stop_price=self.stop_price,
+            time_in_force=self.time_in_force,
+        )
+
+
+ORDER_FORMAT_PROMPT = (
+    "End your answer with the order as a single JSON object in a"
+    " ```json code block, matching this schema exactly (use null for"
+    " fields that do not apply):\n"
+    + json.dumps({
+        name: (
+            prop.get("enum")
+            or prop.get("type")
+            or [t.get("type") for t in prop.get("anyOf", [])]
+        )
+        for name, prop in TradeOrder.model_json_schema()[
+            "properties"
+        ].items()
+    })
+)
+
+
+DECISION_FORMAT_PROMPT = (
+    "End your answer with your verdict on its own line, exactly"
+    " 'Decision: APPROVE' to execute the order or 'Decision: REJECT'"
+    " not to."
+)
+
+
+def _json_candidates(text: str) -> List[str]:
+    """JSON-looking objects, most preferred first: the last fenced
+    block, then bare objects from the end of the text backwards."""
+    candidates = [m.group(1) for m in _JSON_BLOCK_RE.finditer(text)][
+        ::-1
+    ]
+    end = text.rfind("}")
+    while end != -1:
+        depth, start = 0, -1
+        for i in range(end, -1, -1):
+            if text[i] == "}":
+                depth += 1
+            elif text[i] == "{":
+                depth -= 1
+                if depth == 0:
+                    start = i
+                    break
+        if start == -1:
+            break
+        candidates.append(text[start : end + 1])
+        end = text.rfind("}", 0, start)
+    return candidates
+
+
+def _from_text(text: str) -> Dict[str, Any]:
+    fields = {}
+    for name, pattern in _FIELD_RES.items():
+        match = pattern.search(text)
+        if match:
+            value = match.group(1)
+            if name in (
+                "quantity",
+                "limit_price",
+                "stop_price",
+                "stop_loss",
+                "take_profit",
+            ):
+                value = value.replace(",", "")
+            fields[name] = value
+    if "side" not in fields:
+        sides = {
+            m.group(1).upper() for m in _SIDE_WORD_RE.finditer(text)
+        }
+        if len(sides) == 1:
+            fields["side"] = sides.pop()
+        elif sides:
+            raise OrderParseError(
+                "ambiguous side: both buy and sell mentioned"
+            )
+    if "order_type" not in fields:
+        fields["order_type"] = (
+            "LIMIT" if "limit_price" in fields else "MARKET"
+        )
+    return fields
+
+
+def parse_order(
+    text: str, symbol: Optional[str] = None
+) -> TradeOrder:
+    """
+    Parse ExecutionAgent output into a TradeOrder. `symbol` is the
+    ticker the agent was asked about; it fills a missing symbol and
+    any other symbol is rejected.
+    """
+    text = str(text or "")
+    for candidate in _json_candidates(text):
+        try:
+            fields = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(fields, dict) and (
+            "side" in fields or "quantity" in fields
+        ):
+            fields = {
+                k: v for k, v in fields.items() if v is not None
+            }
+            break
+    else:
+        fields = _from_text(text)
+
+    if symbol:
+        expected = symbol.strip().upper()
+        given = (
+            str(fields.get("symbol") or expected)
+            .strip()
+            .lstrip("$")
+            .upper()
+        )
+        if given != expected:
+            raise OrderParseError(
+                f"order is for {given}, expected {expected}"
+            )
+        fields["symbol"] = expected
+
+    try:
+        return TradeOrder(**fields)
+    except ValidationError as e:
+        errors = [
+            f"{'.'.join(str(p) for p in err['loc']) or 'order'}:"
+            f" {err['msg']}"
+            for err in e.errors()
+        ]
+        raise OrderParseError("; ".join(errors)) from None
+
+
+def parse_decision(text: str) -> bool:
+    """
+    Whether the TradingDirector approved the order. The last labelled
+    verdict counts; without one an `OrderParseError` is raised rather
+    than guessing from the prose.
+    """
+    verdicts = _DECISION_RE.findall(str(text or ""))
+    if not verdicts:
+        raise OrderParseError(
+            "no 'Decision: APPROVE/REJECT' verdict found"
+        )
+    return verdicts[-1].upper() in _APPROVALS
+
+
+class RoutedOrder(BaseModel):
+    order: TradeOrder
+    ack: Optional[OrderAck] = None
+    error: Optional[str] = None
+    latency: float = 0.0
+
+
+class RoutingReport(BaseModel):
+    received: int = 0
+    netted_out: int = 0
+    routed: List[RoutedOrder] = Field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def acked(self) -> List[RoutedOrder]:
+        return [r for r in self.routed if r.ack is not None]
+
+    @property
+    def failed(self) -> List[RoutedOrder]:
+        return [r for r in self.routed if r.error is not None]
+
+
+def net_orders(orders: Iterable[TradeOrder]) -> List[TradeOrder]:
+    """
+    Net opposing orders with identical terms (symbol, type, prices,
+    time in force) into one order for the residual quantity, in
+    first-seen order. Orders that cancel out entirely are dropped.
+    """
+    grouped: "OrderedDict[Tuple, List[TradeOrder]]" = OrderedDict()
+    for order in orders:
+        grouped.setdefault(order.terms, []).append(order)
+
+    netted = []
+    for group in grouped.values():
+        if len(group) == 1:
+            netted.append(group[0])
+            continue
+        residual = sum(o.signed_quantity for o in group)
+        if residual == 0:
+            continue
+        side = "BUY" if residual > 0 else "SELL"
+        # Keep the protective levels of an order on the residual side
+        template = next(o for o in group if o.side == side)
+        netted.append(
+            template.model_copy(update={"quantity": abs(residual)})
+        )
+    return netted
+
+
+class OrderRouter:
+    """
+    Args:
+        broker: Adapter orders are submitted through.
+        batch_size: Orders per batch; a batch is submitted
+            concurrently and batches go out back to back.
+        concurrency: Requests in flight within a batch.
+        latency_window: Recent ack latencies kept for `latency_stats`.
+        account: Cached account state, patched with fills and
+            invalidated by acks whose fill is not known yet.
+        max_working: Unfilled acknowledged orders tracked for
+            `on_fill` (oldest forgotten first).
+    """
+
+    def __init__(
+        self,
+        broker: BrokerAdapter,
+        batch_size: int = 50,
+        concurrency: int = 20,
+        latency_window: int = 10_000,
+        account: Optional["AccountCache"] = None,
+        max_working: int = 10_000,
+    ):
+        self.broker = broker
+        self.account = account
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.latencies: Deque[float] = deque(maxlen=latency_window)
+        self.max_working = max_working
+        # order id -> [order, filled quantity]
+        self.working: "OrderedDict[str, List]" = OrderedDict()
+
+    async def route(
+        self, orders: Iterable[TradeOrder]
+    ) -> RoutingReport:
+        orders = list(orders)
+        netted = net_orders(orders)
+        report = RoutingReport(
+            received=len(orders), netted_out=len(orders) - len(netted)
+        )
+        start = time.perf_counter()
+        unknown_fills = False
+        for i in range(0, len(netted), self.batch_size):
+            batch = netted[i : i + self.batch_size]
+            broker_orders = [
+                order.to_broker_order() for order in batch
+            ]
+            results = await self.broker.submit_many(
+                broker_orders, concurrency=self.concurrency
+            )
+            for order, broker_order, result in zip(
+                batch, broker_orders, results
+            ):
+                if isinstance(result, BrokerError):
+                    report.routed.append(
+                        RoutedOrder(order=order, error=str(result))
+                    )
+                    continue
+                self.latencies.append(result.latency)
+                report.routed.append(
+                    RoutedOrder(
+                        order=order,
+                        ack=result,
+                        latency=result.latency,
+                    )
+                )
+                order_id = result.order_id or result.client_order_id
+                self._track(order_id, broker_order)
+                self.broker.on_ack(broker_order, result)
+                if result.filled_quantity and result.fill_price:
+                    self.on_fill(
+                        order_id,
+                        result.filled_quantity,
+                        result.fill_price,
+                    )
+                else:
+                    unknown_fills = True
+        report.seconds = time.perf_counter() - start
+        if self.account is not None and unknown_fills:
+            # The order may have filled at a price the ack does not
+            # report; refetch on next read
+            self.account.invalidate()
+        logger.info(
+            f"Routed {len(report.routed)} orders"
+            f" ({report.netted_out} netted out,"
+            f" {len(report.failed)} failed) in {report.seconds:.3f}s"
+        )
+        return report
+
+    def route_blocking(
+        self, orders: Iterable[TradeOrder]
+    ) -> RoutingReport:
+        """
+        `route` from synchronous code, on the shared broker loop (see
+        `run_blocking`) so the adapter's session stays warm.
+        """
+        return run_blocking(self.route(orders))
+
+    def _track(self, order_id: str, order: BrokerOrder) -> None:
+        self.working[order_id] = [order, 0.0]
+        while len(self.working) > self.max_working:
+            self.working.popitem(last=False)
+
+    def open_orders(self) -> List[Tuple[BrokerOrder, float]]:
+        """
+        Tracked orders and their filled quantities. Call on the broker
+        loop, where routing updates them.
+        """
+        return [
+            (order, filled) for order, filled in self.working.values()
+        ]
+
+    def on_fill(
+        self, order_id: str, quantity: float, price: float
+    ) -> bool:
+        """
+        Book an execution report for a routed order: the cached
+        account is patched with the fill rather than refetched.
+        Returns False for orders the router is not tracking.
+        """
+        entry = self.working.get(order_id)
+        if entry is None:
+            return False
+        order, filled = entry
+        quantity = min(quantity, order.quantity - filled)
+        entry[1] = filled + quantity
+        if entry[1] >= order.quantity:
+            del self.working[order_id]
+        self.broker.on_fill(order, quantity, price)
+        if self.account is not None:
+            self.account.apply_fill(
+                order.symbol, order.side, quantity, price
+            )
+        return True
+
+    async def cancel(self, order_id: str) -> bool:
+        """
+        Cancel a routed order's unfilled remainder. Returns False for
+        orders the router is not tracking.
+        """
+        entry = self.working.get(order_id)
+        if entry is None:
+            return False
+        await self.broker.cancel_order(order_id)
+        order, filled = self.working.pop(order_id, entry)
+        self.broker.on_cancel(order, filled)
+        return True
+
+    def cancel_blocking(self, order_id: str) -> bool:
+        """`cancel` from synchronous code, on the shared loop."""
+        return run_blocking(self.cancel(order_id))
+
+    def latency_stats(self) -> Dict[str, float]:
+        """Ack latency percentiles over the recent window (s)."""
+        if not self.latencies:
+            return {
+                "count": 0,
+                "p50": 0.0,
+                "p90": 0.0,
+                "p99": 0.0,
+                "max": 0.0,
+            }
+        ordered = sorted(self.latencies)
+        n = len(ordered)
+        return {
+            "count": n,
+            **{
+                f"p{int(q * 100)}": ordered[min(n - 1, int(q * n))]
+                for q in (0.5, 0.9, 0.99)
+            },
+            "max": ordered[-1],
+        }
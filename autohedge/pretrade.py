@@ -0,0 +1,508 @@
+"""
+Pre-trade risk checks in front of every broker adapter.
+
+`PreTradeRisk.check` validates an order against hard limits without any
+I/O: per-order quantity and notional, resulting position, gross exposure,
+a price collar around the last trade, and order rates over sliding
+windows. Limits are resolved into a per-symbol table up front and
+exposure is kept in running counters updated as orders are reserved,
+acked and filled, so each check is a handful of dict lookups.
+
+`RiskCheckedBroker` wraps any `BrokerAdapter` (E*TRADE, TD Ameritrade,
+TradeStation) so a violating order is rejected locally with its reasons,
+before an HTTP request is made.
+"""
+
+import math
+import threading
+import time
+from collections import Counter, deque
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from autohedge.account import AccountSnapshot
+from autohedge.tools.broker import (
+    Balances,
+    BrokerAdapter,
+    BrokerError,
+    BrokerOrder,
+    OrderAck,
+    Position,
+)
+
+
+class SymbolLimits(BaseModel):
+    max_order_quantity: float = math.inf
+    max_order_notional: float = math.inf
+    max_position: float = math.inf  # shares, long or short
+    collar: float = 0.1  # max limit/stop deviation from last trade
+    max_orders_per_minute: int = 0  # 0 = unlimited
+
+
+class RiskLimits(BaseModel):
+    default: SymbolLimits = Field(default_factory=SymbolLimits)
+    symbols: Dict[str, SymbolLimits] = Field(default_factory=dict)
+    max_gross_exposure: float = math.inf
+    max_orders_per_second: int = 0  # across symbols, 0 = unlimited
+    allowed_symbols: Optional[List[str]] = None  # None = any
+
+    @classmethod
+    def load(cls, path: str) -> "RiskLimits":
+        with open(path) as f:
+            return cls.model_validate_json(f.read())
+
+
+class RiskDecision(BaseModel):
+    accepted: bool
+    symbol: str
+    reasons: List[str] = Field(default_factory=list)
+
+
+class RiskRejection(BrokerError):
+    """An order failed pre-trade checks and was never sent."""
+
+    def __init__(self, broker: str, decision: RiskDecision):
+        super().__init__(
+            broker,
+            f"pre-trade check rejected {decision.symbol}: "
+            + "; ".join(decision.reasons),
+        )
+        self.decision = decision
+
+
+class SlidingWindowCounter:
+    """
+    Events in the last `window` seconds, counted in `buckets` slots so
+    both `add` and `count` are O(1) amortized.
+    """
+
+    def __init__(self, window: float, buckets: int = 20):
+        self.width = window / buckets
+        self.buckets = buckets
+        self._counts = [0] * buckets
+        self._slots = [-1] * buckets
+        self._total = 0
+        self._head = -1
+
+    def _advance(self, now: float) -> int:
+        slot = int(now / self.width)
+        if slot > self._head:
+            # Expire the slots between the last event and now
+            for s in range(
+                max(self._head + 1, slot - self.buckets + 1), slot + 1
+            ):
+                i = s % self.buckets
+                if self._slots[i] != s:
+                    self._total -= self._counts[i]
+                    self._counts[i] = 0
+                    self._slots[i] = s
+            self._head = slot
+        return slot
+
+    def count(self, now: float) -> int:
+        self._advance(now)
+        return self._total
+
+    def add(self, now: float, n: int = 1) -> None:
+        slot = self._advance(now)
+        self._counts[slot % self.buckets] += n
+        self._total += n
+
+
+class PreTradeRisk:
+    """
+    Thread-safe: `sync` runs on cycle threads while checks, acks and
+    fills arrive on the broker loop.
+
+    Args:
+        limits: Limit configuration; resolved into a per-symbol table.
+        clock: Time source for the rate windows.
+        history: Recent rejections kept in `rejections`.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[RiskLimits] = None,
+        clock=time.monotonic,
+        history: int = 1000,
+    ):
+        self.clock = clock
+        self.positions: Dict[str, float] = {}
+        self.working: Dict[str, float] = {}  # reserved or acked
+        self.reserved: Dict[str, float] = (
+            {}
+        )  # checked, not yet tracked
+        self.last_price: Dict[str, float] = {}
+        self._order_price: Dict[str, float] = {}
+        self._exposure: Dict[str, float] = {}
+        self.gross_exposure = 0.0
+        self.rejections: Deque[RiskDecision] = deque(maxlen=history)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self.set_limits(limits or RiskLimits())
+
+    def set_limits(self, limits: RiskLimits) -> None:
+        with self._lock:
+            self._set_limits(limits)
+
+    def _set_limits(self, limits: RiskLimits) -> None:
+        self.limits = limits
+        self._table: Dict[str, Tuple] = {}
+        self._default = self._row(limits.default)
+        for symbol, symbol_limits in limits.symbols.items():
+            self._table[symbol.upper()] = self._row(symbol_limits)
+        self._allowed = (
+            None
+            if limits.allowed_symbols is None
+            else {s.upper() for s in limits.allowed_symbols}
+        )
+        self._global_rate = SlidingWindowCounter(1.0)
+        self._symbol_rates: Dict[str, SlidingWindowCounter] = {}
+
+    @staticmethod
+    def _row(limits: SymbolLimits) -> Tuple:
+        return (
+            limits.max_order_quantity,
+            limits.max_order_notional,
+            limits.max_position,
+            limits.collar,
+            limits.max_orders_per_minute,
+        )
+
+    # Exposure counters
+
+    def _net(self, symbol: str) -> float:
+        return self.positions.get(symbol, 0.0) + self.working.get(
+            symbol, 0.0
+        )
+
+    def _reprice(self, symbol: str) -> None:
+        # Reservations made before any trade are priced at the order
+        price = self.last_price.get(symbol) or self._order_price.get(
+            symbol, 0.0
+        )
+        exposure = abs(self._net(symbol)) * price
+        self.gross_exposure += exposure - self._exposure.get(
+            symbol, 0.0
+        )
+        self._exposure[symbol] = exposure
+
+    def update_price(self, symbol: str, price: float) -> None:
+        with self._lock:
+            self.last_price[symbol] = price
+            self._reprice(symbol)
+
+    def sync(
+        self,
+        snapshot: AccountSnapshot,
+        open_orders: Optional[
+            Iterable[Tuple[BrokerOrder, float]]
+        ] = None,
+    ) -> None:
+        """
+        Reset positions (and prices where unknown) from an account
+        snapshot. Given the open orders with their filled quantities
+        (`OrderRouter.open_orders`), working quantities are rebuilt
+        from their unfilled remainders plus the reservations not yet
+        tracked; otherwise they are kept.
+        """
+        with self._lock:
+            self.positions = {
+                s: p.quantity for s, p in snapshot.positions.items()
+            }
+            if open_orders is not None:
+                self.working = {
+                    s: q for s, q in self.reserved.items() if q
+                }
+                for order, filled in open_orders:
+                    remaining = order.quantity - filled
+                    signed = (
+                        remaining
+                        if order.side == "BUY"
+                        else -remaining
+                    )
+                    self.working[order.symbol] = (
+                        self.working.get(order.symbol, 0.0) + signed
+                    )
+            for symbol, position in snapshot.positions.items():
+                if position.quantity and position.market_value:
+                    self.last_price.setdefault(
+                        symbol,
+                        abs(
+                            position.market_value / position.quantity
+                        ),
+                    )
+            self._exposure.clear()
+            self.gross_exposure = 0.0
+            for symbol in set(self.positions) | set(self.working):
+                self._reprice(symbol)
+
+    def _add_working(self, symbol: str, signed: float) -> None:
+        self.working[symbol] = self.working.get(symbol, 0.0) + signed
+        self._reprice(symbol)
+
+    def on_ack(
+        self, order: BrokerOrder, reserved: bool = False
+    ) -> None:
+        """
+        An order was accepted by the broker: count it as working. An
+        order reserved by `check` is already counted.
+        """
+        signed = (
+            order.quantity if order.side == "BUY" else -order.quantity
+        )
+        with self._lock:
+            if reserved:
+                self.reserved[order.symbol] = (
+                    self.reserved.get(order.symbol, 0.0) - signed
+                )
+            else:
+                self._add_working(order.symbol, signed)
+
+    def release(self, order: BrokerOrder) -> None:
+        """Drop the reservation of an order the broker never took."""
+        signed = (
+            order.quantity if order.side == "BUY" else -order.quantity
+        )
+        with self._lock:
+            self.reserved[order.symbol] = (
+                self.reserved.get(order.symbol, 0.0) - signed
+            )
+            self._add_working(order.symbol, -signed)
+
+    def on_fill(
+        self, symbol: str, side: str, quantity: float, price: float
+    ) -> None:
+        """Move a filled quantity from working to position."""
+        signed = quantity if side.upper() == "BUY" else -quantity
+        with self._lock:
+            self.working[symbol] = (
+                self.working.get(symbol, 0.0) - signed
+            )
+            self.positions[symbol] = (
+                self.positions.get(symbol, 0.0) + signed
+            )
+            self.last_price[symbol] = price
+            self._reprice(symbol)
+
+    def on_cancel(
+        self, order: BrokerOrder, filled: float = 0.0
+    ) -> None:
+        """Release the unfilled part of a working order."""
+        remaining = order.quantity - filled
+        signed = remaining if order.side == "BUY" else -remaining
+        with self._lock:
+            self._add_working(order.symbol, -signed)
+
+    # Checks
+
+    def check(
+        self,
+        order: Any,
+        now: Optional[float] = None,
+        reserve: bool = False,
+    ) -> RiskDecision:
+        """
+        Check an order (anything with BrokerOrder's fields). Accepted
+        orders count towards the rate limits and, with `reserve`,
+        towards working exposure until tracked (`on_ack`) or
+        released, so
+        concurrent submissions are checked against each other.
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            return self._check(order, now, reserve)
+
+    def _check(
+        self, order: Any, now: float, reserve: bool
+    ) -> RiskDecision:
+        symbol = order.symbol
+        (
+            max_quantity,
+            max_notional,
+            max_position,
+            collar,
+            per_minute,
+        ) = self._table.get(symbol, self._default)
+        reasons = []
+
+        if self._allowed is not None and symbol not in self._allowed:
+            reasons.append(f"{symbol} is not tradable")
+
+        if order.quantity > max_quantity:
+            reasons.append(
+                f"quantity {order.quantity} exceeds {max_quantity:g}"
+            )
+
+        # Share limits need no price
+        signed = (
+            order.quantity if order.side == "BUY" else -order.quantity
+        )
+        net = self._net(symbol) + signed
+        if abs(net) > max_position:
+            reasons.append(
+                f"position {net:g} would exceed {max_position:g}"
+            )
+
+        last = self.last_price.get(symbol)
+        price = order.limit_price or order.stop_price or last
+        if price is None:
+            if (
+                max_notional != math.inf
+                or self.limits.max_gross_exposure != math.inf
+            ):
+                reasons.append(f"no reference price for {symbol}")
+        else:
+            notional = order.quantity * price
+            if notional > max_notional:
+                reasons.append(
+                    f"notional {notional:,.2f} exceeds"
+                    f" {max_notional:,.2f}"
+                )
+            gross = (
+                self.gross_exposure
+                - self._exposure.get(symbol, 0.0)
+                + abs(net) * price
+            )
+            if gross > self.limits.max_gross_exposure:
+                reasons.append(
+                    f"gross exposure {gross:,.2f} would exceed "
+                    f"{self.limits.max_gross_exposure:,.2f}"
+                )
+
+        if last:
+            for label, level in (
+                ("limit", order.limit_price),
+                ("stop", order.stop_price),
+            ):
+                if (
+                    level is not None
+                    and abs(level - last) > collar * last
+                ):
+                    reasons.append(
+                        f"{label} price {level} outside"
+                        f" {collar:.0%} collar around last trade"
+                        f" {last}"
+                    )
+
+        rate = self.limits.max_orders_per_second
+        if rate and self._global_rate.count(now) >= rate:
+            reasons.append(f"more than {rate} orders per second")
+        symbol_rate = None
+        if per_minute:
+            symbol_rate = self._symbol_rates.get(symbol)
+            if symbol_rate is None:
+                symbol_rate = self._symbol_rates[symbol] = (
+                    SlidingWindowCounter(60.0)
+                )
+            if symbol_rate.count(now) >= per_minute:
+                reasons.append(
+                    f"more than {per_minute} {symbol} orders per"
+                    " minute"
+                )
+
+        decision = RiskDecision(
+            accepted=not reasons, symbol=symbol, reasons=reasons
+        )
+        if decision.accepted:
+            self.stats["accepted"] += 1
+            if rate:
+                self._global_rate.add(now)
+            if symbol_rate is not None:
+                symbol_rate.add(now)
+            if reserve:
+                if price is not None:
+                    self._order_price[symbol] = price
+                self.reserved[symbol] = (
+                    self.reserved.get(symbol, 0.0) + signed
+                )
+                self._add_working(symbol, signed)
+        else:
+            self.stats["rejected"] += 1
+            self.rejections.append(decision)
+            logger.bind(ticker=symbol).warning(
+                f"Pre-trade reject: {'; '.join(reasons)}"
+            )
+        return decision
+
+
+class RiskCheckedBroker(BrokerAdapter):
+    """
+    A broker adapter that runs `PreTradeRisk` before placing orders and
+    feeds acknowledgments, fills and cancels (reported through
+    `OrderRouter`) back into its exposure counters. Everything else is
+    delegated to the wrapped adapter.
+    """
+
+    def __init__(self, broker: BrokerAdapter, risk: PreTradeRisk):
+        super().__init__(
+            base_url=broker.base_url,
+            retries=broker.retries,
+            backoff=broker.backoff,
+        )
+        self.broker = broker
+        self.risk = risk
+        self.name = broker.name
+        # Requests go through the wrapped adapter; report its counters
+        self.stats = broker.stats
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.broker, name)
+
+    @property
+    def session(self):
+        return self.broker.session
+
+    async def place_order(self, order: BrokerOrder) -> OrderAck:
+        decision = self.risk.check(order, reserve=True)
+        if not decision.accepted:
+            raise RiskRejection(self.name, decision)
+        try:
+            ack = await self.broker.place_order(order)
+        except BrokerError:
+            self.risk.release(order)
+            raise
+        return ack
+
+    def on_ack(self, order: BrokerOrder, ack: OrderAck) -> None:
+        self.risk.on_ack(order, reserved=True)
+        self.broker.on_ack(order, ack)
+
+    def on_fill(
+        self, order: BrokerOrder, quantity: float, price: float
+    ) -> None:
+        self.risk.on_fill(order.symbol, order.side, quantity, price)
+        self.broker.on_fill(order, quantity, price)
+
+    def on_cancel(
+        self, order: BrokerOrder, filled: float = 0.0
+    ) -> None:
+        self.risk.on_cancel(order, filled)
+        self.broker.on_cancel(order, filled)
+
+    async def confirm_order(
+        self, order: BrokerOrder
+    ) -> Dict[str, Any]:
+        return await self.broker.confirm_order(order)
+
+    async def cancel_order(self, order_id: str) -> Dict[str, Any]:
+        return await self.broker.cancel_order(order_id)
+
+    async def get_positions(self) -> List[Position]:
+        return await self.broker.get_positions()
+
+    async def get_balances(self) -> Balances:
+        return await self.broker.get_balances()
+
+    async def close(self) -> None:
+        await self.broker.close()
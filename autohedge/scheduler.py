@@ -0,0 +1,290 @@
+"""
+Continuous scheduling with change-triggered re-evaluation.
+
+`ContinuousScheduler` runs trading cycles on a fixed interval but only
+sends a ticker back through the agent pipeline when one of its inputs
+changed materially since the last evaluation:
+
+- the price moved more than ``atr_multiple`` x ATR,
+- new news items appeared,
+- the previous decision is older than ``decision_ttl`` seconds,
+- the previous evaluation was degraded (stages skipped), or
+- the task text changed.
+
+Everything else reuses the previous `AutoHedgeOutput`. Re-evaluations go
+through `AutoHedge.analyze_stock` like a normal cycle (coalescing,
+account snapshot, deadline budgets) and their new orders are routed;
+reused outputs are never routed again. The hedge's conversation and
+cycle log only hold the latest output per ticker, so they stay bounded
+however long the scheduler runs.
+"""
+
+import threading
+import time
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from autohedge.config import settings
+from autohedge.deadline import Deadline
+from autohedge.screener import PriceCache
+from autohedge.utils import AutoHedgeOutput, setup_logging
+
+# ticker list -> {ticker: (last_price, atr)}
+PriceSource = Callable[[List[str]], Dict[str, Tuple[float, float]]]
+# ticker -> ids of the news items currently known for it
+NewsSource = Callable[[str], Iterable[str]]
+
+
+class TickerState(BaseModel):
+    ticker: str
+    task: str
+    price: Optional[float] = None
+    atr: Optional[float] = None
+    news_ids: List[str] = Field(default_factory=list)
+    evaluated_at: float
+    output: AutoHedgeOutput
+
+
+def price_cache_source(
+    cache: Union[PriceCache, str],
+    window: int = 14,
+    on_reload: Optional[Callable[[PriceCache], None]] = None,
+) -> PriceSource:
+    """
+    Build a PriceSource from a PriceCache (the screener's cache works),
+    or from the path of one saved with `PriceCache.save`. A path is
+    reloaded whenever the file changes, e.g. when a market data job
+    rewrites it, and `on_reload` gets the new cache.
+    """
+    path = None if isinstance(cache, PriceCache) else Path(cache)
+    state = {"cache": cache if path is None else None, "mtime": None}
+
+    def current() -> PriceCache:
+        if path is not None:
+            mtime = path.stat().st_mtime_ns
+            if mtime != state["mtime"]:
+                state["cache"] = PriceCache.load(str(path))
+                state["mtime"] = mtime
+                if on_reload is not None:
+                    on_reload(state["cache"])
+        return state["cache"]
+
+    def source(tickers: List[str]) -> Dict[str, Tuple[float, float]]:
+        cache = current()
+        rows = cache.rows(tickers)
+        if len(rows) == 0:
+            return {}
+        prices = cache.closes[rows, -1]
+        atrs = cache.atr(window, rows)
+        return {
+            cache.tickers[row]: (float(price), float(atr))
+            for row, price, atr in zip(rows, prices, atrs)
+        }
+
+    return source
+
+
+class ContinuousScheduler:
+    """
+    Daemon that re-runs the per-stock pipeline only for changed tickers.
+    """
+
+    def __init__(
+        self,
+        hedge,
+        task: str,
+        interval: float = 300.0,
+        atr_multiple: float = 1.0,
+        decision_ttl: float = 3600.0,
+        price_source: Optional[PriceSource] = None,
+        news_source: Optional[NewsSource] = None,
+        price_cache_path: Optional[str] = None,
+        deadline: Optional[float] = None,
+    ):
+        self.hedge = hedge
+        self.task = task
+        self.interval = interval
+        self.atr_multiple = atr_multiple
+        self.decision_ttl = decision_ttl
+        self.price_source = price_source
+        self.news_source = news_source
+        self.deadline = deadline or settings.CYCLE_DEADLINE or None
+        screener = getattr(hedge, "screener", None)
+        if price_source is None and price_cache_path:
+            # Keep the screener on the same, fresh bars
+            self.price_source = price_cache_source(
+                price_cache_path,
+                on_reload=(
+                    (lambda cache: setattr(screener, "cache", cache))
+                    if screener is not None
+                    else None
+                ),
+            )
+        elif price_source is None and screener is not None:
+            logger.warning(
+                "Price trigger uses the screener's in-memory cache,"
+                " which only changes if updated externally; pass"
+                " price_cache_path or price_source for live prices"
+            )
+            self.price_source = price_cache_source(screener.cache)
+        if news_source is None and getattr(hedge, "news", None):
+            self.news_source = hedge.news.item_ids
+
+        self.state: Dict[str, TickerState] = {}
+        self.cycles = 0
+        self.last_cycle_stats: Dict[str, int] = {}
+        self._stop = threading.Event()
+
+    def triggers(
+        self,
+        ticker: str,
+        price: Optional[Tuple[float, float]],
+        news_ids: List[str],
+        now: float,
+    ) -> List[str]:
+        """
+        Reasons the ticker must be re-evaluated; empty if it can be reused.
+        """
+        previous = self.state.get(ticker)
+        if previous is None:
+            return ["new"]
+
+        reasons = []
+        if previous.task != self.task:
+            reasons.append("task")
+        if now - previous.evaluated_at >= self.decision_ttl:
+            reasons.append("ttl")
+        if price is not None and previous.price is not None:
+            last_price, _ = price
+            atr = previous.atr or 0.0
+            move = abs(last_price - previous.price)
+            if atr > 0 and move > self.atr_multiple * atr:
+                reasons.append("price")
+        if set(news_ids) - set(previous.news_ids):
+            reasons.append("news")
+        if previous.output.skipped_stages:
+            reasons.append("degraded")
+        return reasons
+
+    def run_cycle(self) -> Dict[str, AutoHedgeOutput]:
+        """
+        Run one scheduled cycle and return the current output per ticker.
+        """
+        now = time.time()
+        cycle = Deadline(self.deadline) if self.deadline else None
+        stocks = self.hedge.select_stocks()
+        prices = (
+            self.price_source(stocks) if self.price_source else {}
+        )
+
+        results = {}
+        changed = []
+        for stock in stocks:
+            price = prices.get(stock)
+            news_ids = (
+                list(self.news_source(stock))
+                if self.news_source
+                else []
+            )
+            reasons = self.triggers(stock, price, news_ids, now)
+            if reasons:
+                changed.append((stock, price, news_ids, reasons))
+            else:
+                results[stock] = self.state[stock].output
+
+        account = self.hedge.cycle_snapshot() if changed else None
+        fresh = []
+        for i, (stock, price, news_ids, reasons) in enumerate(
+            changed
+        ):
+            logger.bind(ticker=stock, stage="schedule").info(
+                f"Re-evaluating {stock}: {', '.join(reasons)}"
+            )
+            try:
+                output = self.hedge.analyze_stock(
+                    stock,
+                    self.task,
+                    account,
+                    cycle.share(len(changed) - i) if cycle else None,
+                )
+            except Exception as e:
+                logger.bind(ticker=stock).error(
+                    f"Scheduled evaluation of {stock} failed: {e}"
+                )
+                output = None
+            if output is None or output.timed_out:
+                # Keep serving the last good decision, retry next cycle
+                if stock in self.state:
+                    results[stock] = self.state[stock].output
+                elif output is not None:
+                    results[stock] = output
+                continue
+
+            fresh.append(output)
+            self.state[stock] = TickerState(
+                ticker=stock,
+                task=self.task,
+                price=price[0] if price else None,
+                atr=price[1] if price else None,
+                news_ids=news_ids,
+                evaluated_at=time.time(),
+                output=output,
+            )
+            results[stock] = output
+
+        self.hedge.route_orders(fresh)
+        rerun = len(fresh)
+
+        # Forget tickers that dropped out of the universe
+        dropped = set(self.state) - set(stocks)
+        for stock in dropped:
+            del self.state[stock]
+
+        if fresh or dropped:
+            self.hedge.reset_history(self.task)
+            for output in results.values():
+                self.hedge.record(output)
+
+        self.cycles += 1
+        self.last_cycle_stats = {
+            "tickers": len(stocks),
+            "rerun": rerun,
+            "reused": len(results) - rerun,
+            "failed": len(changed) - rerun,
+        }
+        logger.info(
+            f"Scheduled cycle {self.cycles}:"
+            f" {rerun}/{len(stocks)} tickers re-evaluated"
+        )
+        return results
+
+    def run_forever(self, max_cycles: Optional[int] = None) -> None:
+        """
+        Run cycles every `interval` seconds until `stop` is called.
+        """
+        setup_logging()
+        self._stop.clear()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logger.error(f"Scheduled cycle failed: {e}")
+            if max_cycles is not None and self.cycles >= max_cycles:
+                return
+            elapsed = time.monotonic() - started
+            self._stop.wait(max(0.0, self.interval - elapsed))
+
+    def stop(self) -> None:
+        self._stop.set()
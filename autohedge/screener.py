@@ -0,0 +1,382 @@
+import ast
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+_ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.Pow,
+    ast.USub,
+    ast.UAdd,
+    ast.BitAnd,
+    ast.BitOr,
+    ast.Invert,
+    ast.Gt,
+    ast.GtE,
+    ast.Lt,
+    ast.LtE,
+)
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    """Cross-sectional z-score that ignores NaNs."""
+    if not np.isfinite(values).any():
+        return np.zeros_like(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.nanstd(values)
+        if not np.isfinite(std) or std == 0:
+            return np.zeros_like(values)
+        return (values - np.nanmean(values)) / std
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """Cross-sectional percentile rank in [0, 1]; NaNs stay NaN."""
+    ranks = np.full(values.shape, np.nan)
+    finite = np.isfinite(values)
+    count = int(finite.sum())
+    if count:
+        order = values[finite].argsort().argsort()
+        ranks[finite] = order / max(count - 1, 1)
+    return ranks
+
+
+# Functions usable inside custom factor / filter expressions
+EXPRESSION_FUNCTIONS: Dict[str, Callable] = {
+    "abs": np.abs,
+    "log": np.log,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "sign": np.sign,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+    "clip": np.clip,
+    "where": np.where,
+    "rank": _rank,
+    "zscore": _zscore,
+}
+
+
+def compile_expression(expression: str, names: List[str]):
+    """
+    Validate and compile a factor expression such as
+    ``"momentum / volatility"`` or ``"(liquidity > 6) & (gap < 0.05)"``.
+
+    Only arithmetic, comparisons, the names given and the functions in
+    EXPRESSION_FUNCTIONS are permitted.
+    """
+    tree = ast.parse(expression, mode="eval")
+    allowed = set(names) | set(EXPRESSION_FUNCTIONS)
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(
+                f"Unsupported syntax in expression {expression!r}: "
+                f"{type(node).__name__}"
+            )
+        if isinstance(node, ast.Name) and node.id not in allowed:
+            raise ValueError(
+                f"Unknown name {node.id!r} in expression"
+                f" {expression!r}"
+            )
+        if isinstance(node, ast.Call) and not (
+            isinstance(node.func, ast.Name)
+            and node.func.id in EXPRESSION_FUNCTIONS
+        ):
+            raise ValueError(
+                f"Only {sorted(EXPRESSION_FUNCTIONS)} may be called"
+                f" in expression {expression!r}"
+            )
+    return compile(tree, "<factor>", "eval")
+
+
+class PriceCache:
+    """
+    Aligned price/volume history for a ticker universe.
+
+    Every array has shape ``(n_tickers, n_bars)`` with the most recent bar
+    last. Missing bars are NaN.
+    """
+
+    def __init__(
+        self,
+        tickers: List[str],
+        closes: np.ndarray,
+        volumes: np.ndarray,
+        opens: Optional[np.ndarray] = None,
+        highs: Optional[np.ndarray] = None,
+        lows: Optional[np.ndarray] = None,
+    ):
+        self.tickers = list(tickers)
+        self.closes = np.asarray(closes, dtype=np.float64)
+        self.volumes = np.asarray(volumes, dtype=np.float64)
+        self.opens = (
+            None
+            if opens is None
+            else np.asarray(opens, dtype=np.float64)
+        )
+        self.highs = (
+            None
+            if highs is None
+            else np.asarray(highs, dtype=np.float64)
+        )
+        self.lows = (
+            None
+            if lows is None
+            else np.asarray(lows, dtype=np.float64)
+        )
+        self.index = {t: i for i, t in enumerate(self.tickers)}
+
+        if self.closes.shape != self.volumes.shape:
+            raise ValueError(
+                "closes and volumes must have the same shape"
+            )
+        if self.closes.shape[0] != len(self.tickers):
+            raise ValueError(
+                "one row of prices is required per ticker"
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "PriceCache":
+        """
+        Load a cache previously written with `save`.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                tickers=data["tickers"].tolist(),
+                closes=data["closes"],
+                volumes=data["volumes"],
+                opens=data["opens"] if "opens" in data else None,
+                highs=data["highs"] if "highs" in data else None,
+                lows=data["lows"] if "lows" in data else None,
+            )
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "tickers": np.asarray(self.tickers),
+            "closes": self.closes,
+            "volumes": self.volumes,
+        }
+        for name in ("opens", "highs", "lows"):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        np.savez(path, **arrays)
+
+    def rows(self, tickers: List[str]) -> np.ndarray:
+        """
+        Row indices for the tickers that are present in the cache.
+        """
+        return np.array(
+            [self.index[t] for t in tickers if t in self.index],
+            dtype=np.intp,
+        )
+
+    def last_price(self, ticker: str) -> float:
+        return float(self.closes[self.index[ticker], -1])
+
+    def atr(
+        self, window: int = 14, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Average true range per ticker over the trailing window.
+        Falls back to the mean absolute close-to-close move when
+        highs/lows are not cached.
+        """
+        rows = slice(None) if rows is None else rows
+        closes = self.closes[rows, -(window + 1) :]
+        n = closes.shape[1] - 1
+        if n < 1:
+            # A single bar has no previous close
+            if self.highs is None or self.lows is None:
+                return np.full(closes.shape[0], np.nan)
+            return self.highs[rows, -1] - self.lows[rows, -1]
+        prev_close = closes[:, :-1]
+        if self.highs is None or self.lows is None:
+            true_range = np.abs(np.diff(closes, axis=1))
+        else:
+            highs = self.highs[rows, -n:]
+            lows = self.lows[rows, -n:]
+            true_range = np.maximum.reduce([
+                highs - lows,
+                np.abs(highs - prev_close),
+                np.abs(lows - prev_close),
+            ])
+        return np.nanmean(true_range, axis=1)
+
+
+class UniverseScreener:
+    """
+    Scores a whole ticker universe locally from a PriceCache and keeps
+    only the names worth sending through the agent pipeline.
+
+    The composite score is a weighted sum of cross-sectional z-scores of
+    the built-in factors (momentum, volatility, liquidity, gap, atr_pct)
+    and any custom factors given as expressions over them.
+    """
+
+    def __init__(
+        self,
+        cache: PriceCache,
+        weights: Optional[Dict[str, float]] = None,
+        factors: Optional[Dict[str, str]] = None,
+        filter_expression: Optional[str] = None,
+        top_k: Optional[int] = 25,
+        min_score: Optional[float] = None,
+        lookback: int = 20,
+    ):
+        self.cache = cache
+        self.weights = weights or {
+            "momentum": 1.0,
+            "volatility": -0.5,
+            "liquidity": 0.5,
+        }
+        self.top_k = top_k
+        self.min_score = min_score
+        self.lookback = lookback
+
+        base = [
+            "momentum",
+            "volatility",
+            "liquidity",
+            "gap",
+            "atr_pct",
+        ]
+        self.factor_code = {}
+        for name, expression in (factors or {}).items():
+            self.factor_code[name] = compile_expression(
+                expression, base + list(self.factor_code)
+            )
+        self.filter_code = (
+            compile_expression(
+                filter_expression, base + list(self.factor_code)
+            )
+            if filter_expression
+            else None
+        )
+
+        unknown = (
+            set(self.weights) - set(base) - set(self.factor_code)
+        )
+        if unknown:
+            raise ValueError(
+                f"Weights given for unknown factors: {unknown}"
+            )
+
+        self.last_scores: Dict[str, float] = {}
+
+    def compute_factors(
+        self, rows: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Compute every factor for the selected cache rows in one pass.
+        """
+        lb = self.lookback
+        closes = self.cache.closes[rows]
+        volumes = self.cache.volumes[rows]
+        window = closes[:, -(lb + 1) :]
+
+        n_bars = closes.shape[1]
+        missing = np.full(len(rows), np.nan)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            log_returns = np.diff(np.log(window), axis=1)
+            factors = {
+                "momentum": window[:, -1] / window[:, 0] - 1.0,
+                "volatility": (
+                    np.nanstd(log_returns, axis=1)
+                    if n_bars >= 2
+                    else missing
+                ),
+                "liquidity": np.log10(
+                    np.nanmean(
+                        closes[:, -lb:] * volumes[:, -lb:], axis=1
+                    )
+                ),
+                "atr_pct": self.cache.atr(lb, rows) / closes[:, -1],
+            }
+            if self.cache.opens is not None and n_bars >= 2:
+                factors["gap"] = (
+                    self.cache.opens[rows, -1] / closes[:, -2] - 1.0
+                )
+            else:
+                factors["gap"] = np.zeros(len(rows))
+
+            namespace = dict(EXPRESSION_FUNCTIONS)
+            for name, code in self.factor_code.items():
+                namespace.update(factors)
+                factors[name] = np.asarray(
+                    eval(code, {"__builtins__": {}}, namespace),
+                    dtype=np.float64,
+                )
+        return factors
+
+    def score(self, tickers: List[str]) -> Dict[str, float]:
+        """
+        Composite score for every cached ticker that passes the filter.
+        """
+        rows = self.cache.rows(tickers)
+        if len(rows) == 0:
+            return {}
+
+        factors = self.compute_factors(rows)
+        composite = np.zeros(len(rows))
+        for name, weight in self.weights.items():
+            composite += weight * np.nan_to_num(
+                _zscore(factors[name])
+            )
+
+        keep = np.isfinite(factors["momentum"])
+        if self.filter_code is not None:
+            namespace = dict(EXPRESSION_FUNCTIONS)
+            namespace.update(factors)
+            with np.errstate(invalid="ignore"):
+                keep &= np.asarray(
+                    eval(
+                        self.filter_code,
+                        {"__builtins__": {}},
+                        namespace,
+                    ),
+                    dtype=bool,
+                )
+        if self.min_score is not None:
+            keep &= composite >= self.min_score
+
+        names = [self.cache.tickers[i] for i in rows]
+        return {
+            names[i]: float(composite[i])
+            for i in np.flatnonzero(keep)
+        }
+
+    def screen(self, tickers: List[str]) -> List[str]:
+        """
+        Return the tickers to analyse, best score first.
+        """
+        missing = [t for t in tickers if t not in self.cache.index]
+        if missing:
+            logger.warning(
+                "Screener has no cached data for"
+                f" {len(missing)} tickers; skipping {missing[:10]}"
+            )
+
+        scores = self.score(tickers)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        if self.top_k is not None:
+            ranked = ranked[: self.top_k]
+
+        self.last_scores = {t: scores[t] for t in ranked}
+        logger.info(
+            f"Screened {len(tickers)} tickers down to {len(ranked)}"
+        )
+        return ranked
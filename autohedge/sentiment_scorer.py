@@ -0,0 +1,374 @@
+"""
+Local lexicon-based sentiment scoring.
+
+`LexiconSentimentScorer` scores news text on the same 0-1 scale the
+SENTIMENT_PROMPT asks the LLM for (0 extremely negative, 1 extremely
+positive). Tokens of a whole batch are scored in one numpy pass with
+negation handling, so the full universe can be scored locally and only
+ambiguous or high-impact news needs the LLM.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+# Compact finance lexicon in the spirit of Loughran-McDonald; weights in [-1, 1]
+FINANCE_LEXICON: Dict[str, float] = {
+    # positive
+    "beat": 1.0,
+    "beats": 1.0,
+    "exceeded": 0.8,
+    "exceeds": 0.8,
+    "surge": 1.0,
+    "surges": 1.0,
+    "surged": 1.0,
+    "soar": 1.0,
+    "soars": 1.0,
+    "soared": 1.0,
+    "rally": 0.8,
+    "rallies": 0.8,
+    "gain": 0.6,
+    "gains": 0.6,
+    "gained": 0.6,
+    "rise": 0.5,
+    "rises": 0.5,
+    "rose": 0.5,
+    "jump": 0.7,
+    "jumps": 0.7,
+    "jumped": 0.7,
+    "upgrade": 1.0,
+    "upgraded": 1.0,
+    "outperform": 0.8,
+    "record": 0.6,
+    "growth": 0.6,
+    "grew": 0.6,
+    "profit": 0.6,
+    "profitable": 0.7,
+    "strong": 0.6,
+    "stronger": 0.6,
+    "robust": 0.6,
+    "bullish": 1.0,
+    "optimistic": 0.7,
+    "raise": 0.4,
+    "raised": 0.4,
+    "buyback": 0.6,
+    "dividend": 0.4,
+    "expansion": 0.5,
+    "approval": 0.7,
+    "approved": 0.7,
+    "partnership": 0.4,
+    "innovative": 0.4,
+    "momentum": 0.4,
+    "upside": 0.6,
+    "recovery": 0.5,
+    "rebound": 0.6,
+    # negative
+    "miss": -1.0,
+    "misses": -1.0,
+    "missed": -1.0,
+    "plunge": -1.0,
+    "plunges": -1.0,
+    "plunged": -1.0,
+    "slump": -0.9,
+    "slumped": -0.9,
+    "fall": -0.5,
+    "falls": -0.5,
+    "fell": -0.5,
+    "drop": -0.6,
+    "drops": -0.6,
+    "dropped": -0.6,
+    "decline": -0.6,
+    "declines": -0.6,
+    "declined": -0.6,
+    "downgrade": -1.0,
+    "downgraded": -1.0,
+    "underperform": -0.8,
+    "loss": -0.7,
+    "losses": -0.7,
+    "weak": -0.6,
+    "weaker": -0.6,
+    "bearish": -1.0,
+    "pessimistic": -0.7,
+    "cut": -0.5,
+    "cuts": -0.5,
+    "layoffs": -0.7,
+    "lawsuit": -0.7,
+    "recall": -0.8,
+    "probe": -0.7,
+    "investigation": -0.8,
+    "fraud": -1.0,
+    "fined": -0.7,
+    "bankruptcy": -1.0,
+    "defaulted": -0.9,
+    "warning": -0.6,
+    "delay": -0.5,
+    "delayed": -0.5,
+    "shortfall": -0.8,
+    "risk": -0.3,
+    "downside": -0.6,
+    "volatile": -0.3,
+    "selloff": -0.8,
+    "crash": -1.0,
+}
+
+# Terms that can move a stock far more than their lexicon weight suggests
+HIGH_IMPACT_TERMS = frozenset({
+    "bankruptcy",
+    "fraud",
+    "merger",
+    "acquisition",
+    "acquire",
+    "acquires",
+    "takeover",
+    "investigation",
+    "probe",
+    "guidance",
+    "delisting",
+    "defaulted",
+    "restatement",
+    "resigns",
+    "resignation",
+    "subpoena",
+    "recall",
+    "halted",
+    "doj",
+    "antitrust",
+})
+
+# Multi-word triggers whose words are too ambiguous alone ("by default",
+# "30 sec")
+HIGH_IMPACT_PHRASES = (
+    "sec investigation",
+    "sec probe",
+    "sec charges",
+    "sec lawsuit",
+    "sec settlement",
+    "sec subpoena",
+    "securities and exchange commission",
+    "debt default",
+    "loan default",
+    "bond default",
+    "payment default",
+    "defaults on",
+    "default on its",
+)
+
+NEGATIONS = frozenset({
+    "not",
+    "no",
+    "never",
+    "without",
+    "neither",
+    "nor",
+    "cannot",
+    "didn't",
+    "doesn't",
+    "don't",
+    "isn't",
+    "wasn't",
+    "aren't",
+    "won't",
+    "fails",
+    "failed",
+    "lack",
+    "lacks",
+})
+
+_TOKEN_RE = re.compile(r"[a-z][a-z']*")
+
+
+class SentimentScore(BaseModel):
+    score: float = 0.5
+    positive: float = 0.0
+    negative: float = 0.0
+    hits: int = 0
+    themes: List[str] = Field(default_factory=list)
+    high_impact: List[str] = Field(default_factory=list)
+    escalate: bool = False
+    reason: Optional[str] = None
+
+
+class LexiconSentimentScorer:
+    """
+    Vectorized lexicon scorer with negation handling and an escalation
+    rule for cases the LLM should still look at.
+
+    Args:
+        lexicon: term -> polarity weight in [-1, 1].
+        negation_window: tokens after a negation whose polarity is flipped.
+        smoothing: damps scores computed from only a few hits.
+        ambiguity_margin: mixed news whose raw score lies within this
+            distance of neutral is escalated.
+        min_mixed_hits: hits required on both sides before news counts
+            as mixed rather than thin.
+    """
+
+    def __init__(
+        self,
+        lexicon: Dict[str, float] = None,
+        high_impact_terms: Iterable[str] = HIGH_IMPACT_TERMS,
+        high_impact_phrases: Iterable[str] = HIGH_IMPACT_PHRASES,
+        negation_window: int = 3,
+        smoothing: float = 2.0,
+        ambiguity_margin: float = 0.3,
+        min_mixed_hits: int = 2,
+    ):
+        self.lexicon = dict(lexicon or FINANCE_LEXICON)
+        self.high_impact_terms = frozenset(high_impact_terms)
+        phrases = sorted(high_impact_phrases, key=len, reverse=True)
+        self._phrase_re = (
+            re.compile(
+                r"\b(?:"
+                + "|".join(
+                    r"\s+".join(map(re.escape, p.split()))
+                    for p in phrases
+                )
+                + r")\b"
+            )
+            if phrases
+            else None
+        )
+        self.negation_window = negation_window
+        self.smoothing = smoothing
+        self.ambiguity_margin = ambiguity_margin
+        self.min_mixed_hits = min_mixed_hits
+
+    def score_many(self, texts: List[str]) -> List[SentimentScore]:
+        """
+        Score a batch of documents in one vectorized pass.
+        """
+        if not texts:
+            return []
+
+        tokens: List[str] = []
+        doc_ids: List[int] = []
+        phrase_hits: List[List[str]] = [[] for _ in texts]
+        for i, text in enumerate(texts):
+            lowered = text.lower()
+            if self._phrase_re is not None:
+                phrase_hits[i] = [
+                    " ".join(m.split())
+                    for m in self._phrase_re.findall(lowered)
+                ]
+            doc_tokens = _TOKEN_RE.findall(lowered)
+            tokens.extend(doc_tokens)
+            doc_ids.extend([i] * len(doc_tokens))
+
+        n_docs = len(texts)
+        if not tokens:
+            return [SentimentScore() for _ in texts]
+
+        lexicon_get = self.lexicon.get
+        weights = np.fromiter(
+            (lexicon_get(t, 0.0) for t in tokens),
+            dtype=np.float64,
+            count=len(tokens),
+        )
+        negation = np.fromiter(
+            (t in NEGATIONS for t in tokens),
+            dtype=bool,
+            count=len(tokens),
+        )
+        docs = np.asarray(doc_ids, dtype=np.intp)
+        positions = np.arange(len(tokens))
+
+        # Index of the latest negation at or before each token
+        last_negation = np.maximum.accumulate(
+            np.where(negation, positions, -1)
+        )
+        doc_start = np.zeros(n_docs, dtype=np.intp)
+        starts = np.flatnonzero(np.r_[True, docs[1:] != docs[:-1]])
+        doc_start[docs[starts]] = starts
+        negated = (
+            (last_negation >= doc_start[docs])
+            & (positions - last_negation <= self.negation_window)
+            & ~negation
+        )
+        weights = np.where(negated, -weights, weights)
+
+        positive = np.bincount(
+            docs, weights=np.clip(weights, 0, None), minlength=n_docs
+        )
+        negative = np.bincount(
+            docs, weights=np.clip(-weights, 0, None), minlength=n_docs
+        )
+        pos_hits = np.bincount(
+            docs, weights=weights > 0, minlength=n_docs
+        )
+        neg_hits = np.bincount(
+            docs, weights=weights < 0, minlength=n_docs
+        )
+        raw = (positive - negative) / (
+            positive + negative + self.smoothing
+        )
+        scores = (raw + 1.0) / 2.0
+
+        hit_idx = np.flatnonzero(weights != 0)
+        impact_idx = [
+            i
+            for i, t in enumerate(tokens)
+            if t in self.high_impact_terms
+        ]
+        themes: List[List[str]] = [[] for _ in texts]
+        impact: List[List[str]] = [
+            list(dict.fromkeys(hits)) for hits in phrase_hits
+        ]
+        for i in hit_idx:
+            themes[docs[i]].append(tokens[i])
+        for i in impact_idx:
+            if tokens[i] not in impact[docs[i]]:
+                impact[docs[i]].append(tokens[i])
+
+        results = []
+        for d in range(n_docs):
+            reason = None
+            if impact[d]:
+                reason = f"high-impact terms: {', '.join(impact[d])}"
+            elif (
+                pos_hits[d] >= self.min_mixed_hits
+                and neg_hits[d] >= self.min_mixed_hits
+                and abs(raw[d]) < self.ambiguity_margin
+            ):
+                reason = "mixed positive and negative signals"
+            results.append(
+                SentimentScore(
+                    score=round(float(scores[d]), 4),
+                    positive=float(positive[d]),
+                    negative=float(negative[d]),
+                    hits=int(pos_hits[d] + neg_hits[d]),
+                    themes=sorted(set(themes[d])),
+                    high_impact=impact[d],
+                    escalate=reason is not None,
+                    reason=reason,
+                )
+            )
+        return results
+
+    def score(self, text: str) -> SentimentScore:
+        return self.score_many([text])[0]
+
+
+def format_local_analysis(result: SentimentScore) -> str:
+    """
+    Render a local score in the layout the SENTIMENT_PROMPT asks for.
+    """
+    if result.score >= 0.6:
+        label = "positive"
+    elif result.score <= 0.4:
+        label = "negative"
+    else:
+        label = "neutral"
+    themes = (
+        ", ".join(result.themes) if result.themes else "none detected"
+    )
+    return (
+        f"Overall Sentiment Score: {result.score:.2f}\n"
+        f"Sentiment: {label} ({result.hits} lexicon hits, "
+        f"positive weight {result.positive:.2f}, "
+        f"negative weight {result.negative:.2f})\n"
+        f"Key Themes: {themes}\n"
+        "Method: local lexicon scorer; no ambiguous or high-impact "
+        "signals required LLM escalation."
+    )
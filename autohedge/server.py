@@ -0,0 +1,630 @@
+"""
+Service mode: one warm AutoHedge process shared over HTTP.
+
+``POST /cycles`` validates a request (stocks, task, optional strategy),
+puts it on a bounded async job queue and returns its job id at once; a
+full queue answers 503. A fixed pool of workers runs cycles on warm,
+pooled AutoHedge instances (agents are never shared by two analyses at
+once) and publishes an event as every agent stage finishes. Identical
+per-ticker analyses from concurrent cycles are coalesced into one run
+(see `autohedge.coalesce`), and ``DELETE /cycles/{id}`` cancels a
+cycle. Cycles execute like `AutoHedge.run`: one `cycle_snapshot` (which
+syncs the pre-trade counters) at the start, `route_orders` for the
+approved orders at the end, with the cycle's ``deadline`` shared by
+the tickers still to run. Outputs are kept on the job, not in the
+pooled hedges' conversation logs. ``GET /cycles/{id}/events`` streams those events as
+Server-Sent Events (replaying what already happened, resumable with
+``Last-Event-ID``); ``GET /cycles/{id}`` returns status and results and
+``GET /metrics`` queue and latency figures.
+
+Run with ``python -m autohedge.server`` (see the ``SERVER_*`` settings).
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from pydantic import BaseModel, Field, field_validator
+
+from autohedge.coalesce import AnalysisCoalescer, Ticket
+from autohedge.config import settings
+from autohedge.deadline import Deadline
+from autohedge.orders import RoutingReport
+from autohedge.utils import AutoHedgeOutput, setup_logging
+
+
+class CycleRequest(BaseModel):
+    stocks: List[str] = Field(min_length=1)
+    task: str = Field(min_length=1)
+    strategy: Optional[str] = None
+    # Seconds for the whole cycle; defaults to CYCLE_DEADLINE
+    deadline: Optional[float] = Field(default=None, gt=0)
+
+    @field_validator("stocks")
+    @classmethod
+    def _normalize(cls, stocks: List[str]) -> List[str]:
+        return list(
+            dict.fromkeys(
+                s.strip().upper() for s in stocks if s.strip()
+            )
+        )
+
+
+class CycleEvent(BaseModel):
+    id: int
+    event: str  # status, stage, result, error, routing
+    data: Dict[str, Any]
+
+
+class CycleJob:
+    def __init__(self, request: CycleRequest):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.results: List[AutoHedgeOutput] = []
+        self.routing: Optional[RoutingReport] = None
+        self.errors: Dict[str, str] = {}
+        self.events: List[CycleEvent] = []
+        self.changed = asyncio.Condition()
+        self.cancel_requested = False
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stocks": self.request.stocks,
+            "task": self.request.task,
+            "strategy": self.request.strategy,
+            "deadline": self.request.deadline,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "completed": len(self.results),
+            "errors": self.errors,
+        }
+
+
+def default_hedge_factory():
+    from autohedge.main import AutoHedge
+
+    return AutoHedge(stocks=[], output_dir=settings.OUTPUT_DIR)
+
+
+class CycleService:
+    """
+    Args:
+        hedge_factory: Builds the pooled AutoHedge instances (or anything
+            with `process_stock`), at most one per worker, on demand.
+        workers: Cycles run concurrently.
+        queue_size: Cycles waiting beyond the running ones.
+        max_jobs: Finished jobs kept for ``GET /cycles/{id}``.
+        coalescer: Shares identical per-ticker analyses across cycles;
+            its thread pool bounds how many run at once.
+    """
+
+    def __init__(
+        self,
+        hedge_factory: Callable[[], Any] = default_hedge_factory,
+        workers: int = settings.SERVER_WORKERS,
+        queue_size: int = settings.SERVER_QUEUE_SIZE,
+        max_jobs: int = settings.SERVER_MAX_JOBS,
+        coalescer: Optional[AnalysisCoalescer] = None,
+    ):
+        self.hedge_factory = hedge_factory
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, CycleJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.busy = 0
+        self.counters = defaultdict(int)
+        self._cycle_seconds = 0.0
+        self._stage_seconds: Dict[str, float] = defaultdict(float)
+        self._stage_counts: Dict[str, int] = defaultdict(int)
+        self.coalescer = coalescer or AnalysisCoalescer(
+            workers=workers
+        )
+        self._hedges: "queue.Queue" = queue.Queue()
+        self._hedge_count = 0
+        self._hedge_lock = threading.Lock()
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(i))
+            for i in range(self.workers)
+        ]
+        logger.info(
+            f"Cycle service started with {self.workers} workers"
+        )
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.coalescer.shutdown()
+        while True:
+            try:
+                hedge = self._hedges.get_nowait()
+            except queue.Empty:
+                break
+            close = getattr(hedge, "close", None)
+            if close is not None:
+                close()
+
+    def submit(self, request: CycleRequest) -> CycleJob:
+        """Queue a cycle; raises asyncio.QueueFull when at capacity."""
+        job = CycleJob(request)
+        self._queue.put_nowait(job)
+        self.jobs[job.id] = job
+        self.counters["submitted"] += 1
+        self._evict()
+        return job
+
+    def _evict(self) -> None:
+        while len(self.jobs) > self.max_jobs:
+            oldest = next(
+                (j for j in self.jobs.values() if j.finished), None
+            )
+            if oldest is None:
+                break
+            del self.jobs[oldest.id]
+
+    async def _publish(
+        self, job: CycleJob, event: str, data: Dict
+    ) -> None:
+        async with job.changed:
+            job.events.append(
+                CycleEvent(id=len(job.events), event=event, data=data)
+            )
+            job.changed.notify_all()
+
+    def _publish_threadsafe(
+        self, job: CycleJob, event: str, data: Dict
+    ) -> None:
+        asyncio.run_coroutine_threadsafe(
+            self._publish(job, event, data), self._loop
+        ).result()
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._queue.get()
+            self.busy += 1
+            try:
+                if not job.cancel_requested:
+                    job.status, job.started_at = (
+                        "running",
+                        time.time(),
+                    )
+                    await self._publish(
+                        job,
+                        "status",
+                        {"status": job.status, "worker": worker_id},
+                    )
+                    await asyncio.to_thread(self._run_cycle, job)
+                if job.cancel_requested:
+                    job.status = "cancelled"
+                elif job.errors and len(job.errors) >= len(
+                    job.request.stocks
+                ):
+                    job.status = "failed"
+                else:
+                    job.status = "done"
+            except Exception as e:
+                logger.error(f"Cycle {job.id} failed: {e}")
+                job.errors["cycle"] = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                self.busy -= 1
+                self.counters[job.status] += 1
+                if job.started_at:
+                    self._cycle_seconds += (
+                        job.finished_at - job.started_at
+                    )
+                await self._publish(
+                    job,
+                    "status",
+                    {"status": job.status, "errors": job.errors},
+                )
+                self._queue.task_done()
+
+    def _acquire_hedge(self) -> Any:
+        """A warm hedge from the pool, built on demand up to `workers`."""
+        with self._hedge_lock:
+            try:
+                return self._hedges.get_nowait()
+            except queue.Empty:
+                create = self._hedge_count < self.workers
+                if create:
+                    self._hedge_count += 1
+        if create:
+            try:
+                return self.hedge_factory()
+            except Exception:
+                with self._hedge_lock:
+                    self._hedge_count -= 1
+                raise
+        return self._hedges.get()
+
+    def _release_hedge(self, hedge: Any) -> None:
+        self._hedges.put(hedge)
+
+    def _analyze(
+        self,
+        stock: str,
+        task: str,
+        account: Any,
+        deadline: Optional[Deadline],
+        broadcast: Callable,
+    ) -> AutoHedgeOutput:
+        """One ticker's pipeline on a pooled hedge; runs on the coalescer."""
+        hedge = self._acquire_hedge()
+        last = [time.monotonic()]
+
+        def on_stage(stage: str, ticker: str, payload: Any) -> None:
+            now = time.monotonic()
+            self._stage_seconds[stage] += now - last[0]
+            self._stage_counts[stage] += 1
+            last[0] = now
+            broadcast(stage, ticker, payload)
+
+        try:
+            return hedge.process_stock(
+                stock,
+                task,
+                account=account,
+                on_stage=on_stage,
+                deadline=deadline,
+            )
+        finally:
+            self._release_hedge(hedge)
+
+    def _run_cycle(self, job: CycleJob) -> None:
+        """Runs in a worker thread."""
+        request = job.request
+        task = request.task
+        if request.strategy:
+            task = f"{task}\nStrategy: {request.strategy}"
+        hedge = self._acquire_hedge()
+        try:
+            stocks = request.stocks
+            screener = getattr(hedge, "screener", None)
+            if screener is not None:
+                stocks = screener.screen(stocks)
+            snapshot = getattr(hedge, "cycle_snapshot", None)
+            account = snapshot() if snapshot is not None else None
+        finally:
+            self._release_hedge(hedge)
+
+        def on_stage(stage: str, ticker: str, payload: Any) -> None:
+            self._publish_threadsafe(
+                job,
+                "stage",
+                {
+                    "stock": ticker,
+                    "stage": stage,
+                    "output": str(payload),
+                },
+            )
+
+        seconds = request.deadline or settings.CYCLE_DEADLINE or None
+        cycle = Deadline(seconds) if seconds else None
+        for i, stock in enumerate(stocks):
+            if job.cancel_requested:
+                return
+            deadline = None
+            if cycle is not None:
+                if cycle.expired:
+                    logger.bind(ticker=stock).warning(
+                        f"Cycle {job.id}: deadline passed before"
+                        f" {stock}"
+                    )
+                    self._finish(
+                        job, self._timed_out(stock), cached=False
+                    )
+                    continue
+                deadline = cycle.share(len(stocks) - i)
+            key = self.coalescer.key(
+                stock,
+                request.task,
+                request.strategy,
+                getattr(account, "version", None),
+            )
+            ticket = self.coalescer.submit(
+                key,
+                partial(
+                    self._analyze, stock, task, account, deadline
+                ),
+                on_stage,
+            )
+            try:
+                output = self._wait(job, ticket, deadline)
+            except concurrent.futures.TimeoutError:
+                logger.bind(ticker=stock).warning(
+                    f"Cycle {job.id}: {stock} timed out waiting for"
+                    " its analysis"
+                )
+                output = self._timed_out(stock)
+            except Exception as e:
+                logger.bind(ticker=stock).error(
+                    f"Cycle {job.id}: {stock} failed: {e}"
+                )
+                job.errors[stock] = str(e)
+                self._publish_threadsafe(
+                    job, "error", {"stock": stock, "error": str(e)}
+                )
+                continue
+            if output is None:
+                return
+            if output.skipped_stages:
+                # Never serve a degraded analysis to a later cycle
+                self.coalescer.invalidate(stock)
+            self._finish(job, output, ticket.cached)
+
+        if job.cancel_requested:
+            return
+        self._route(job)
+
+    def _finish(
+        self, job: CycleJob, output: AutoHedgeOutput, cached: bool
+    ) -> None:
+        job.results.append(output)
+        self._publish_threadsafe(
+            job,
+            "result",
+            {**output.model_dump(mode="json"), "cached": cached},
+        )
+
+    @staticmethod
+    def _timed_out(stock: str) -> AutoHedgeOutput:
+        from autohedge.main import AutoHedge
+
+        return AutoHedge.timed_out(stock)
+
+    def _route(self, job: CycleJob) -> None:
+        """Send the cycle's approved orders, as `AutoHedge.run` does."""
+        hedge = self._acquire_hedge()
+        try:
+            route_orders = getattr(hedge, "route_orders", None)
+            if route_orders is not None:
+                job.routing = route_orders(job.results)
+        finally:
+            self._release_hedge(hedge)
+        if job.routing is not None:
+            self._publish_threadsafe(
+                job,
+                "routing",
+                {
+                    "routed": len(job.routing.routed),
+                    "netted_out": job.routing.netted_out,
+                    "failed": len(job.routing.failed),
+                },
+            )
+
+    @staticmethod
+    def _wait(
+        job: CycleJob,
+        ticket: Ticket,
+        deadline: Optional[Deadline] = None,
+    ) -> Optional[AutoHedgeOutput]:
+        """
+        Ticket result, or None once the job is cancelled. Raises
+        TimeoutError once `deadline` passes.
+        """
+        while True:
+            timeout = 0.25
+            if deadline is not None:
+                timeout = min(timeout, deadline.remaining())
+            try:
+                return ticket.result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                if job.cancel_requested:
+                    ticket.cancel()
+                    return None
+                if deadline is not None and deadline.expired:
+                    ticket.cancel()
+                    raise
+
+    def cancel(self, job: CycleJob) -> bool:
+        """
+        Stop a queued or running cycle. Analyses it shares with other
+        cycles keep running for them.
+        """
+        if job.finished:
+            return False
+        job.cancel_requested = True
+        return True
+
+    async def stream(
+        self, job: CycleJob, after: int = -1
+    ) -> AsyncIterator[CycleEvent]:
+        """Events with id > `after`, then live ones until the job finishes."""
+        index = after + 1
+        while True:
+            async with job.changed:
+                await job.changed.wait_for(
+                    lambda: len(job.events) > index or job.finished
+                )
+                pending = job.events[index:]
+                done = job.finished
+            for event in pending:
+                yield event
+            index += len(pending)
+            if done and index >= len(job.events):
+                return
+
+    def metrics(self) -> Dict[str, Any]:
+        finished = self.counters.get("done", 0) + self.counters.get(
+            "failed", 0
+        )
+        return {
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.queue_size,
+            "jobs": dict(self.counters),
+            "avg_cycle_seconds": (
+                self._cycle_seconds / finished if finished else 0.0
+            ),
+            "coalescer": dict(self.coalescer.stats),
+            "avg_stage_seconds": {
+                stage: self._stage_seconds[stage] / count
+                for stage, count in self._stage_counts.items()
+            },
+        }
+
+
+def _sse(event: CycleEvent) -> str:
+    return (
+        f"id: {event.id}\nevent: {event.event}\ndata:"
+        f" {json.dumps(event.data)}\n\n"
+    )
+
+
+def create_app(service: Optional[CycleService] = None) -> FastAPI:
+    service = service or CycleService()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await service.start()
+        try:
+            yield
+        finally:
+            await service.stop()
+
+    app = FastAPI(title="AutoHedge", lifespan=lifespan)
+    app.state.service = service
+
+    def get_job(job_id: str) -> CycleJob:
+        job = service.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=404, detail=f"Unknown cycle {job_id}"
+            )
+        return job
+
+    @app.post("/cycles", status_code=202)
+    async def submit_cycle(request: CycleRequest):
+        try:
+            job = service.submit(request)
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Cycle queue is full",
+                headers={"Retry-After": "5"},
+            )
+        return {"id": job.id, "status": job.status}
+
+    @app.get("/cycles")
+    async def list_cycles(limit: int = 50):
+        return [
+            job.summary()
+            for job in list(service.jobs.values())[-limit:]
+        ]
+
+    @app.get("/cycles/{job_id}")
+    async def get_cycle(job_id: str):
+        job = get_job(job_id)
+        return {
+            **job.summary(),
+            "results": [
+                r.model_dump(mode="json") for r in job.results
+            ],
+            "routing": (
+                job.routing.model_dump(mode="json")
+                if job.routing
+                else None
+            ),
+        }
+
+    @app.get("/cycles/{job_id}/events")
+    async def cycle_events(job_id: str, request: Request):
+        job = get_job(job_id)
+        last_id = request.headers.get("Last-Event-ID")
+        after = int(last_id) if last_id and last_id.isdigit() else -1
+
+        async def events():
+            async for event in service.stream(job, after):
+                yield _sse(event)
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            },
+        )
+
+    @app.delete("/cycles/{job_id}")
+    async def cancel_cycle(job_id: str):
+        job = get_job(job_id)
+        if not service.cancel(job):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Cycle {job_id} is {job.status}",
+            )
+        return {"id": job.id, "status": "cancelling"}
+
+    @app.get("/metrics")
+    async def metrics():
+        return service.metrics()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(
+        description="AutoHedge service mode"
+    )
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument(
+        "--port", type=int, default=settings.SERVER_PORT
+    )
+    parser.add_argument(
+        "--workers", type=int, default=settings.SERVER_WORKERS
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=settings.SERVER_QUEUE_SIZE
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    service = CycleService(
+        workers=args.workers, queue_size=args.queue_size
+    )
+    uvicorn.run(create_app(service), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,760 @@
+"""
+Unified async interface over the supported brokers.
+
+Every broker is wrapped in a `BrokerAdapter` exposing the same coroutines
+(`place_order`, `confirm_order`, `cancel_order`, `get_positions`,
+`get_balances`) on normalized `BrokerOrder` / `OrderAck` / `Position` /
+`Balances` models. All adapters share one pooled keep-alive
+`aiohttp.ClientSession` per process (see `create_session`), so an order
+burst reuses warm connections instead of opening one per call.
+
+Synchronous callers (`AccountCache.snapshot_blocking`,
+`OrderRouter.route_blocking`) run their coroutines on one background
+event loop per process via `run_blocking`, so the session - which is
+bound to the loop that created it - stays open and warm between calls.
+
+Retries follow idempotency: reads, confirms (previews) and cancels are
+retried on connection errors, 429 and 5xx. Order placement is only
+retried when the broker provably did not act on it (429, or the
+connection was never established), so a timeout never double-submits.
+"""
+
+import asyncio
+import os
+import threading
+import time
+import uuid
+from typing import (
+    Any,
+    Coroutine,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import aiohttp
+from loguru import logger
+from pydantic import BaseModel, Field
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_loop_lock = threading.Lock()
+
+
+def run_blocking(
+    coro: Coroutine[Any, Any, T], timeout: Optional[float] = None
+) -> T:
+    """
+    Run a coroutine from synchronous code on the process's background
+    broker event loop and wait for its result. Safe to call from any
+    thread except the loop's own.
+    """
+    global _loop, _loop_pid
+    with _loop_lock:
+        # A forked child inherits the loop object but not its thread
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(
+                target=_loop.run_forever,
+                name="broker-loop",
+                daemon=True,
+            ).start()
+        loop = _loop
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(
+        timeout
+    )
+
+
+class BrokerError(Exception):
+    """A broker call failed; `status` is the HTTP status if there was one."""
+
+    def __init__(
+        self, broker: str, message: str, status: Optional[int] = None
+    ):
+        super().__init__(f"{broker}: {message}")
+        self.broker = broker
+        self.status = status
+
+
+class BrokerOrder(BaseModel):
+    symbol: str
+    side: Literal["BUY", "SELL"]
+    quantity: int = Field(gt=0)
+    order_type: Literal["MARKET", "LIMIT", "STOP", "STOP_LIMIT"] = (
+        "MARKET"
+    )
+    limit_price: Optional[float] = None
+    stop_price: Optional[float] = None
+    time_in_force: Literal["DAY", "GTC"] = "DAY"
+    client_order_id: str = Field(
+        default_factory=lambda: uuid.uuid4().hex[:20]
+    )
+
+
+class OrderAck(BaseModel):
+    broker: str
+    order_id: str
+    client_order_id: str
+    status: str = "ACCEPTED"
+    latency: float = 0.0
+    # Set when the place response already reports an (immediate) fill
+    filled_quantity: float = 0.0
+    fill_price: Optional[float] = None
+    raw: Dict[str, Any] = Field(default_factory=dict)
+
+
+class Position(BaseModel):
+    symbol: str
+    quantity: float
+    average_price: float = 0.0
+    market_value: float = 0.0
+
+
+class Balances(BaseModel):
+    cash: float = 0.0
+    buying_power: float = 0.0
+    equity: float = 0.0
+
+
+def create_session(
+    limit: int = 100, timeout: float = 10.0
+) -> aiohttp.ClientSession:
+    """
+    Pooled HTTP session with keep-alive; share one per process.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit, keepalive_timeout=60, ttl_dns_cache=300
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class BrokerAdapter:
+    """
+    Base class for broker adapters.
+
+    Args:
+        session: Shared session; one is created (and owned) if omitted.
+        base_url: Override the broker's API root (e.g. a local simulator).
+        retries: Extra attempts for retryable calls.
+        backoff: Initial retry delay in seconds, doubled per attempt.
+    """
+
+    name = "broker"
+    BASE_URL = ""
+
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        base_url: Optional[str] = None,
+        retries: int = 3,
+        backoff: float = 0.25,
+    ):
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self._session = session
+        self._owns_session = session is None
+        self.stats = {"requests": 0, "retries": 0, "errors": 0}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = create_session()
+            self._owns_session = True
+        return self._session
+
+    def _headers(
+        self, method: str, url: str, params: Optional[Dict] = None
+    ) -> Dict[str, str]:
+        return {}
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        idempotent: bool,
+        json: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Send a request and return (json body, headers), retrying according
+        to `idempotent`.
+        """
+        url = f"{self.base_url}{path}"
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            self.stats["requests"] += 1
+            retry_after = None
+            try:
+                async with self.session.request(
+                    method,
+                    url,
+                    json=json,
+                    params=params,
+                    headers=self._headers(method, url, params),
+                ) as response:
+                    text = await response.text()
+                    if response.status < 400:
+                        body = (
+                            await response.json(content_type=None)
+                            if text.strip()
+                            else {}
+                        )
+                        return body, dict(response.headers)
+                    error = BrokerError(
+                        self.name,
+                        f"{method} {path} -> {response.status}:"
+                        f" {text[:200]}",
+                        response.status,
+                    )
+                    retryable = response.status == 429 or (
+                        idempotent
+                        and response.status in RETRY_STATUSES
+                    )
+                    retry_after = response.headers.get("Retry-After")
+            except aiohttp.ClientConnectorError as e:
+                # Never reached the broker: safe to retry anything
+                error = BrokerError(
+                    self.name, f"{method} {path}: {e}"
+                )
+                retryable = True
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = BrokerError(
+                    self.name, f"{method} {path}: {e!r}"
+                )
+                retryable = idempotent
+
+            if not retryable or attempt == self.retries:
+                self.stats["errors"] += 1
+                logger.error(str(error))
+                raise error
+            self.stats["retries"] += 1
+            wait = _float(retry_after) if retry_after else delay
+            logger.warning(
+                f"{error}; retrying in {wait:.2f}s "
+                f"({attempt + 1}/{self.retries})"
+            )
+            await asyncio.sleep(wait)
+            delay *= 2
+
+    async def place_order(self, order: BrokerOrder) -> OrderAck:
+        raise NotImplementedError
+
+    async def confirm_order(
+        self, order: BrokerOrder
+    ) -> Dict[str, Any]:
+        """Preview an order (estimated cost) without placing it."""
+        raise NotImplementedError
+
+    async def cancel_order(self, order_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def get_positions(self) -> List[Position]:
+        raise NotImplementedError
+
+    async def get_balances(self) -> Balances:
+        raise NotImplementedError
+
+    def on_ack(self, order: BrokerOrder, ack: OrderAck) -> None:
+        """An order placed through this adapter is now tracked as working."""
+
+    def on_fill(
+        self, order: BrokerOrder, quantity: float, price: float
+    ) -> None:
+        """Execution report for an order placed through this adapter."""
+
+    def on_cancel(
+        self, order: BrokerOrder, filled: float = 0.0
+    ) -> None:
+        """An order placed through this adapter was cancelled."""
+
+    async def submit_many(
+        self, orders: Iterable[BrokerOrder], concurrency: int = 20
+    ) -> List[Union[OrderAck, BrokerError]]:
+        """
+        Place orders concurrently, at most `concurrency` in flight. Results
+        are in input order; failures are returned, not raised.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def place(order: BrokerOrder):
+            async with semaphore:
+                return await self.place_order(order)
+
+        results = await asyncio.gather(
+            *(place(order) for order in orders),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(
+                result, BrokerError
+            ):
+                raise result
+        return results
+
+    async def _timed_place(
+        self, path: str, payload: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, str], float]:
+        start = time.perf_counter()
+        body, headers = await self._request(
+            "POST", path, idempotent=False, json=payload
+        )
+        return body, headers, time.perf_counter() - start
+
+    async def close(self) -> None:
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self) -> "BrokerAdapter":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+class ETradeAdapter(BrokerAdapter):
+    """
+    E*TRADE v1 accounts API, OAuth 1.0a signed (requires ``oauthlib``).
+    Credentials default to the same environment variables as
+    `ETradeClient`.
+    """
+
+    name = "etrade"
+    BASE_URL = "https://api.etrade.com/v1"
+
+    def __init__(
+        self,
+        account_id: Optional[str] = None,
+        consumer_key: Optional[str] = None,
+        consumer_secret: Optional[str] = None,
+        oauth_token: Optional[str] = None,
+        oauth_token_secret: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.account_id = account_id or os.getenv("ETRADE_ACCOUNT_ID")
+        credentials = [
+            consumer_key or os.getenv("ETRADE_CONSUMER_KEY"),
+            consumer_secret or os.getenv("ETRADE_CONSUMER_SECRET"),
+            oauth_token or os.getenv("ETRADE_OAUTH_TOKEN"),
+            oauth_token_secret
+            or os.getenv("ETRADE_OAUTH_TOKEN_SECRET"),
+        ]
+        if not all(credentials):
+            logger.error(
+                "E*TRADE credentials are not set in the environment"
+                " variables."
+            )
+            raise EnvironmentError("Missing E*TRADE credentials.")
+        from oauthlib.oauth1 import Client
+
+        self._oauth = Client(
+            credentials[0],
+            client_secret=credentials[1],
+            resource_owner_key=credentials[2],
+            resource_owner_secret=credentials[3],
+        )
+
+    def _headers(
+        self, method: str, url: str, params: Optional[Dict] = None
+    ) -> Dict[str, str]:
+        if params:
+            url = (
+                f"{url}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
+            )
+        # JSON bodies are not part of the OAuth 1.0a signature base string
+        _, headers, _ = self._oauth.sign(url, http_method=method)
+        headers["Accept"] = "application/json"
+        return headers
+
+    def _order_request(self, order: BrokerOrder) -> Dict[str, Any]:
+        price_type = {
+            "MARKET": "MARKET",
+            "LIMIT": "LIMIT",
+            "STOP": "STOP",
+            "STOP_LIMIT": "STOP_LIMIT",
+        }[order.order_type]
+        detail = {
+            "allOrNone": False,
+            "priceType": price_type,
+            "orderTerm": (
+                "GOOD_UNTIL_CANCEL"
+                if order.time_in_force == "GTC"
+                else "GOOD_FOR_DAY"
+            ),
+            "marketSession": "REGULAR",
+            "Instrument": [{
+                "Product": {
+                    "securityType": "EQ",
+                    "symbol": order.symbol,
+                },
+                "orderAction": order.side,
+                "quantityType": "QUANTITY",
+                "quantity": order.quantity,
+            }],
+        }
+        if order.limit_price is not None:
+            detail["limitPrice"] = order.limit_price
+        if order.stop_price is not None:
+            detail["stopPrice"] = order.stop_price
+        return {
+            "orderType": "EQ",
+            "clientOrderId": order.client_order_id,
+            "Order": [detail],
+        }
+
+    async def place_order(self, order: BrokerOrder) -> OrderAck:
+        body, _, latency = await self._timed_place(
+            f"/accounts/{self.account_id}/orders/place",
+            {"PlaceOrderRequest": self._order_request(order)},
+        )
+        order_ids = body.get("PlaceOrderResponse", {}).get(
+            "OrderIds", []
+        )
+        return OrderAck(
+            broker=self.name,
+            order_id=(
+                str(order_ids[0]["orderId"]) if order_ids else ""
+            ),
+            client_order_id=order.client_order_id,
+            latency=latency,
+            raw=body,
+        )
+
+    async def confirm_order(
+        self, order: BrokerOrder
+    ) -> Dict[str, Any]:
+        body, _ = await self._request(
+            "POST",
+            f"/accounts/{self.account_id}/orders/preview",
+            idempotent=True,
+            json={"PreviewOrderRequest": self._order_request(order)},
+        )
+        return body
+
+    async def cancel_order(self, order_id: str) -> Dict[str, Any]:
+        body, _ = await self._request(
+            "PUT",
+            f"/accounts/{self.account_id}/orders/cancel",
+            idempotent=True,
+            json={"CancelOrderRequest": {"orderId": order_id}},
+        )
+        return body
+
+    async def get_positions(self) -> List[Position]:
+        body, _ = await self._request(
+            "GET",
+            f"/accounts/{self.account_id}/portfolio",
+            idempotent=True,
+        )
+        positions = []
+        for portfolio in body.get("PortfolioResponse", {}).get(
+            "AccountPortfolio", []
+        ):
+            for p in portfolio.get("Position", []):
+                positions.append(
+                    Position(
+                        symbol=p.get("Product", {}).get(
+                            "symbol", p.get("symbolDescription", "")
+                        ),
+                        quantity=_float(p.get("quantity")),
+                        average_price=_float(p.get("pricePaid")),
+                        market_value=_float(p.get("marketValue")),
+                    )
+                )
+        return positions
+
+    async def get_balances(self) -> Balances:
+        body, _ = await self._request(
+            "GET",
+            f"/accounts/{self.account_id}/balance",
+            idempotent=True,
+            params={"instType": "BROKERAGE", "realTimeNAV": "true"},
+        )
+        computed = body.get("BalanceResponse", {}).get("Computed", {})
+        return Balances(
+            cash=_float(computed.get("cashAvailableForInvestment")),
+            buying_power=_float(computed.get("cashBuyingPower")),
+            equity=_float(
+                computed.get("RealTimeValues", {}).get(
+                    "totalAccountValue"
+                )
+            ),
+        )
+
+
+class TDAmeritradeAdapter(BrokerAdapter):
+    """
+    TD Ameritrade v1 API with a bearer token. Credentials default to the
+    same environment variables as `TDAmeritradeClient`.
+    """
+
+    name = "td_ameritrade"
+    BASE_URL = "https://api.tdameritrade.com/v1"
+
+    def __init__(
+        self,
+        account_id: Optional[str] = None,
+        access_token: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.account_id = account_id or os.getenv("TD_ACCOUNT_ID")
+        self.access_token = access_token or os.getenv(
+            "TD_ACCESS_TOKEN"
+        )
+        if not self.access_token:
+            logger.error("Missing TD Ameritrade API credentials.")
+            raise EnvironmentError("Ensure TD_ACCESS_TOKEN is set.")
+
+    def _headers(
+        self, method: str, url: str, params: Optional[Dict] = None
+    ) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+    def _order_request(self, order: BrokerOrder) -> Dict[str, Any]:
+        payload = {
+            "orderType": order.order_type,
+            "session": "NORMAL",
+            "duration": (
+                "GOOD_TILL_CANCEL"
+                if order.time_in_force == "GTC"
+                else "DAY"
+            ),
+            "orderStrategyType": "SINGLE",
+            "orderLegCollection": [{
+                "instruction": order.side,
+                "quantity": order.quantity,
+                "instrument": {
+                    "symbol": order.symbol,
+                    "assetType": "EQUITY",
+                },
+            }],
+        }
+        if order.limit_price is not None:
+            payload["price"] = order.limit_price
+        if order.stop_price is not None:
+            payload["stopPrice"] = order.stop_price
+        return payload
+
+    async def place_order(self, order: BrokerOrder) -> OrderAck:
+        body, headers, latency = await self._timed_place(
+            f"/accounts/{self.account_id}/orders",
+            self._order_request(order),
+        )
+        # 201 Created with the new order's URL in Location
+        location = headers.get("Location", "")
+        return OrderAck(
+            broker=self.name,
+            order_id=location.rstrip("/").rsplit("/", 1)[-1]
+            or str(body.get("orderId", "")),
+            client_order_id=order.client_order_id,
+            latency=latency,
+            raw=body,
+        )
+
+    async def confirm_order(
+        self, order: BrokerOrder
+    ) -> Dict[str, Any]:
+        body, _ = await self._request(
+            "POST",
+            f"/accounts/{self.account_id}/previewOrder",
+            idempotent=True,
+            json=self._order_request(order),
+        )
+        return body
+
+    async def cancel_order(self, order_id: str) -> Dict[str, Any]:
+        body, _ = await self._request(
+            "DELETE",
+            f"/accounts/{self.account_id}/orders/{order_id}",
+            idempotent=True,
+        )
+        return body
+
+    async def _account(self) -> Dict[str, Any]:
+        body, _ = await self._request(
+            "GET",
+            f"/accounts/{self.account_id}",
+            idempotent=True,
+            params={"fields": "positions"},
+        )
+        return body.get("securitiesAccount", {})
+
+    async def get_positions(self) -> List[Position]:
+        account = await self._account()
+        return [
+            Position(
+                symbol=p.get("instrument", {}).get("symbol", ""),
+                quantity=_float(p.get("longQuantity"))
+                - _float(p.get("shortQuantity")),
+                average_price=_float(p.get("averagePrice")),
+                market_value=_float(p.get("marketValue")),
+            )
+            for p in account.get("positions", [])
+        ]
+
+    async def get_balances(self) -> Balances:
+        balances = (await self._account()).get("currentBalances", {})
+        return Balances(
+            cash=_float(balances.get("cashBalance")),
+            buying_power=_float(balances.get("buyingPower")),
+            equity=_float(balances.get("liquidationValue")),
+        )
+
+
+class TradeStationAdapter(BrokerAdapter):
+    """
+    TradeStation v3 order execution and brokerage API. Credentials
+    default to the same environment variables as `confirm_order`.
+    """
+
+    name = "trade_station"
+    BASE_URL = "https://api.tradestation.com/v3"
+
+    ORDER_TYPES = {
+        "MARKET": "Market",
+        "LIMIT": "Limit",
+        "STOP": "StopMarket",
+        "STOP_LIMIT": "StopLimit",
+    }
+
+    def __init__(
+        self,
+        account_id: Optional[str] = None,
+        token: Optional[str] = None,
+        route: str = "Intelligent",
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.account_id = account_id or os.getenv(
+            "TRADE_STATION_ACCOUNT_ID"
+        )
+        self.token = token or os.getenv("TRADE_STATION_TOKEN")
+        self.route = route
+        if not self.token:
+            logger.error("Missing TradeStation API token.")
+            raise EnvironmentError(
+                "Ensure TRADE_STATION_TOKEN is set."
+            )
+
+    def _headers(
+        self, method: str, url: str, params: Optional[Dict] = None
+    ) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def _order_request(self, order: BrokerOrder) -> Dict[str, Any]:
+        payload = {
+            "AccountID": self.account_id,
+            "Symbol": order.symbol,
+            "Quantity": str(order.quantity),
+            "OrderType": self.ORDER_TYPES[order.order_type],
+            "TradeAction": order.side,
+            "TimeInForce": {"Duration": order.time_in_force},
+            "Route": self.route,
+        }
+        if order.limit_price is not None:
+            payload["LimitPrice"] = str(order.limit_price)
+        if order.stop_price is not None:
+            payload["StopPrice"] = str(order.stop_price)
+        return payload
+
+    async def place_order(self, order: BrokerOrder) -> OrderAck:
+        body, _, latency = await self._timed_place(
+            "/orderexecution/orders", self._order_request(order)
+        )
+        orders = body.get("Orders", [])
+        if not orders or orders[0].get("Error"):
+            raise BrokerError(
+                self.name,
+                f"order rejected: {body.get('Errors') or orders}",
+            )
+        return OrderAck(
+            broker=self.name,
+            order_id=str(orders[0].get("OrderID", "")),
+            client_order_id=order.client_order_id,
+            latency=latency,
+            raw=body,
+        )
+
+    async def confirm_order(
+        self, order: BrokerOrder
+    ) -> Dict[str, Any]:
+        body, _ = await self._request(
+            "POST",
+            "/orderexecution/orderconfirm",
+            idempotent=True,
+            json=self._order_request(order),
+        )
+        return body
+
+    async def cancel_order(self, order_id: str) -> Dict[str, Any]:
+        body, _ = await self._request(
+            "DELETE",
+            f"/orderexecution/orders/{order_id}",
+            idempotent=True,
+        )
+        return body
+
+    async def get_positions(self) -> List[Position]:
+        body, _ = await self._request(
+            "GET",
+            f"/brokerage/accounts/{self.account_id}/positions",
+            idempotent=True,
+        )
+        positions = []
+        for p in body.get("Positions", []):
+            quantity = _float(p.get("Quantity"))
+            if p.get("LongShort") == "Short":
+                quantity = -abs(quantity)
+            positions.append(
+                Position(
+                    symbol=p.get("Symbol", ""),
+                    quantity=quantity,
+                    average_price=_float(p.get("AveragePrice")),
+                    market_value=_float(p.get("MarketValue")),
+                )
+            )
+        return positions
+
+    async def get_balances(self) -> Balances:
+        body, _ = await self._request(
+            "GET",
+            f"/brokerage/accounts/{self.account_id}/balances",
+            idempotent=True,
+        )
+        balances = (body.get("Balances") or [{}])[0]
+        return Balances(
+            cash=_float(balances.get("CashBalance")),
+            buying_power=_float(balances.get("BuyingPower")),
+            equity=_float(balances.get("Equity")),
+        )
+
+
+ADAPTERS = {
+    adapter.name: adapter
+    for adapter in (
+        ETradeAdapter,
+        TDAmeritradeAdapter,
+        TradeStationAdapter,
+    )
+}
@@ -0,0 +1,900 @@
+"""
+Local broker simulator for offline order-path testing and load tests.
+
+`create_app` serves the order, confirm (preview), cancel, positions and
+balance endpoints of E*TRADE (``/etrade/v1``), TD Ameritrade
+(``/td/v1``) and TradeStation (``/tradestation/v3``) in each broker's
+JSON shapes, so the adapters in `autohedge.tools.broker` run against it
+unchanged by pointing ``base_url`` at ``simulator_url(root, name)``.
+
+All three front ends share one `BrokerSimulator`: accounts with cash and
+positions, a mark price per symbol, and resting orders. Market orders
+fill at the mark; limit and stop orders rest until `set_price` makes them
+marketable. `SimulatorConfig` injects latency, random 5xx errors and a
+per-broker rate limit (429 with ``Retry-After``); `fail_next` queues
+deterministic failures for retry tests.
+
+Run standalone with ``python -m autohedge.tools.broker_simulator``, or
+pass ``--bench N`` to time N concurrent orders through an adapter.
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from loguru import logger
+
+PREFIXES = {
+    "etrade": "/etrade/v1",
+    "td_ameritrade": "/td/v1",
+    "trade_station": "/tradestation/v3",
+}
+
+
+def simulator_url(root: str, broker: str) -> str:
+    """API root of one broker's front end, e.g. for an adapter's base_url."""
+    return f"{root.rstrip('/')}{PREFIXES[broker]}"
+
+
+class SimulatorError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class SimulatorConfig:
+    latency: float = 0.0  # seconds added to every request
+    jitter: float = 0.0  # uniform extra latency, 0..jitter
+    error_rate: float = 0.0  # probability of a random 500
+    rate_limit: int = (
+        0  # requests per second per broker, 0 = unlimited
+    )
+    initial_cash: float = 100_000.0
+    default_price: float = 100.0
+    commission: float = 0.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class SimOrder:
+    order_id: str
+    account_id: str
+    symbol: str
+    side: str  # BUY or SELL
+    quantity: int
+    order_type: str = "MARKET"  # MARKET, LIMIT, STOP, STOP_LIMIT
+    limit_price: Optional[float] = None
+    stop_price: Optional[float] = None
+    time_in_force: str = "DAY"
+    client_order_id: str = ""
+    status: str = "OPEN"  # OPEN, FILLED, CANCELLED
+    triggered: bool = False
+    fill_price: Optional[float] = None
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class SimAccount:
+    account_id: str
+    cash: float
+    positions: Dict[str, List[float]] = field(
+        default_factory=dict
+    )  # symbol -> [quantity, average price]
+
+
+class BrokerSimulator:
+    """
+    Matching and account state shared by every broker front end.
+    """
+
+    def __init__(self, config: Optional[SimulatorConfig] = None):
+        self.config = config or SimulatorConfig()
+        self.prices: Dict[str, float] = {}
+        self.accounts: Dict[str, SimAccount] = {}
+        self.orders: Dict[str, SimOrder] = {}
+        self._resting: Dict[str, Dict[str, SimOrder]] = defaultdict(
+            dict
+        )
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+        self._windows: Dict[str, Deque[float]] = defaultdict(deque)
+        self._failures: Dict[str, Deque[int]] = defaultdict(deque)
+        self.stats = defaultdict(int)
+
+    # Fault injection
+
+    def fail_next(
+        self, broker: str, count: int = 1, status: int = 500
+    ) -> None:
+        """Answer the next `count` requests to a broker with `status`."""
+        with self._lock:
+            self._failures[broker].extend([status] * count)
+
+    def admit(
+        self, broker: str
+    ) -> Optional[Tuple[int, Dict[str, str]]]:
+        """
+        Decide whether a request is rejected before reaching the broker
+        logic; returns (status, headers) if so.
+        """
+        with self._lock:
+            self.stats[f"{broker}.requests"] += 1
+            if self._failures[broker]:
+                self.stats[f"{broker}.injected"] += 1
+                return self._failures[broker].popleft(), {}
+            if self.config.rate_limit:
+                now = time.monotonic()
+                window = self._windows[broker]
+                while window and window[0] <= now - 1.0:
+                    window.popleft()
+                if len(window) >= self.config.rate_limit:
+                    self.stats[f"{broker}.rate_limited"] += 1
+                    retry_after = max(0.0, window[0] + 1.0 - now)
+                    return 429, {"Retry-After": f"{retry_after:.3f}"}
+                window.append(now)
+            if self._random.random() < self.config.error_rate:
+                self.stats[f"{broker}.errors"] += 1
+                return 500, {}
+        return None
+
+    def delay(self) -> float:
+        jitter = (
+            self._random.uniform(0, self.config.jitter)
+            if self.config.jitter
+            else 0.0
+        )
+        return self.config.latency + jitter
+
+    # State
+
+    def account(self, account_id: str) -> SimAccount:
+        with self._lock:
+            return self._account(account_id)
+
+    def _account(self, account_id: str) -> SimAccount:
+        account = self.accounts.get(account_id)
+        if account is None:
+            account = self.accounts[account_id] = SimAccount(
+                account_id, self.config.initial_cash
+            )
+        return account
+
+    def price(self, symbol: str) -> float:
+        return self.prices.get(symbol, self.config.default_price)
+
+    def set_price(self, symbol: str, price: float) -> List[SimOrder]:
+        """Move a symbol's mark and fill resting orders it makes marketable."""
+        with self._lock:
+            self.prices[symbol] = price
+            filled = []
+            for order in list(self._resting[symbol].values()):
+                if self._match(order):
+                    filled.append(order)
+            return filled
+
+    def _marketable(self, order: SimOrder, price: float) -> bool:
+        buy = order.side == "BUY"
+        if (
+            order.order_type in ("STOP", "STOP_LIMIT")
+            and not order.triggered
+        ):
+            order.triggered = (
+                price >= order.stop_price
+                if buy
+                else price <= order.stop_price
+            )
+            if not order.triggered:
+                return False
+        if order.order_type in ("LIMIT", "STOP_LIMIT"):
+            return (
+                price <= order.limit_price
+                if buy
+                else price >= order.limit_price
+            )
+        return True
+
+    def _match(self, order: SimOrder) -> bool:
+        price = self.price(order.symbol)
+        if not self._marketable(order, price):
+            self._resting[order.symbol][order.order_id] = order
+            return False
+        self._resting[order.symbol].pop(order.order_id, None)
+        account = self._account(order.account_id)
+        signed = (
+            order.quantity if order.side == "BUY" else -order.quantity
+        )
+        quantity, average = account.positions.get(
+            order.symbol, [0.0, 0.0]
+        )
+        new_quantity = quantity + signed
+        if new_quantity == 0:
+            account.positions.pop(order.symbol, None)
+        else:
+            if quantity == 0 or (quantity > 0) != (new_quantity > 0):
+                average = price  # opened or flipped
+            elif abs(new_quantity) > abs(quantity):
+                average = (
+                    quantity * average + signed * price
+                ) / new_quantity
+            account.positions[order.symbol] = [new_quantity, average]
+        account.cash -= signed * price + self.config.commission
+        order.status = "FILLED"
+        order.fill_price = price
+        self.stats["fills"] += 1
+        return True
+
+    # Order entry
+
+    def submit(
+        self,
+        account_id: str,
+        symbol: str,
+        side: str,
+        quantity: int,
+        order_type: str = "MARKET",
+        limit_price: Optional[float] = None,
+        stop_price: Optional[float] = None,
+        time_in_force: str = "DAY",
+        client_order_id: str = "",
+    ) -> SimOrder:
+        order = self._validate(
+            account_id,
+            symbol,
+            side,
+            quantity,
+            order_type,
+            limit_price,
+            stop_price,
+            time_in_force,
+            client_order_id,
+        )
+        with self._lock:
+            if order.side == "BUY":
+                cost = order.quantity * self._reference_price(order)
+                if cost > self._account(account_id).cash:
+                    self.stats["rejected"] += 1
+                    raise SimulatorError("Insufficient buying power")
+            order.order_id = str(next(self._ids))
+            self.orders[order.order_id] = order
+            self.stats["orders"] += 1
+            self._match(order)
+        return order
+
+    def _validate(
+        self,
+        account_id: str,
+        symbol: str,
+        side: str,
+        quantity: Any,
+        order_type: str = "MARKET",
+        limit_price: Any = None,
+        stop_price: Any = None,
+        time_in_force: str = "DAY",
+        client_order_id: str = "",
+    ) -> SimOrder:
+        side = str(side).upper()
+        order_type = str(order_type).upper()
+        try:
+            quantity = int(float(quantity))
+            limit_price = (
+                None
+                if limit_price in (None, "")
+                else float(limit_price)
+            )
+            stop_price = (
+                None
+                if stop_price in (None, "")
+                else float(stop_price)
+            )
+        except (TypeError, ValueError):
+            raise SimulatorError("Invalid quantity or price")
+        if not symbol:
+            raise SimulatorError("Missing symbol")
+        if side not in ("BUY", "SELL"):
+            raise SimulatorError(f"Unsupported side {side}")
+        if quantity <= 0:
+            raise SimulatorError("Quantity must be positive")
+        if order_type not in (
+            "MARKET",
+            "LIMIT",
+            "STOP",
+            "STOP_LIMIT",
+        ):
+            raise SimulatorError(
+                f"Unsupported order type {order_type}"
+            )
+        if (
+            order_type in ("LIMIT", "STOP_LIMIT")
+            and limit_price is None
+        ):
+            raise SimulatorError("Limit orders need a limit price")
+        if (
+            order_type in ("STOP", "STOP_LIMIT")
+            and stop_price is None
+        ):
+            raise SimulatorError("Stop orders need a stop price")
+        return SimOrder(
+            order_id="",
+            account_id=account_id,
+            symbol=symbol.upper(),
+            side=side,
+            quantity=quantity,
+            order_type=order_type,
+            limit_price=limit_price,
+            stop_price=stop_price,
+            time_in_force=time_in_force,
+            client_order_id=client_order_id,
+        )
+
+    def _reference_price(self, order: SimOrder) -> float:
+        if order.limit_price is not None:
+            return order.limit_price
+        if order.stop_price is not None:
+            return max(order.stop_price, self.price(order.symbol))
+        return self.price(order.symbol)
+
+    def preview(self, **order_fields) -> Dict[str, float]:
+        """Estimated price and cost of an order, without placing it."""
+        order = self._validate(**order_fields)
+        with self._lock:
+            price = self._reference_price(order)
+        return {
+            "estimated_price": price,
+            "estimated_cost": (
+                order.quantity * price + self.config.commission
+            ),
+            "commission": self.config.commission,
+        }
+
+    def cancel(self, account_id: str, order_id: str) -> SimOrder:
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None or order.account_id != account_id:
+                raise SimulatorError(
+                    f"Order {order_id} not found", 404
+                )
+            if order.status != "OPEN":
+                raise SimulatorError(
+                    f"Order {order_id} is {order.status.lower()}"
+                )
+            self._resting[order.symbol].pop(order_id, None)
+            order.status = "CANCELLED"
+            return order
+
+    def snapshot(self, account_id: str) -> Dict[str, Any]:
+        """Cash, equity and marked positions of an account."""
+        with self._lock:
+            account = self._account(account_id)
+            positions = [
+                {
+                    "symbol": symbol,
+                    "quantity": quantity,
+                    "average_price": average,
+                    "market_value": quantity * self.price(symbol),
+                }
+                for symbol, (
+                    quantity,
+                    average,
+                ) in account.positions.items()
+            ]
+            equity = account.cash + sum(
+                p["market_value"] for p in positions
+            )
+            return {
+                "cash": account.cash,
+                "buying_power": max(0.0, account.cash),
+                "equity": equity,
+                "positions": positions,
+            }
+
+
+def _error(e: SimulatorError) -> JSONResponse:
+    return JSONResponse({"error": str(e)}, status_code=e.status)
+
+
+def _etrade_routes(app: FastAPI, sim: BrokerSimulator) -> None:
+    prefix = PREFIXES["etrade"]
+    terms = {"GOOD_FOR_DAY": "DAY", "GOOD_UNTIL_CANCEL": "GTC"}
+
+    def parse(
+        account_id: str, request: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        detail = (request.get("Order") or [{}])[0]
+        instrument = (detail.get("Instrument") or [{}])[0]
+        return dict(
+            account_id=account_id,
+            symbol=instrument.get("Product", {}).get("symbol"),
+            side=instrument.get("orderAction"),
+            quantity=instrument.get("quantity"),
+            order_type=detail.get("priceType", "MARKET"),
+            limit_price=detail.get("limitPrice"),
+            stop_price=detail.get("stopPrice"),
+            time_in_force=terms.get(detail.get("orderTerm"), "DAY"),
+            client_order_id=request.get("clientOrderId", ""),
+        )
+
+    @app.post(prefix + "/accounts/{account_id}/orders/place")
+    async def etrade_place(account_id: str, request: Request):
+        body = (await request.json()).get("PlaceOrderRequest", {})
+        try:
+            order = sim.submit(**parse(account_id, body))
+        except SimulatorError as e:
+            return _error(e)
+        return {
+            "PlaceOrderResponse": {
+                "orderType": "EQ",
+                "clientOrderId": order.client_order_id,
+                "OrderIds": [{"orderId": int(order.order_id)}],
+                "placedTime": int(order.created_at * 1000),
+            }
+        }
+
+    @app.post(prefix + "/accounts/{account_id}/orders/preview")
+    async def etrade_preview(account_id: str, request: Request):
+        body = (await request.json()).get("PreviewOrderRequest", {})
+        try:
+            estimate = sim.preview(**parse(account_id, body))
+        except SimulatorError as e:
+            return _error(e)
+        return {
+            "PreviewOrderResponse": {
+                "orderType": "EQ",
+                "PreviewIds": [
+                    {"previewId": int(time.time() * 1000)}
+                ],
+                "Order": [{
+                    "estimatedTotalAmount": estimate[
+                        "estimated_cost"
+                    ],
+                    "estimatedCommission": estimate["commission"],
+                }],
+            }
+        }
+
+    @app.put(prefix + "/accounts/{account_id}/orders/cancel")
+    async def etrade_cancel(account_id: str, request: Request):
+        body = (await request.json()).get("CancelOrderRequest", {})
+        try:
+            order = sim.cancel(account_id, str(body.get("orderId")))
+        except SimulatorError as e:
+            return _error(e)
+        return {
+            "CancelOrderResponse": {
+                "accountId": account_id,
+                "orderId": int(order.order_id),
+                "cancelTime": int(time.time() * 1000),
+            }
+        }
+
+    @app.get(prefix + "/accounts/{account_id}/portfolio")
+    async def etrade_portfolio(account_id: str):
+        positions = sim.snapshot(account_id)["positions"]
+        return {
+            "PortfolioResponse": {
+                "AccountPortfolio": [{
+                    "accountId": account_id,
+                    "Position": [
+                        {
+                            "symbolDescription": p["symbol"],
+                            "Product": {
+                                "symbol": p["symbol"],
+                                "securityType": "EQ",
+                            },
+                            "quantity": p["quantity"],
+                            "pricePaid": p["average_price"],
+                            "marketValue": p["market_value"],
+                        }
+                        for p in positions
+                    ],
+                }]
+            }
+        }
+
+    @app.get(prefix + "/accounts/{account_id}/balance")
+    async def etrade_balance(account_id: str):
+        snap = sim.snapshot(account_id)
+        return {
+            "BalanceResponse": {
+                "accountId": account_id,
+                "Computed": {
+                    "cashAvailableForInvestment": snap["cash"],
+                    "cashBuyingPower": snap["buying_power"],
+                    "RealTimeValues": {
+                        "totalAccountValue": snap["equity"]
+                    },
+                },
+            }
+        }
+
+
+def _td_routes(app: FastAPI, sim: BrokerSimulator) -> None:
+    prefix = PREFIXES["td_ameritrade"]
+
+    def parse(
+        account_id: str, body: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        leg = (body.get("orderLegCollection") or [{}])[0]
+        return dict(
+            account_id=account_id,
+            symbol=leg.get("instrument", {}).get("symbol"),
+            side=leg.get("instruction"),
+            quantity=leg.get("quantity"),
+            order_type=body.get("orderType", "MARKET"),
+            limit_price=body.get("price"),
+            stop_price=body.get("stopPrice"),
+            time_in_force=(
+                "GTC"
+                if body.get("duration") == "GOOD_TILL_CANCEL"
+                else "DAY"
+            ),
+        )
+
+    @app.post(prefix + "/accounts/{account_id}/orders")
+    async def td_place(account_id: str, request: Request):
+        try:
+            order = sim.submit(
+                **parse(account_id, await request.json())
+            )
+        except SimulatorError as e:
+            return _error(e)
+        return Response(
+            status_code=201,
+            headers={
+                "Location": f"{prefix}/accounts/{account_id}/orders/{order.order_id}"
+            },
+        )
+
+    @app.post(prefix + "/accounts/{account_id}/previewOrder")
+    async def td_preview(account_id: str, request: Request):
+        body = await request.json()
+        try:
+            estimate = sim.preview(**parse(account_id, body))
+        except SimulatorError as e:
+            return _error(e)
+        return {
+            "orderStrategy": body,
+            "orderValidationResult": {"rejects": [], "warns": []},
+            "orderBalance": {
+                "orderValue": estimate["estimated_cost"]
+            },
+            "commissionAndFee": {
+                "commission": estimate["commission"]
+            },
+        }
+
+    @app.delete(prefix + "/accounts/{account_id}/orders/{order_id}")
+    async def td_cancel(account_id: str, order_id: str):
+        try:
+            sim.cancel(account_id, order_id)
+        except SimulatorError as e:
+            return _error(e)
+        return Response(status_code=200)
+
+    @app.get(prefix + "/accounts/{account_id}")
+    async def td_account(account_id: str):
+        snap = sim.snapshot(account_id)
+        return {
+            "securitiesAccount": {
+                "type": "MARGIN",
+                "accountId": account_id,
+                "positions": [
+                    {
+                        "longQuantity": max(p["quantity"], 0),
+                        "shortQuantity": max(-p["quantity"], 0),
+                        "averagePrice": p["average_price"],
+                        "marketValue": p["market_value"],
+                        "instrument": {
+                            "symbol": p["symbol"],
+                            "assetType": "EQUITY",
+                        },
+                    }
+                    for p in snap["positions"]
+                ],
+                "currentBalances": {
+                    "cashBalance": snap["cash"],
+                    "buyingPower": snap["buying_power"],
+                    "liquidationValue": snap["equity"],
+                },
+            }
+        }
+
+
+def _trade_station_routes(app: FastAPI, sim: BrokerSimulator) -> None:
+    prefix = PREFIXES["trade_station"]
+    order_types = {
+        "MARKET": "MARKET",
+        "LIMIT": "LIMIT",
+        "STOPMARKET": "STOP",
+        "STOPLIMIT": "STOP_LIMIT",
+    }
+
+    def parse(body: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(
+            account_id=body.get("AccountID") or "",
+            symbol=body.get("Symbol"),
+            side=body.get("TradeAction"),
+            quantity=body.get("Quantity"),
+            order_type=order_types.get(
+                str(body.get("OrderType", "Market")).upper(),
+                "INVALID",
+            ),
+            limit_price=body.get("LimitPrice"),
+            stop_price=body.get("StopPrice"),
+            time_in_force=(body.get("TimeInForce") or {}).get(
+                "Duration", "DAY"
+            ),
+            client_order_id=body.get("OrderConfirmID", ""),
+        )
+
+    @app.post(prefix + "/orderexecution/orders")
+    async def ts_place(request: Request):
+        body = await request.json()
+        try:
+            order = sim.submit(**parse(body))
+        except SimulatorError as e:
+            return JSONResponse(
+                {"Errors": [{"Error": "FAILED", "Message": str(e)}]},
+                status_code=e.status,
+            )
+        return {
+            "Orders": [{
+                "OrderID": order.order_id,
+                "Message": (
+                    f"Sent order: {order.side} {order.quantity} "
+                    f"{order.symbol} @ {order.order_type}"
+                ),
+            }]
+        }
+
+    @app.post(prefix + "/orderexecution/orderconfirm")
+    async def ts_confirm(request: Request):
+        body = await request.json()
+        try:
+            estimate = sim.preview(**parse(body))
+        except SimulatorError as e:
+            return _error(e)
+        return {
+            "Confirmations": [{
+                "OrderConfirmID": body.get("OrderConfirmID", ""),
+                "EstimatedPrice": str(estimate["estimated_price"]),
+                "EstimatedCost": str(estimate["estimated_cost"]),
+                "EstimatedCostDisplay": (
+                    f"${estimate['estimated_cost']:,.2f}"
+                ),
+                "EstimatedCommission": str(estimate["commission"]),
+            }]
+        }
+
+    @app.delete(prefix + "/orderexecution/orders/{order_id}")
+    async def ts_cancel(order_id: str):
+        order = sim.orders.get(order_id)
+        try:
+            sim.cancel(order.account_id if order else "", order_id)
+        except SimulatorError as e:
+            return _error(e)
+        return {"OrderID": order_id, "Message": "Cancel request sent"}
+
+    @app.get(prefix + "/brokerage/accounts/{account_id}/positions")
+    async def ts_positions(account_id: str):
+        return {
+            "Positions": [
+                {
+                    "AccountID": account_id,
+                    "Symbol": p["symbol"],
+                    "Quantity": str(abs(p["quantity"])),
+                    "LongShort": (
+                        "Long" if p["quantity"] > 0 else "Short"
+                    ),
+                    "AveragePrice": str(p["average_price"]),
+                    "MarketValue": str(p["market_value"]),
+                }
+                for p in sim.snapshot(account_id)["positions"]
+            ]
+        }
+
+    @app.get(prefix + "/brokerage/accounts/{account_id}/balances")
+    async def ts_balances(account_id: str):
+        snap = sim.snapshot(account_id)
+        return {
+            "Balances": [{
+                "AccountID": account_id,
+                "CashBalance": str(snap["cash"]),
+                "BuyingPower": str(snap["buying_power"]),
+                "Equity": str(snap["equity"]),
+            }]
+        }
+
+
+def create_app(
+    simulator: Optional[BrokerSimulator] = None,
+) -> FastAPI:
+    """FastAPI app serving all three broker front ends over one simulator."""
+    sim = simulator or BrokerSimulator()
+    app = FastAPI(title="AutoHedge broker simulator")
+    app.state.simulator = sim
+    by_prefix = [(prefix, name) for name, prefix in PREFIXES.items()]
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        broker = next(
+            (
+                name
+                for prefix, name in by_prefix
+                if request.url.path.startswith(prefix)
+            ),
+            None,
+        )
+        if broker is None:
+            return await call_next(request)
+        delay = sim.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        rejection = sim.admit(broker)
+        if rejection is not None:
+            status, headers = rejection
+            return JSONResponse(
+                {"error": "simulated failure"},
+                status_code=status,
+                headers=headers,
+            )
+        return await call_next(request)
+
+    _etrade_routes(app, sim)
+    _td_routes(app, sim)
+    _trade_station_routes(app, sim)
+
+    @app.get("/sim/stats")
+    async def stats():
+        return dict(sim.stats)
+
+    @app.post("/sim/prices")
+    async def prices(request: Request):
+        """Set mark prices: {"AAPL": 187.5, ...}."""
+        body = await request.json()
+        filled = [
+            order.order_id
+            for symbol, price in body.items()
+            for order in sim.set_price(symbol.upper(), float(price))
+        ]
+        return {"filled": filled}
+
+    return app
+
+
+async def benchmark(
+    root: str,
+    orders: int = 1000,
+    concurrency: int = 50,
+    broker: str = "trade_station",
+) -> Dict[str, float]:
+    """Time `orders` market orders through a broker adapter against `root`."""
+    from autohedge.tools.broker import (
+        ADAPTERS,
+        BrokerOrder,
+        create_session,
+    )
+
+    session = create_session(limit=concurrency)
+    kwargs = (
+        {"token": "sim"}
+        if broker == "trade_station"
+        else {"access_token": "sim"}
+    )
+    adapter = ADAPTERS[broker](
+        account_id="SIM",
+        session=session,
+        base_url=simulator_url(root, broker),
+        **kwargs,
+    )
+    batch = [
+        BrokerOrder(
+            symbol="SIM",
+            side="BUY" if i % 2 == 0 else "SELL",
+            quantity=1,
+        )
+        for i in range(orders)
+    ]
+    try:
+        start = time.perf_counter()
+        results = await adapter.submit_many(
+            batch, concurrency=concurrency
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        await session.close()
+    latencies = sorted(
+        r.latency for r in results if not isinstance(r, Exception)
+    )
+    return {
+        "orders": orders,
+        "acked": len(latencies),
+        "seconds": elapsed,
+        "orders_per_second": orders / elapsed if elapsed else 0.0,
+        "p50_ack_ms": (
+            latencies[len(latencies) // 2] * 1000
+            if latencies
+            else 0.0
+        ),
+        "p99_ack_ms": (
+            latencies[int(len(latencies) * 0.99)] * 1000
+            if latencies
+            else 0.0
+        ),
+        "retries": adapter.stats["retries"],
+    }
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument(
+        "--bench",
+        type=int,
+        default=0,
+        help="orders to benchmark, then exit",
+    )
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--broker",
+        default="trade_station",
+        choices=["td_ameritrade", "trade_station"],
+    )
+    args = parser.parse_args()
+
+    config = SimulatorConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        initial_cash=1e12,
+    )
+    app = create_app(BrokerSimulator(config))
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app, host=args.host, port=args.port, log_level="warning"
+        )
+    )
+    if not args.bench:
+        server.run()
+        return
+
+    async def bench():
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        try:
+            result = await benchmark(
+                f"http://{args.host}:{args.port}",
+                args.bench,
+                args.concurrency,
+                args.broker,
+            )
+            logger.info(f"Benchmark: {result}")
+        finally:
+            server.should_exit = True
+            await task
+
+    asyncio.run(bench())
+
+
+if __name__ == "__main__":
+    main()
@@ -2,25 +2,42 @@ import uuid
 from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from loguru import logger
+from autohedge.log_pipeline import setup_log_pipeline
+from autohedge.orders import RoutingReport, TradeOrder
+
 
 class AutoHedgeOutput(BaseModel):
     id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    market_data: Optional[str] = None
     thesis: Optional[str] = None
+    sentiment: Optional[str] = None
+    analysis: Optional[str] = None
     risk_assessment: Optional[str] = None
     order: Optional[str] = None
+    trade_order: Optional[TradeOrder] = None
     decision: Optional[str] = None
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+    approved: bool = False
+    routed: bool = False
+    skipped_stages: List[str] = []
+    timed_out: bool = False
+    timestamp: str = Field(
+        default_factory=lambda: datetime.now().isoformat()
+    )
     current_stock: str
 
+
 class AutoHedgeOutputMain(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     id: str = Field(default_factory=lambda: uuid.uuid4().hex)
     stocks: Optional[list] = None
     task: Optional[str] = None
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
+    timestamp: str = Field(
+        default_factory=lambda: datetime.now().isoformat()
+    )
     logs: List[AutoHedgeOutput] = []
+    routing: Optional[RoutingReport] = None
+
 
 def setup_logging():
-    logger.add("logs/autohedge.log", rotation="500 MB", level="INFO")
+    setup_log_pipeline()
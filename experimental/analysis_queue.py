@@ -0,0 +1,238 @@
+"""
+Bounded work queue between the BTC websocket callback and the LLM.
+
+The websocket thread only calls `AnalysisQueue.put`, which never blocks;
+`AnalysisWorkerPool` threads drain the queue and run the slow analyses
+concurrently. When the queue is full the overflow policy decides what is
+lost:
+
+- ``drop_oldest``: evict the oldest queued item.
+- ``drop_newest``: reject the incoming item.
+- ``coalesce``: items with the same key (e.g. the watched address) merge
+  into the entry already queued; a full queue then evicts the oldest.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from loguru import logger
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+
+@dataclass
+class QueueEntry:
+    key: Hashable
+    items: List[Any]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def latest(self) -> Any:
+        return self.items[-1]
+
+
+class AnalysisQueue:
+    """
+    Thread-safe bounded queue with a configurable overflow policy.
+
+    Args:
+        maxsize: Maximum number of queued entries.
+        overflow: One of OVERFLOW_POLICIES.
+        max_coalesced: Items kept per coalesced entry (oldest dropped).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        overflow: str = "coalesce",
+        max_coalesced: int = 50,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"overflow must be one of {OVERFLOW_POLICIES}"
+            )
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.max_coalesced = max_coalesced
+        self._entries: "OrderedDict[Hashable, QueueEntry]" = (
+            OrderedDict()
+        )
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._closed = False
+        self.stats = {
+            "enqueued": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "processed": 0,
+            "max_depth": 0,
+        }
+        self._lag_total = 0.0
+        self._last_lag = 0.0
+        self._dequeued = 0
+
+    def put(self, key: Hashable, item: Any) -> bool:
+        """
+        Enqueue without blocking. Returns False if the item was dropped.
+        """
+        with self._cond:
+            if self._closed:
+                return False
+            if self.overflow == "coalesce":
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.items.append(item)
+                    del entry.items[: -self.max_coalesced]
+                    self.stats["coalesced"] += 1
+                    return True
+                slot = key
+            else:
+                # Unique slot per item; the key still travels with it
+                slot = (key, next(self._seq))
+
+            if len(self._entries) >= self.maxsize:
+                if self.overflow == "drop_newest":
+                    self.stats["dropped"] += 1
+                    return False
+                _, dropped = self._entries.popitem(last=False)
+                self.stats["dropped"] += len(dropped.items)
+                logger.warning(
+                    "Analysis queue full; dropped entry for"
+                    f" {dropped.key}"
+                )
+
+            self._entries[slot] = QueueEntry(key=key, items=[item])
+            self.stats["enqueued"] += 1
+            self.stats["max_depth"] = max(
+                self.stats["max_depth"], len(self._entries)
+            )
+            self._cond.notify()
+            return True
+
+    def get(
+        self, timeout: Optional[float] = None
+    ) -> Optional[QueueEntry]:
+        """
+        Next entry in FIFO order, or None on timeout or close.
+        """
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._entries or self._closed, timeout
+            ):
+                return None
+            if not self._entries:
+                return None
+            _, entry = self._entries.popitem(last=False)
+            lag = time.monotonic() - entry.enqueued_at
+            self._dequeued += 1
+            self._last_lag = lag
+            self._lag_total += lag
+            return entry
+
+    def task_done(self) -> None:
+        with self._cond:
+            self.stats["processed"] += 1
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Depth, counters and lag: how long entries waited before a worker
+        picked them up, and the age of the oldest entry still queued.
+        """
+        with self._cond:
+            oldest = next(iter(self._entries.values()), None)
+            return {
+                "depth": len(self._entries),
+                "in_flight": self._dequeued - self.stats["processed"],
+                **self.stats,
+                "oldest_age_seconds": (
+                    time.monotonic() - oldest.enqueued_at
+                    if oldest
+                    else 0.0
+                ),
+                "last_lag_seconds": self._last_lag,
+                "avg_lag_seconds": (
+                    self._lag_total / self._dequeued
+                    if self._dequeued
+                    else 0.0
+                ),
+            }
+
+
+class AnalysisWorkerPool:
+    """
+    Threads that drain an AnalysisQueue into `handler(entry)`.
+
+    Args:
+        queue: The queue to drain.
+        handler: Called with each QueueEntry; exceptions are logged.
+        workers: Number of worker threads.
+        metrics_interval: Seconds between queue metric log lines
+            (0 disables).
+    """
+
+    def __init__(
+        self,
+        queue: AnalysisQueue,
+        handler: Callable[[QueueEntry], None],
+        workers: int = 4,
+        metrics_interval: float = 60.0,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.metrics_interval = metrics_interval
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work,
+                name=f"btc-analysis-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        if self.metrics_interval > 0:
+            thread = threading.Thread(
+                target=self._report,
+                name="btc-analysis-metrics",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            entry = self.queue.get(timeout=0.5)
+            if entry is None:
+                continue
+            try:
+                self.handler(entry)
+            except Exception as e:
+                logger.error(f"Analysis of {entry.key} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _report(self) -> None:
+        while not self._stop.wait(self.metrics_interval):
+            logger.info(f"Analysis queue: {self.queue.metrics()}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self.queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
@@ -0,0 +1,300 @@
+"""
+Append-only segmented store for BTC transaction analyses.
+
+Records are appended as JSON lines to rotating segment files
+(``segment_000001.jsonl``, ...). A SQLite index maps each tx hash to its
+segment, byte offset and length, and each address to the
+(timestamp, tx hash) pairs it appears in, so lookups by hash or by
+address and time range are index seeks plus one ``pread`` per record.
+
+`append` only buffers; a background thread writes each batch with one
+file write and one index transaction. On open, any segment tail written
+but not yet indexed (e.g. after a crash) is re-indexed.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    tx_hash TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_ts ON records (ts);
+CREATE TABLE IF NOT EXISTS addresses (
+    address TEXT NOT NULL,
+    ts REAL NOT NULL,
+    tx_hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS addresses_lookup ON addresses (address, ts);
+"""
+
+
+class AnalysisStore:
+    """
+    Args:
+        root: Directory holding segments and ``index.db``.
+        segment_bytes: Roll over to a new segment beyond this size.
+        flush_size: Write as soon as this many records are buffered.
+        flush_interval: Write buffered records at least this often.
+    """
+
+    def __init__(
+        self,
+        root: str = "btc_analyses",
+        segment_bytes: int = 64 * 1024 * 1024,
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._db = sqlite3.connect(
+            self.root / "index.db", check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db_lock = threading.Lock()
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._buffer_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        segments = self._segments()
+        self._segment = segments[-1] if segments else 1
+        self._recover()
+        self._file = open(self._segment_path(self._segment), "ab")
+
+        self._thread = threading.Thread(
+            target=self._flush_loop,
+            name="analysis-store",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _segment_path(self, segment: int) -> Path:
+        return self.root / f"segment_{segment:06d}.jsonl"
+
+    def _segments(self) -> List[int]:
+        return sorted(
+            int(p.stem.split("_")[1])
+            for p in self.root.glob("segment_*.jsonl")
+        )
+
+    def _recover(self) -> None:
+        """Index any tail of the last segment missing from the index."""
+        path = self._segment_path(self._segment)
+        if not path.exists():
+            return
+        row = self._db.execute(
+            "SELECT MAX(offset + length) FROM records WHERE"
+            " segment = ?",
+            (self._segment,),
+        ).fetchone()
+        indexed = row[0] or 0
+        if path.stat().st_size <= indexed:
+            return
+        entries = []
+        with open(path, "rb") as f:
+            f.seek(indexed)
+            offset = indexed
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn final write
+                entries.append((
+                    json.loads(line),
+                    self._segment,
+                    offset,
+                    len(line),
+                ))
+                offset += len(line)
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+        self._index(entries)
+        logger.info(
+            f"Re-indexed {len(entries)} records from {path.name}"
+        )
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Buffer a record. Needs ``tx_hash``; ``timestamp`` (epoch seconds)
+        defaults to now and ``addresses`` lists what to index it under.
+        """
+        if "tx_hash" not in record:
+            raise ValueError("Analysis records need a tx_hash")
+        record.setdefault("timestamp", time.time())
+        record.setdefault("addresses", [])
+        with self._buffer_lock:
+            self._buffer.append(record)
+            self._pending[record["tx_hash"]] = record
+            full = len(self._buffer) >= self.flush_size
+        if full:
+            self._wakeup.set()
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Analysis store flush failed: {e}")
+
+    def flush(self) -> None:
+        """Write and index everything buffered."""
+        with self._write_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return
+
+            entries, chunks = [], []
+            offset = self._file.tell()
+            for record in batch:
+                line = (
+                    json.dumps(record, separators=(",", ":")) + "\n"
+                ).encode()
+                if offset and offset + len(line) > self.segment_bytes:
+                    self._write(chunks)
+                    chunks = []
+                    self._roll()
+                    offset = 0
+                entries.append(
+                    (record, self._segment, offset, len(line))
+                )
+                chunks.append(line)
+                offset += len(line)
+            self._write(chunks)
+            self._index(entries)
+
+            with self._buffer_lock:
+                for record in batch:
+                    if self._pending.get(record["tx_hash"]) is record:
+                        del self._pending[record["tx_hash"]]
+
+    def _write(self, chunks: List[bytes]) -> None:
+        if chunks:
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+
+    def _roll(self) -> None:
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), "ab")
+
+    def _index(
+        self, entries: List[Tuple[Dict, int, int, int]]
+    ) -> None:
+        with self._db_lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?,"
+                " ?, ?)",
+                [
+                    (r["tx_hash"], seg, off, length, r["timestamp"])
+                    for r, seg, off, length in entries
+                ],
+            )
+            self._db.executemany(
+                "INSERT INTO addresses VALUES (?, ?, ?)",
+                [
+                    (address, r["timestamp"], r["tx_hash"])
+                    for r, _, _, _ in entries
+                    for address in r.get("addresses", [])
+                ],
+            )
+
+    def _read(
+        self, segment: int, offset: int, length: int
+    ) -> Dict[str, Any]:
+        fd = os.open(self._segment_path(segment), os.O_RDONLY)
+        try:
+            return json.loads(os.pread(fd, length, offset))
+        finally:
+            os.close(fd)
+
+    def get(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Latest record for a tx hash, including unflushed ones."""
+        with self._buffer_lock:
+            record = self._pending.get(tx_hash)
+        if record is not None:
+            return record
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT segment, offset, length FROM records WHERE"
+                " tx_hash = ?",
+                (tx_hash,),
+            ).fetchone()
+        return self._read(*row) if row else None
+
+    def _fetch(
+        self, query: str, params: Iterable
+    ) -> List[Dict[str, Any]]:
+        with self._db_lock:
+            rows = self._db.execute(query, tuple(params)).fetchall()
+        return [self._read(*row) for row in rows]
+
+    def by_address(
+        self,
+        address: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Flushed records indexed under an address, newest first."""
+        return self._fetch(
+            "SELECT r.segment, r.offset, r.length FROM addresses a "
+            "JOIN records r ON r.tx_hash = a.tx_hash "
+            "WHERE a.address = ? AND a.ts >= ? AND a.ts <= ? "
+            "GROUP BY r.tx_hash ORDER BY MAX(a.ts) DESC LIMIT ?",
+            (
+                address,
+                start if start is not None else float("-inf"),
+                end if end is not None else float("inf"),
+                limit,
+            ),
+        )
+
+    def time_range(
+        self, start: float, end: float, limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """Flushed records with start <= timestamp <= end, oldest first."""
+        return self._fetch(
+            "SELECT segment, offset, length FROM records "
+            "WHERE ts >= ? AND ts <= ? ORDER BY ts LIMIT ?",
+            (start, end, limit),
+        )
+
+    def __len__(self) -> int:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM records"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """Flush, stop the writer thread and close files."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+        with self._db_lock:
+            self._db.close()
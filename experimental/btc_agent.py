@@ -2,13 +2,24 @@ import os
 from loguru import logger
 from swarm_models import OpenAIChat
 from swarms import Agent
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional, Set
 import websocket
 import json
 from datetime import datetime
+import itertools
 import threading
 import signal
 import sys
+import time
+
+from experimental.analysis_queue import (
+    AnalysisQueue,
+    AnalysisWorkerPool,
+    QueueEntry,
+)
+from experimental.analysis_store import AnalysisStore
+from experimental.tx_scoring import TransactionScorer, local_summary
+from experimental.watchlist import AddressWatchlist
 
 model = OpenAIChat(
     model_name="gpt-4o", openai_api_key=os.getenv("OPENAI_API_KEY")
@@ -34,33 +45,109 @@ Provide actionable insights in a clear, structured format."""
 
 
 class BTCTransactionMonitor:
-    def __init__(self):
-        """Initialize the BTC transaction monitor with swarms Agent"""
-        self.agent = Agent(
-            agent_name="BTC-Analysis-Agent",
+    def __init__(
+        self,
+        queue_size: int = 1000,
+        overflow: str = "coalesce",
+        analysis_workers: int = 4,
+        metrics_interval: float = 60.0,
+        watchlist: Optional[AddressWatchlist] = None,
+        subscribe_interval: float = 0.05,
+        scorer: Optional[TransactionScorer] = None,
+        store: Optional[AnalysisStore] = None,
+    ):
+        """
+        Initialize the BTC transaction monitor.
+
+        Args:
+            queue_size: Maximum queued analyses before the overflow policy
+                applies.
+            overflow: "drop_oldest", "drop_newest" or "coalesce" (merge
+                queued transactions per monitored address).
+            analysis_workers: Concurrent analysis threads, each with its
+                own swarms Agent.
+            metrics_interval: Seconds between queue metric log lines.
+            watchlist: Watched addresses; can be changed at runtime with
+                `watch`, `unwatch` and `load_watchlist`.
+            subscribe_interval: Pause between subscription batches.
+            scorer: Local significance scorer; only transactions at or
+                above its threshold are sent to the LLM.
+            store: Where analyses are kept; defaults to an append-only
+                segmented store under ``btc_analyses/``.
+        """
+        # Agents keep conversation state, so each worker gets its own
+        self._local = threading.local()
+        self._agent_ids = itertools.count(1)
+        self._agent_lock = threading.Lock()
+
+        self.queue = AnalysisQueue(
+            maxsize=queue_size, overflow=overflow
+        )
+        self.workers = AnalysisWorkerPool(
+            self.queue,
+            self._process_entry,
+            workers=analysis_workers,
+            metrics_interval=metrics_interval,
+        )
+
+        self.watchlist = watchlist or AddressWatchlist()
+        self.scorer = scorer or TransactionScorer()
+        self.store = store or AnalysisStore()
+        self.prefilter_stats = {"local": 0, "escalated": 0}
+        self.subscribe_interval = subscribe_interval
+        self._connected = threading.Event()
+        self._firehose = False
+        # Per-address subscriptions open on the current connection
+        self._subscribed: Set[str] = set()
+
+        self.running = False
+        self.ws = None
+
+    def _create_agent(self, worker_id: int) -> Agent:
+        return Agent(
+            agent_name=f"BTC-Analysis-Agent-{worker_id}",
             system_prompt=BTC_AGENT_SYSTEM_PROMPT,
-            agent_description="Real-time Bitcoin transaction analysis agent",
+            agent_description=(
+                "Real-time Bitcoin transaction analysis agent"
+            ),
             llm=model,
             max_loops="auto",
             autosave=True,
             verbose=True,
-            streaming_on=True,
+            # Concurrent workers would interleave streamed tokens
+            streaming_on=False,
             dynamic_temperature_enabled=True,
-            saved_state_path="btc_agent_state.json",
+            saved_state_path=f"btc_agent_state_{worker_id}.json",
             retry_attempts=3,
             context_length=4000,
         )
 
-        self.running = False
-        self.ws = None
-        self.monitored_address = None
+    @property
+    def agent(self) -> Agent:
+        """The calling thread's agent."""
+        if not hasattr(self._local, "agent"):
+            with self._agent_lock:
+                worker_id = next(self._agent_ids)
+            self._local.agent = self._create_agent(worker_id)
+        return self._local.agent
 
-    def analyze_transaction(self, tx_data: Dict[str, Any]) -> str:
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Analysis queue depth, drop/coalesce counters and lag, plus how
+        many transactions the local prefilter kept away from the LLM.
+        """
+        return {**self.queue.metrics(), **self.prefilter_stats}
+
+    def analyze_transaction(
+        self, tx_data: Dict[str, Any], coalesced: int = 0
+    ) -> str:
         """
         Use the swarms agent to analyze a transaction
 
         Args:
             tx_data: Transaction data to analyze
+            coalesced: Earlier transactions for the same address that were
+                merged into this analysis while queued
 
         Returns:
             Analysis results as a string
@@ -79,6 +166,7 @@ class BTCTransactionMonitor:
         Value: {value_btc} BTC
         Inputs: {len(tx_data.get('inputs', []))}
         Outputs: {len(tx_data.get('out', []))}
+        Earlier queued transactions for this address: {coalesced}
         
         Please analyze this transaction focusing on:
         1. Transaction significance
@@ -99,62 +187,193 @@ class BTCTransactionMonitor:
             if data.get("op") == "utx" or data.get("op") == "tx":
                 tx_data = data.get("x", {})
 
-                # Check if transaction involves our monitored address
-                addresses = []
-                # Check outputs
-                for out in tx_data.get("out", []):
-                    addresses.append(out.get("addr", ""))
-                # Check inputs
-                for inp in tx_data.get("inputs", []):
-                    prev_out = inp.get("prev_out", {})
-                    addresses.append(prev_out.get("addr", ""))
-
-                if self.monitored_address in addresses:
+                # One set lookup per input/output, whatever the watchlist size
+                matched = self.watchlist.match(tx_data)
+                if matched:
                     logger.info(
-                        f"New transaction detected: {tx_data.get('hash', 'Unknown')}"
+                        "New transaction detected:"
+                        f" {tx_data.get('hash', 'Unknown')}"
                     )
-
-                    # Analyze the transaction
-                    analysis = self.analyze_transaction(tx_data)
-
-                    # Log and store the analysis
-                    logger.info(
-                        f"\nTransaction Analysis:\n{analysis}"
-                    )
-                    self._store_analysis(
-                        tx_data.get("hash", "unknown"),
-                        {
-                            "transaction": tx_data,
-                            "analysis": analysis,
-                            "timestamp": datetime.now().isoformat(),
-                        },
+                    significance = self.scorer.score(
+                        tx_data, matched[0]
                     )
+                    if not significance.escalate:
+                        # Routine activity gets a local summary, no LLM call
+                        self.prefilter_stats["local"] += 1
+                        self._store_analysis(
+                            tx_data.get("hash", "unknown"),
+                            {
+                                "transaction": tx_data,
+                                "analysis": local_summary(
+                                    tx_data, significance
+                                ),
+                                "significance": significance.score,
+                            },
+                        )
+                        return
+                    self.prefilter_stats["escalated"] += 1
+                    # Analysis runs on the worker pool; never block the socket
+                    self.queue.put(matched[0], tx_data)
 
         except json.JSONDecodeError:
             logger.error("Failed to decode websocket message")
         except Exception as e:
             logger.error(f"Error processing message: {str(e)}")
 
+    def _process_entry(self, entry: QueueEntry):
+        """
+        Analyze and store one queued entry (runs on a worker thread).
+        Coalesced entries are analyzed once, for the newest transaction,
+        and the analysis is stored under every merged hash.
+        """
+        tx_data = entry.latest
+        tx_hash = tx_data.get("hash", "unknown")
+        earlier = [
+            tx.get("hash", "unknown") for tx in entry.items[:-1]
+        ]
+        analysis = self.analyze_transaction(
+            tx_data, coalesced=len(earlier)
+        )
+
+        # Log and store the analysis
+        logger.info(f"\nTransaction Analysis:\n{analysis}")
+        self._store_analysis(
+            tx_hash,
+            {
+                "transaction": tx_data,
+                "analysis": analysis,
+                "coalesced_hashes": earlier,
+            },
+        )
+        # Earlier hashes stay retrievable with get_analysis
+        for tx, earlier_hash in zip(entry.items[:-1], earlier):
+            self._store_analysis(
+                earlier_hash,
+                {
+                    "transaction": tx,
+                    "analysis": analysis,
+                    "coalesced_into": tx_hash,
+                },
+            )
+
     def _on_error(self, ws, error):
         """Handle websocket errors"""
         logger.error(f"WebSocket error: {str(error)}")
 
     def _on_close(self, ws, close_status_code, close_msg):
         """Handle websocket connection closing"""
+        self._connected.clear()
         logger.info("WebSocket connection closed")
-        if self.running:
-            logger.info("Attempting to reconnect...")
-            self._connect_websocket()
 
     def _on_open(self, ws):
         """Handle websocket connection opening"""
         logger.info("WebSocket connection established")
-        # Subscribe to address
-        subscription = {
-            "op": "addr_sub",
-            "addr": self.monitored_address,
-        }
-        ws.send(json.dumps(subscription))
+        self._connected.set()
+        self._subscribed = set()
+        # Subscribe off the socket thread so incoming messages keep flowing
+        threading.Thread(
+            target=self._subscribe_all, args=(ws,), daemon=True
+        ).start()
+
+    def _send(self, ws, message: Dict[str, Any]) -> None:
+        try:
+            ws.send(json.dumps(message))
+        except Exception as e:
+            logger.error(f"Failed to send {message.get('op')}: {e}")
+
+    def _subscribe_all(self, ws):
+        """
+        Send the watchlist subscriptions in batches (on every connect).
+        """
+        self._firehose = self.watchlist.firehose
+        batches = self.watchlist.subscription_batches()
+        if self._firehose:
+            # The stream covers every address; drop the per-address ones
+            unsub = [
+                {"op": "addr_unsub", "addr": address}
+                for address in sorted(self._subscribed)
+            ]
+            size = self.watchlist.batch_size
+            batches = [
+                unsub[i : i + size]
+                for i in range(0, len(unsub), size)
+            ] + batches
+            self._subscribed = set()
+        else:
+            self._subscribed = {
+                message["addr"]
+                for batch in batches
+                for message in batch
+            }
+        for i, batch in enumerate(batches):
+            for message in batch:
+                self._send(ws, message)
+            if i + 1 < len(batches):
+                time.sleep(self.subscribe_interval)
+        logger.info(
+            f"Subscribed to {len(self.watchlist)} addresses"
+            + (
+                " via the unconfirmed transaction stream"
+                if self._firehose
+                else ""
+            )
+        )
+
+    def _sync_subscription(self, op: str, address: str) -> None:
+        """
+        Mirror a runtime watchlist change on the open connection.
+        """
+        if not self._connected.is_set() or self.ws is None:
+            return
+        if self.watchlist.firehose != self._firehose:
+            # Crossed the firehose threshold; switch subscription mode
+            if self._firehose:
+                self._send(self.ws, {"op": "unconfirmed_unsub"})
+            self._subscribe_all(self.ws)
+        elif not self._firehose:
+            self._send(self.ws, {"op": op, "addr": address})
+            if op == "addr_sub":
+                self._subscribed.add(address)
+            else:
+                self._subscribed.discard(address)
+
+    def watch(self, address: str) -> bool:
+        """Add an address to the watchlist at runtime."""
+        added = self.watchlist.add(address)
+        if added:
+            self._sync_subscription("addr_sub", address)
+        return added
+
+    def unwatch(self, address: str) -> bool:
+        """Remove an address from the watchlist at runtime."""
+        removed = self.watchlist.remove(address)
+        if removed:
+            self._sync_subscription("addr_unsub", address)
+        return removed
+
+    def load_watchlist(self, path: str) -> int:
+        """Add addresses from a file and resubscribe if connected."""
+        added = self.watchlist.load(path)
+        if added and self._connected.is_set() and self.ws is not None:
+            self._subscribe_all(self.ws)
+        return added
+
+    def _run_websocket(self):
+        """Keep a connection open, reconnecting with backoff."""
+        backoff = 1.0
+        while self.running:
+            self._connect_websocket()
+            started = time.monotonic()
+            self.ws.run_forever()
+            if not self.running:
+                break
+            if time.monotonic() - started > 60:
+                backoff = 1.0
+            logger.info(
+                f"Attempting to reconnect in {backoff:.0f}s..."
+            )
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
 
     def _connect_websocket(self):
         """Establish WebSocket connection"""
@@ -175,13 +394,33 @@ class BTCTransactionMonitor:
             analysis: Analysis results to store
         """
         try:
-            filename = f"analysis_{tx_hash}.json"
-            with open(filename, "w") as f:
-                json.dump(analysis, f, indent=2)
-            logger.info(f"Stored analysis results in {filename}")
+            # Buffered; batched into the segment files by the store
+            self.store.append({
+                **analysis,
+                "tx_hash": tx_hash,
+                "timestamp": time.time(),
+                "analyzed_at": datetime.now().isoformat(),
+                "addresses": self.watchlist.match(
+                    analysis.get("transaction", {})
+                ),
+            })
         except Exception as e:
             logger.error(f"Error storing analysis: {str(e)}")
 
+    def get_analysis(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Stored analysis for a transaction hash."""
+        return self.store.get(tx_hash)
+
+    def analyses_for_address(
+        self,
+        address: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: int = 100,
+    ):
+        """Stored analyses touching an address, newest first."""
+        return self.store.by_address(address, start, end, limit)
+
     def monitor_address(self, address: str):
         """
         Start monitoring a Bitcoin address
@@ -189,20 +428,32 @@ class BTCTransactionMonitor:
         Args:
             address: Bitcoin address to monitor
         """
-        self.monitored_address = address
+        self.monitor_addresses([address])
+
+    def monitor_addresses(self, addresses: Iterable[str] = ()):
+        """
+        Start monitoring the watchlist plus `addresses`
+
+        Args:
+            addresses: Bitcoin addresses to add before starting
+        """
+        self.watchlist.add_many(addresses)
         self.running = True
 
         logger.info(
-            f"Starting real-time monitoring for address: {address}"
+            "Starting real-time monitoring for"
+            f" {len(self.watchlist)} addresses"
         )
 
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._handle_shutdown)
         signal.signal(signal.SIGTERM, self._handle_shutdown)
 
+        # Analyses run off the websocket thread
+        self.workers.start()
+
         # Connect and run WebSocket in a separate thread
-        self._connect_websocket()
-        ws_thread = threading.Thread(target=self.ws.run_forever)
+        ws_thread = threading.Thread(target=self._run_websocket)
         ws_thread.daemon = True
         ws_thread.start()
 
@@ -221,7 +472,11 @@ class BTCTransactionMonitor:
         self.running = False
         if self.ws:
             self.ws.close()
-        logger.info("Monitoring stopped")
+        self.workers.stop()
+        self.store.close()
+        logger.info(
+            f"Monitoring stopped; analysis queue: {self.metrics()}"
+        )
 
 
 def main():
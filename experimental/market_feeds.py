@@ -0,0 +1,473 @@
+"""
+Market data feeds for the market maker.
+
+Every feed publishes `MarketData` snapshots per trading pair. Consumers
+await `updates()` / `next_update()` and always receive the freshest
+snapshot (updates are conflated per pair), so a slow strategy never works
+through a backlog of stale prices.
+
+- `RestPollingFeed` polls Coinbase (Binance fallback) over one pooled,
+  long-lived `aiohttp.ClientSession`.
+- `WebSocketTickerFeed` subscribes to a streaming ticker channel
+  (Coinbase format) and reconnects with backoff.
+- `FeedMultiplexer` merges several feeds into one stream.
+- `LocalTickerServer` is a localhost websocket stand-in speaking the same
+  protocol, for tests and demos.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import aiohttp
+from aiohttp import web
+from loguru import logger
+
+
+@dataclass
+class MarketData:
+    """Holds real-time market data for a trading pair."""
+
+    timestamp: float = field(default_factory=time.time)
+    best_bid: float = 0.0
+    best_ask: float = 0.0
+    last_price: float = 0.0
+    volume: float = 0.0
+    trading_pair: str = ""
+
+
+def create_session(
+    limit: int = 100, timeout: float = 10.0
+) -> aiohttp.ClientSession:
+    """
+    Pooled HTTP session with keep-alive; share one per process.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit, keepalive_timeout=60, ttl_dns_cache=300
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+class Subscription:
+    """Conflating per-consumer view of a feed."""
+
+    def __init__(self, trading_pairs: Optional[Iterable[str]] = None):
+        self.trading_pairs = (
+            None if trading_pairs is None else set(trading_pairs)
+        )
+        self._dirty: Dict[str, MarketData] = {}
+        self._event = asyncio.Event()
+
+    def push(self, data: MarketData) -> None:
+        if (
+            self.trading_pairs is None
+            or data.trading_pair in self.trading_pairs
+        ):
+            self._dirty[data.trading_pair] = data
+            self._event.set()
+
+    async def get(self) -> List[MarketData]:
+        """
+        Wait for and return every pair updated since the previous call.
+        """
+        while not self._dirty:
+            self._event.clear()
+            await self._event.wait()
+        changed = list(self._dirty.values())
+        self._dirty.clear()
+        return changed
+
+
+class MarketFeed:
+    """
+    Base class: publishes snapshots to any number of subscriptions, so
+    one feed (and its connection) can be shared by many consumers.
+    """
+
+    def __init__(self):
+        self._latest: Dict[str, MarketData] = {}
+        self._subscriptions: Dict[
+            Union[str, int, None], Subscription
+        ] = {}
+
+    def subscribe(
+        self, trading_pairs: Optional[Iterable[str]] = None
+    ) -> Subscription:
+        subscription = Subscription(trading_pairs)
+        self._subscriptions[id(subscription)] = subscription
+        return subscription
+
+    def publish(self, data: MarketData) -> None:
+        self._latest[data.trading_pair] = data
+        for subscription in self._subscriptions.values():
+            subscription.push(data)
+
+    def latest(self, trading_pair: str) -> Optional[MarketData]:
+        return self._latest.get(trading_pair)
+
+    async def updates(self) -> List[MarketData]:
+        """
+        Wait for every pair updated since the previous call.
+        """
+        if None not in self._subscriptions:
+            self._subscriptions[None] = Subscription()
+        return await self._subscriptions[None].get()
+
+    async def next_update(self, trading_pair: str) -> MarketData:
+        """
+        Wait for the next update of a single pair.
+        """
+        if trading_pair not in self._subscriptions:
+            self._subscriptions[trading_pair] = Subscription(
+                [trading_pair]
+            )
+        return (await self._subscriptions[trading_pair].get())[-1]
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+def _symbol(trading_pair: str, separator: str) -> str:
+    return trading_pair.replace("/", separator)
+
+
+class RestPollingFeed(MarketFeed):
+    """
+    Polls public REST tickers on one long-lived pooled session.
+
+    The tickers only carry a last price, so bid/ask are simulated with
+    `spread_percentage`, or the pair's entry in `pair_spreads`.
+    """
+
+    def __init__(
+        self,
+        trading_pairs: List[str],
+        spread_percentage: float = 0.001,
+        poll_interval: float = 5.0,
+        session: Optional[aiohttp.ClientSession] = None,
+        pair_spreads: Optional[Dict[str, float]] = None,
+    ):
+        super().__init__()
+        self.trading_pairs = list(trading_pairs)
+        self.spread_percentage = spread_percentage
+        self.pair_spreads = dict(pair_spreads or {})
+        self.poll_interval = poll_interval
+        self._session = session
+        self._owns_session = session is None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        if self._session is None:
+            self._session = create_session()
+        self._task = asyncio.create_task(self._poll_loop())
+
+    async def _poll_loop(self) -> None:
+        while True:
+            results = await asyncio.gather(
+                *[self.fetch(pair) for pair in self.trading_pairs]
+            )
+            for data in results:
+                self.publish(data)
+            await asyncio.sleep(self.poll_interval)
+
+    def _snapshot(
+        self, trading_pair: str, last_price: float
+    ) -> MarketData:
+        # Simulating bid/ask spread
+        spread = last_price * self.pair_spreads.get(
+            trading_pair, self.spread_percentage
+        )
+        return MarketData(
+            timestamp=time.time(),
+            best_bid=last_price - spread / 2,
+            best_ask=last_price + spread / 2,
+            last_price=last_price,
+            volume=0.0,  # Coinbase API doesn't provide volume in free tier
+            trading_pair=trading_pair,
+        )
+
+    async def fetch(self, trading_pair: str) -> MarketData:
+        """
+        Fetch one ticker: Coinbase first, Binance as fallback and a
+        simulated snapshot as a last resort.
+        """
+        try:
+            # Coinbase public ticker (free, no API key)
+            async with self._session.get(
+                f"https://api.coinbase.com/v2/prices/{_symbol(trading_pair, '-')}/spot"
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+                return self._snapshot(
+                    trading_pair, float(data["data"]["amount"])
+                )
+        except Exception as e:
+            logger.error(f"Market data fetch error: {e}")
+
+        # Fallback to alternative free source if first fails
+        try:
+            async with self._session.get(
+                f"https://api.binance.com/api/v3/ticker/price?symbol={_symbol(trading_pair, '')}"
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+                return self._snapshot(
+                    trading_pair, float(data["price"])
+                )
+        except Exception as inner_e:
+            logger.error(f"Backup market data fetch error: {inner_e}")
+
+        # Completely fallback to a simulated market data
+        return MarketData(
+            timestamp=time.time(),
+            best_bid=50000.0,
+            best_ask=50100.0,
+            last_price=50050.0,
+            volume=100.0,
+            trading_pair=trading_pair,
+        )
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class FeedMultiplexer(MarketFeed):
+    """
+    Merges several feeds (e.g. a websocket feed for liquid pairs and REST
+    polling for the rest) into one stream with a single subscription
+    point.
+    """
+
+    def __init__(self, feeds: Iterable[MarketFeed]):
+        super().__init__()
+        self.feeds = list(feeds)
+        for feed in self.feeds:
+            feed._subscriptions[id(self)] = _Forwarder(self)
+
+    async def start(self) -> None:
+        await asyncio.gather(*[feed.start() for feed in self.feeds])
+
+    async def close(self) -> None:
+        await asyncio.gather(*[feed.close() for feed in self.feeds])
+
+
+class _Forwarder:
+    """Subscription stand-in that republishes into a multiplexer."""
+
+    def __init__(self, target: MarketFeed):
+        self.target = target
+
+    def push(self, data: MarketData) -> None:
+        self.target.publish(data)
+
+
+def parse_coinbase_ticker(message: Dict) -> Optional[MarketData]:
+    """
+    Parse a Coinbase ``ticker`` channel message.
+    """
+    if message.get("type") != "ticker":
+        return None
+    price = float(message["price"])
+    return MarketData(
+        timestamp=time.time(),
+        best_bid=float(message.get("best_bid") or price),
+        best_ask=float(message.get("best_ask") or price),
+        last_price=price,
+        volume=float(message.get("volume_24h") or 0.0),
+        trading_pair=message["product_id"].replace("-", "/"),
+    )
+
+
+class WebSocketTickerFeed(MarketFeed):
+    """
+    Streaming ticker feed over a websocket, reconnecting with
+    exponential backoff.
+    """
+
+    def __init__(
+        self,
+        trading_pairs: List[str],
+        url: str = "wss://ws-feed.exchange.coinbase.com",
+        session: Optional[aiohttp.ClientSession] = None,
+        parser: Callable[
+            [Dict], Optional[MarketData]
+        ] = parse_coinbase_ticker,
+        max_backoff: float = 30.0,
+    ):
+        super().__init__()
+        self.trading_pairs = list(trading_pairs)
+        self.url = url
+        self.parser = parser
+        self.max_backoff = max_backoff
+        self._session = session
+        self._owns_session = session is None
+        self._task: Optional[asyncio.Task] = None
+        self.connected = asyncio.Event()
+
+    def subscription(self) -> Dict:
+        return {
+            "type": "subscribe",
+            "product_ids": [
+                _symbol(p, "-") for p in self.trading_pairs
+            ],
+            "channels": ["ticker"],
+        }
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        if self._session is None:
+            self._session = create_session()
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        backoff = 0.5
+        while True:
+            try:
+                async with self._session.ws_connect(
+                    self.url, heartbeat=15.0
+                ) as ws:
+                    await ws.send_json(self.subscription())
+                    self.connected.set()
+                    backoff = 0.5
+                    logger.info(
+                        f"Ticker feed connected to {self.url}"
+                    )
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            data = self.parser(json.loads(msg.data))
+                            if data is not None:
+                                self.publish(data)
+                        elif msg.type == aiohttp.WSMsgType.ERROR:
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ticker feed error: {e}")
+            self.connected.clear()
+            logger.warning(
+                "Ticker feed disconnected; retrying in"
+                f" {backoff:.1f}s"
+            )
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class LocalTickerServer:
+    """
+    Localhost websocket server emulating the Coinbase ticker channel.
+
+    Example:
+        server = LocalTickerServer()
+        url = await server.start()
+        feed = WebSocketTickerFeed(["BTC/USD"], url=url)
+        await server.publish("BTC/USD", 50000.0)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._clients: Dict[web.WebSocketResponse, set] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handler(
+        self, request: web.Request
+    ) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._clients[ws] = set()
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                message = json.loads(msg.data)
+                if message.get("type") == "subscribe":
+                    self._clients[ws].update(
+                        message.get("product_ids", [])
+                    )
+        finally:
+            self._clients.pop(ws, None)
+        return ws
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/", self._handler)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"ws://{self.host}:{self.port}/"
+
+    async def publish(
+        self,
+        trading_pair: str,
+        price: float,
+        best_bid: float = None,
+        best_ask: float = None,
+        volume: float = 0.0,
+    ) -> int:
+        """
+        Send a ticker message to every subscribed client; returns the
+        number of clients reached.
+        """
+        product_id = _symbol(trading_pair, "-")
+        message = json.dumps({
+            "type": "ticker",
+            "product_id": product_id,
+            "price": str(price),
+            "best_bid": str(
+                best_bid if best_bid is not None else price
+            ),
+            "best_ask": str(
+                best_ask if best_ask is not None else price
+            ),
+            "volume_24h": str(volume),
+        })
+        sent = 0
+        for ws, products in list(self._clients.items()):
+            if product_id in products and not ws.closed:
+                await ws.send_str(message)
+                sent += 1
+        return sent
+
+    def subscribers(self, trading_pair: str) -> int:
+        product_id = _symbol(trading_pair, "-")
+        return sum(product_id in p for p in self._clients.values())
+
+    async def stop(self) -> None:
+        for ws in list(self._clients):
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
@@ -1,15 +1,50 @@
+"""
+Experimental crypto market maker.
+
+Run from the repository root with ``python -m experimental.market_making``.
+"""
+
 import asyncio
-import csv
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from datetime import datetime
+from collections import Counter
+import itertools
 import json
-import time
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
-import aiohttp
-import pandas as pd
 from loguru import logger
 
+from experimental.market_feeds import (
+    MarketData,
+    MarketFeed,
+    RestPollingFeed,
+)
+from experimental.order_book import Fill, FillSimulator
+from experimental.replay import (
+    ReplayEngine,
+    WallClock,
+    load_events,
+)
+from experimental.trade_journal import MemoryJournal, TradeJournal
+
+
+_logging_configured = False
+
+
+def configure_logging(
+    path: Optional[str] = "market_maker.log",
+) -> None:
+    """
+    Add the market maker log file sink once per process, however many
+    market makers are created. Pass None to skip the file sink (e.g. in
+    sweep workers).
+    """
+    global _logging_configured
+    if not _logging_configured:
+        if path:
+            logger.add(path, rotation="10 MB", enqueue=True)
+        _logging_configured = True
+
 
 # Market Making Strategy Configuration
 @dataclass
@@ -29,34 +64,60 @@ class MarketMakingConfig:
         0.1  # 10% deviation triggers rebalance
     )
     min_profit_threshold: float = 0.002  # 0.2% minimum profit target
-
-
-@dataclass
-class MarketData:
-    """Holds real-time market data for a trading pair."""
-
-    timestamp: float = field(default_factory=time.time)
-    best_bid: float = 0.0
-    best_ask: float = 0.0
-    last_price: float = 0.0
-    volume: float = 0.0
+    requote_tolerance: float = (
+        0.0005  # 0.05% mid move triggers requote
+    )
+    quote_ttl: float = (
+        30.0  # Requote quotes older than this (seconds)
+    )
 
 
 class MarketMaker:
     """Advanced Market Making Algorithm for Crypto Trading."""
 
-    def __init__(self, config: MarketMakingConfig):
+    def __init__(
+        self,
+        config: MarketMakingConfig,
+        feed: Optional[MarketFeed] = None,
+        journal: Optional[TradeJournal] = None,
+        clock=None,
+        simulator: Optional[FillSimulator] = None,
+    ):
         """
         Initialize the market maker with given configuration.
 
         Args:
             config (MarketMakingConfig): Configuration for market making strategy
+            feed (MarketFeed): Market data feed; may be shared between
+                market makers. Defaults to polling the public REST tickers.
+            journal (TradeJournal): Fill journal; may be shared between
+                market makers. Defaults to a CSV journal for this pair.
+            clock: Time source with ``time()`` and ``async sleep()``.
+                Defaults to wall-clock time; replays inject a simulated one.
+            simulator (FillSimulator): When set, quotes rest in the
+                simulated book and fill through it instead of filling
+                instantly.
         """
         self.config = config
-        self.market_data = MarketData()
+        self.clock = clock or WallClock()
+        self.simulator = simulator
+        self.market_data = MarketData(
+            trading_pair=config.trading_pair
+        )
+
+        # Shared feeds and journals are started/closed by their owner
+        self._owns_feed = feed is None
+        self.feed = feed or RestPollingFeed(
+            [config.trading_pair],
+            spread_percentage=config.spread_percentage,
+        )
+        self._owns_journal = journal is None
+        self.journal = journal or TradeJournal(
+            f"market_making_{config.trading_pair.replace('/', '-')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        )
 
-        # Logging setup
-        logger.add("market_maker.log", rotation="10 MB")
+        # Logging setup (one shared sink per process)
+        configure_logging()
 
         # Trading state tracking
         self.current_inventory = {
@@ -66,93 +127,22 @@ class MarketMaker:
 
         # Order tracking
         self.active_orders: Dict[str, Dict] = {}
+        self._order_ids = itertools.count(1)
+        self.trade_count = 0
 
-        # CSV logging setup
-        self.csv_filename = f"market_making_{config.trading_pair}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        self.initialize_csv_log()
-
-    def initialize_csv_log(self):
-        """Initialize CSV log with headers."""
-        with open(self.csv_filename, "w", newline="") as csvfile:
-            fieldnames = [
-                "timestamp",
-                "event_type",
-                "price",
-                "amount",
-                "base_inventory",
-                "quote_inventory",
-                "total_value",
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
+        # Requote state: what the resting quotes were computed from
+        self.cost_basis = 0.0
+        self.last_quote: Optional[Dict] = None
+        self.requote_stats: Counter = Counter()
 
     async def fetch_market_data(self) -> MarketData:
         """
-        Fetch real-time market data from multiple free sources.
+        Wait for the next market data update for this pair from the feed.
 
         Returns:
             MarketData: Current market data snapshot
         """
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Coinbase public ticker (free, no API key)
-                async with session.get(
-                    f"https://api.coinbase.com/v2/prices/{self.config.trading_pair.replace('/', '-')}/spot"
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        last_price = float(data["data"]["amount"])
-
-                        # Simulating bid/ask spread
-                        spread = (
-                            last_price * self.config.spread_percentage
-                        )
-
-                        return MarketData(
-                            timestamp=time.time(),
-                            best_bid=last_price - spread / 2,
-                            best_ask=last_price + spread / 2,
-                            last_price=last_price,
-                            volume=0.0,  # Coinbase API doesn't provide volume in free tier
-                        )
-
-            except Exception as e:
-                logger.error(f"Market data fetch error: {e}")
-
-                # Fallback to alternative free source if first fails
-                try:
-                    async with session.get(
-                        f"https://api.binance.com/api/v3/ticker/price?symbol={self.config.trading_pair.replace('/', '')}"
-                    ) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            last_price = float(data["price"])
-
-                            spread = (
-                                last_price
-                                * self.config.spread_percentage
-                            )
-
-                            return MarketData(
-                                timestamp=time.time(),
-                                best_bid=last_price - spread / 2,
-                                best_ask=last_price + spread / 2,
-                                last_price=last_price,
-                                volume=0.0,
-                            )
-                except Exception as inner_e:
-                    logger.error(
-                        f"Backup market data fetch error: {inner_e}"
-                    )
-
-                    # Completely fallback to a simulated market data
-                    return MarketData(
-                        timestamp=time.time(),
-                        best_bid=50000.0,
-                        best_ask=50100.0,
-                        last_price=50050.0,
-                        volume=100.0,
-                    )
+        return await self.feed.next_update(self.config.trading_pair)
 
     def calculate_order_size(self) -> float:
         """
@@ -176,35 +166,28 @@ class MarketMaker:
 
         return min(order_size, max_order_size)
 
-    def simulate_order(
+    def _execute(
         self, order_type: str, price: float, amount: float
-    ) -> Dict:
+    ) -> bool:
         """
-        Simulate an order execution without actual trading.
-
-        Args:
-            order_type (str): 'buy' or 'sell'
-            price (float): Order price
-            amount (float): Order amount
-
-        Returns:
-            Dict: Simulated order details
+        Apply a fill to inventory and journal it. Returns False if the
+        inventory cannot cover it.
         """
-        order_id = f"sim_{int(time.time() * 1000)}"
-
         if order_type == "buy":
             # Simulate buying
             if self.current_inventory["quote"] >= price * amount:
                 self.current_inventory["base"] += amount
                 self.current_inventory["quote"] -= price * amount
+                self.cost_basis += price * amount
                 logger.info(f"Simulated BUY: {amount} @ {price}")
             else:
                 logger.warning("Insufficient funds for buy order")
-                return {}
+                return False
 
         elif order_type == "sell":
             # Simulate selling
             if self.current_inventory["base"] >= amount:
+                self.cost_basis -= self.average_cost() * amount
                 self.current_inventory["base"] -= amount
                 self.current_inventory["quote"] += price * amount
                 logger.info(f"Simulated SELL: {amount} @ {price}")
@@ -212,38 +195,42 @@ class MarketMaker:
                 logger.warning(
                     "Insufficient base asset for sell order"
                 )
-                return {}
-
-        # Log to CSV
-        with open(self.csv_filename, "a", newline="") as csvfile:
-            writer = csv.DictWriter(
-                csvfile,
-                fieldnames=[
-                    "timestamp",
-                    "event_type",
-                    "price",
-                    "amount",
-                    "base_inventory",
-                    "quote_inventory",
-                    "total_value",
-                ],
-            )
-            writer.writerow(
-                {
-                    "timestamp": time.time(),
-                    "event_type": order_type.upper(),
-                    "price": price,
-                    "amount": amount,
-                    "base_inventory": self.current_inventory["base"],
-                    "quote_inventory": self.current_inventory[
-                        "quote"
-                    ],
-                    "total_value": (
-                        self.current_inventory["base"] * price
-                        + self.current_inventory["quote"]
-                    ),
-                }
-            )
+                return False
+
+        self.trade_count += 1
+        # Buffered; written off the event loop by the journal
+        self.journal.record({
+            "timestamp": self.clock.time(),
+            "trading_pair": self.config.trading_pair,
+            "event_type": order_type.upper(),
+            "price": price,
+            "amount": amount,
+            "base_inventory": self.current_inventory["base"],
+            "quote_inventory": self.current_inventory["quote"],
+            "total_value": (
+                self.current_inventory["base"] * price
+                + self.current_inventory["quote"]
+            ),
+        })
+        return True
+
+    def simulate_order(
+        self, order_type: str, price: float, amount: float
+    ) -> Dict:
+        """
+        Simulate an order execution without actual trading.
+
+        Args:
+            order_type (str): 'buy' or 'sell'
+            price (float): Order price
+            amount (float): Order amount
+
+        Returns:
+            Dict: Simulated order details
+        """
+        order_id = f"sim_{next(self._order_ids)}"
+        if not self._execute(order_type, price, amount):
+            return {}
 
         return {
             "order_id": order_id,
@@ -253,39 +240,201 @@ class MarketMaker:
             "status": "filled",
         }
 
-    async def market_making_strategy(self):
+    def average_cost(self) -> float:
+        base = self.current_inventory["base"]
+        return self.cost_basis / base if base > 0 else 0.0
+
+    def inventory_ratio(self, price: float) -> float:
         """
-        Core market making strategy implementation.
-        Continuously fetches market data and places orders.
+        Share of portfolio value held in the base asset.
         """
-        while True:
-            try:
-                # Fetch latest market data
-                self.market_data = await self.fetch_market_data()
+        base_value = self.current_inventory["base"] * price
+        total = base_value + self.current_inventory["quote"]
+        return base_value / total if total > 0 else 0.0
 
-                # Calculate order parameters
-                order_size = self.calculate_order_size()
+    def requote_reasons(
+        self, data: MarketData, now: float
+    ) -> List[str]:
+        """
+        Why the resting quotes must be recomputed; empty to keep them.
+        """
+        last = self.last_quote
+        if last is None:
+            return ["new"]
+        reasons = []
+        mid = (data.best_bid + data.best_ask) / 2
+        if (
+            abs(mid - last["mid"])
+            > self.config.requote_tolerance * last["mid"]
+        ):
+            reasons.append("mid")
+        if (
+            abs(self.inventory_ratio(mid) - last["inventory_ratio"])
+            > self.config.rebalance_threshold
+        ):
+            reasons.append("inventory")
+        if now - last["time"] >= self.config.quote_ttl:
+            reasons.append("stale")
+        if (
+            self.simulator is not None
+            and len(self.active_orders) < last["sides"]
+        ):
+            reasons.append("filled")
+        return reasons
+
+    def clears_min_profit(self, sell_price: float) -> bool:
+        """
+        A sell must clear the average cost of the inventory it closes by
+        `min_profit_threshold`; buys open inventory and always qualify.
+        """
+        cost = self.average_cost()
+        return cost == 0.0 or sell_price >= cost * (
+            1 + self.config.min_profit_threshold
+        )
 
-                # Place buy order slightly below market
-                buy_price = self.market_data.best_bid * (
-                    1 - self.config.spread_percentage / 2
-                )
-                self.simulate_order("buy", buy_price, order_size)
+    def place_quotes(
+        self,
+        buy_price: Optional[float],
+        sell_price: Optional[float],
+        amount: float,
+    ) -> None:
+        """
+        Replace our resting quotes in the fill simulator; a None price
+        leaves that side unquoted.
+        """
+        now = self.clock.time()
+        for order_id in self.active_orders:
+            self.simulator.cancel(order_id, now)
+        self.active_orders = {}
+        if (
+            buy_price is not None
+            and self.current_inventory["quote"] >= buy_price * amount
+        ):
+            order_id = self.simulator.place(
+                True, buy_price, amount, now
+            )
+            self.active_orders[order_id] = {
+                "type": "buy",
+                "price": buy_price,
+            }
+        if (
+            sell_price is not None
+            and self.current_inventory["base"] >= amount
+        ):
+            order_id = self.simulator.place(
+                False, sell_price, amount, now
+            )
+            self.active_orders[order_id] = {
+                "type": "sell",
+                "price": sell_price,
+            }
 
-                # Place sell order slightly above market
-                sell_price = self.market_data.best_ask * (
-                    1 + self.config.spread_percentage / 2
-                )
+    def apply_fill(self, fill: Fill) -> None:
+        """
+        Book a (possibly partial) fill reported by the fill simulator.
+        """
+        self._execute(
+            "buy" if fill.is_bid else "sell", fill.price, fill.size
+        )
+        if fill.remaining == 0:
+            self.active_orders.pop(fill.order_id, None)
+
+    def quote(self) -> Tuple[float, float, float]:
+        """
+        Buy price, sell price and size for the current market data.
+        """
+        order_size = self.calculate_order_size()
+
+        # Place buy order slightly below market
+        buy_price = self.market_data.best_bid * (
+            1 - self.config.spread_percentage / 2
+        )
+        # Place sell order slightly above market
+        sell_price = self.market_data.best_ask * (
+            1 + self.config.spread_percentage / 2
+        )
+        return buy_price, sell_price, order_size
+
+    def on_market_data(self, data: MarketData) -> bool:
+        """
+        One strategy step; shared by the live loop and the replay engine.
+        Quotes are only recomputed when `requote_reasons` finds a reason.
+
+        Returns:
+            bool: Whether the quotes were recomputed
+        """
+        self.market_data = data
+        now = self.clock.time()
+        reasons = self.requote_reasons(data, now)
+        if not reasons:
+            self.requote_stats["kept"] += 1
+            return False
+        self.requote_stats.update(reasons)
+
+        buy_price, sell_price, order_size = self.quote()
+        if not self.clears_min_profit(sell_price):
+            self.requote_stats["sell_skipped"] += 1
+            sell_price = None
+        if self.simulator is not None:
+            self.place_quotes(buy_price, sell_price, order_size)
+        else:
+            self.simulate_order("buy", buy_price, order_size)
+            if sell_price is not None:
                 self.simulate_order("sell", sell_price, order_size)
 
-                # Wait before next iteration
-                await asyncio.sleep(
-                    5
-                )  # Adjust based on desired trading frequency
+        mid = (data.best_bid + data.best_ask) / 2
+        self.last_quote = {
+            "mid": mid,
+            "time": now,
+            "inventory_ratio": self.inventory_ratio(mid),
+            "sides": len(self.active_orders),
+        }
+        return True
+
+    def performance(self, mark_price: Optional[float] = None) -> Dict:
+        """
+        Summary of the run, marking inventory at `mark_price` (defaults to
+        the last seen price).
+        """
+        mark_price = mark_price or self.market_data.last_price
+        initial_capital = self.config.total_capital
+        final_value = (
+            self.current_inventory["base"] * mark_price
+            + self.current_inventory["quote"]
+        )
+        return {
+            "initial_capital": initial_capital,
+            "final_value": final_value,
+            "total_return_percentage": (
+                (final_value - initial_capital) / initial_capital
+            ) * 100,
+            "total_trades": self.trade_count,
+        }
+
+    async def market_making_strategy(self):
+        """
+        Core market making strategy implementation.
+        Reacts to market data updates from the feed; without updates the
+        last data is re-evaluated once per `quote_ttl` so quotes never
+        go stale.
+        """
+        while True:
+            try:
+                # Fetch latest market data
+                try:
+                    data = await asyncio.wait_for(
+                        self.fetch_market_data(),
+                        timeout=self.config.quote_ttl,
+                    )
+                except asyncio.TimeoutError:
+                    data = self.market_data
+                    if not data.last_price:
+                        continue
+                self.on_market_data(data)
 
             except Exception as e:
                 logger.error(f"Market making strategy error: {e}")
-                await asyncio.sleep(10)  # Pause on error
+                await self.clock.sleep(10)  # Pause on error
 
     async def run(self):
         """
@@ -294,7 +443,15 @@ class MarketMaker:
         logger.info(
             f"Starting Market Making for {self.config.trading_pair}"
         )
-        await self.market_making_strategy()
+        await self.feed.start()
+        await self.journal.start()
+        try:
+            await self.market_making_strategy()
+        finally:
+            if self._owns_feed:
+                await self.feed.close()
+            if self._owns_journal:
+                await self.journal.close()
 
 
 def main():
@@ -312,9 +469,13 @@ def main():
         ),
     ]
 
+    # Imported here: the engine builds on this module
+    from experimental.multi_pair import MultiPairMarketMaker
+
     async def run_market_makers():
-        market_makers = [MarketMaker(config) for config in configs]
-        await asyncio.gather(*[mm.run() for mm in market_makers])
+        # One engine, one pooled feed and one journal for every pair
+        engine = MultiPairMarketMaker(configs)
+        await engine.run()
 
     asyncio.run(run_market_makers())
 
@@ -325,79 +486,31 @@ if __name__ == "__main__":
 
 # Backtest Evaluation Script
 def backtest_market_maker(
-    historical_data_path: str, config: MarketMakingConfig
+    historical_data_path: str,
+    config: MarketMakingConfig,
+    latency: float = 0.05,
 ):
     """
-    Backtest the market making strategy on historical data.
+    Backtest the market making strategy on historical data by replaying
+    it through the same strategy code the live loop runs.
 
     Args:
-        historical_data_path (str): Path to CSV with historical price data
+        historical_data_path (str): CSV with ``close`` prices or recorded
+            ticker/book events (.csv or .jsonl), see `experimental.replay`
         config (MarketMakingConfig): Market making configuration
+        latency (float): Simulated order latency in seconds
 
     Returns:
         Dict: Performance metrics
     """
-    # Load historical data
-    df = pd.read_csv(historical_data_path)
-
-    # Initialize backtest state
-    initial_capital = config.total_capital
-    current_inventory = {"base": 0.0, "quote": initial_capital}
-
-    # Tracking variables
-    trades = []
-
-    # Simulate strategy
-    for _, row in df.iterrows():
-        current_price = row["close"]
-
-        # Market making logic (simplified)
-        spread = current_price * config.spread_percentage
-        buy_price = current_price - spread / 2
-        sell_price = current_price + spread / 2
-
-        order_size = (
-            initial_capital * config.order_size_percentage
-        ) / current_price
-
-        # Simulate buy
-        if current_inventory["quote"] >= buy_price * order_size:
-            current_inventory["base"] += order_size
-            current_inventory["quote"] -= buy_price * order_size
-            trades.append(
-                {
-                    "type": "BUY",
-                    "price": buy_price,
-                    "amount": order_size,
-                }
-            )
-
-        # Simulate sell
-        if current_inventory["base"] >= order_size:
-            current_inventory["base"] -= order_size
-            current_inventory["quote"] += sell_price * order_size
-            trades.append(
-                {
-                    "type": "SELL",
-                    "price": sell_price,
-                    "amount": order_size,
-                }
-            )
-
-    # Calculate performance
-    final_value = (
-        current_inventory["base"] * df.iloc[-1]["close"]
-        + current_inventory["quote"]
+    events = load_events(
+        historical_data_path,
+        trading_pair=config.trading_pair,
+        synthetic_spread=config.spread_percentage,
     )
-
-    return {
-        "initial_capital": initial_capital,
-        "final_value": final_value,
-        "total_return_percentage": (
-            ((final_value - initial_capital) / initial_capital) * 100
-        ),
-        "total_trades": len(trades),
-    }
+    market_maker = MarketMaker(config, journal=MemoryJournal())
+    engine = ReplayEngine([market_maker], events, latency=latency)
+    return engine.run()[config.trading_pair]
 
 
 # Example usage for backtest
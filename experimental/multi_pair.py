@@ -0,0 +1,341 @@
+"""
+Multi-pair quoting engine.
+
+`MultiPairMarketMaker` runs the `MarketMaker` strategy for hundreds of
+pairs from one process: a single feed subscription (optionally a
+`FeedMultiplexer` over several feeds) writes updates into per-pair numpy
+arrays, and each tick the requote triggers, quotes, paper fills and
+inventory updates are computed for all pairs at once. Fills go to one
+shared journal and logging uses the shared market maker sink.
+"""
+
+import asyncio
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from experimental.market_feeds import (
+    MarketData,
+    MarketFeed,
+    RestPollingFeed,
+)
+from experimental.market_making import (
+    MarketMakingConfig,
+    configure_logging,
+)
+from experimental.replay import WallClock
+from experimental.trade_journal import TradeJournal
+
+_CONFIG_FIELDS = (
+    "total_capital",
+    "spread_percentage",
+    "order_size_percentage",
+    "max_inventory_exposure",
+    "rebalance_threshold",
+    "min_profit_threshold",
+    "requote_tolerance",
+    "quote_ttl",
+)
+
+
+class MultiPairMarketMaker:
+    """
+    Vectorized paper market maker over many pairs.
+
+    Args:
+        configs: One MarketMakingConfig per pair.
+        feed: Shared market data feed. Defaults to REST polling of every
+            configured pair, simulating each pair's bid/ask with its
+            own `spread_percentage` like the single-pair MarketMaker.
+        journal: Shared fill journal for all pairs.
+        clock: Time source with ``time()`` and ``async sleep()``.
+    """
+
+    def __init__(
+        self,
+        configs: List[MarketMakingConfig],
+        feed: Optional[MarketFeed] = None,
+        journal: Optional[TradeJournal] = None,
+        clock=None,
+    ):
+        configure_logging()
+        self.configs = list(configs)
+        self.pairs = [c.trading_pair for c in self.configs]
+        self.index: Dict[str, int] = {
+            p: i for i, p in enumerate(self.pairs)
+        }
+        if len(self.index) != len(self.pairs):
+            raise ValueError(
+                "Each trading pair may only be configured once"
+            )
+        self.clock = clock or WallClock()
+
+        self._owns_feed = feed is None
+        self.feed = feed or RestPollingFeed(
+            self.pairs,
+            pair_spreads={
+                c.trading_pair: c.spread_percentage
+                for c in self.configs
+            },
+        )
+        self._owns_journal = journal is None
+        self.journal = journal or TradeJournal(
+            "market_making_multi.csv"
+        )
+
+        n = len(self.pairs)
+        # Per-pair configuration columns
+        self.params = {
+            name: np.array(
+                [getattr(c, name) for c in self.configs],
+                dtype=np.float64,
+            )
+            for name in _CONFIG_FIELDS
+        }
+        # Market state
+        self.best_bid = np.zeros(n)
+        self.best_ask = np.zeros(n)
+        self.last_price = np.zeros(n)
+        self.has_data = np.zeros(n, dtype=bool)
+        self.dirty = np.zeros(n, dtype=bool)
+        # Inventory
+        self.base = np.zeros(n)
+        self.quote = self.params["total_capital"].copy()
+        self.cost_basis = np.zeros(n)
+        self.trade_count = np.zeros(n, dtype=np.int64)
+        # What the last quotes were computed from
+        self.last_mid = np.full(n, np.nan)
+        self.last_quote_time = np.zeros(n)
+        self.last_ratio = np.zeros(n)
+        self.requote_stats: Counter = Counter()
+
+    def on_market_data(self, updates: List[MarketData]) -> None:
+        """
+        Write a batch of feed updates into the per-pair arrays.
+        """
+        for data in updates:
+            i = self.index.get(data.trading_pair)
+            if i is None:
+                continue
+            self.best_bid[i] = data.best_bid
+            self.best_ask[i] = data.best_ask
+            self.last_price[i] = data.last_price
+            self.has_data[i] = True
+            self.dirty[i] = True
+
+    def _ratio(self, mid: np.ndarray) -> np.ndarray:
+        base_value = self.base * mid
+        total = base_value + self.quote
+        return np.divide(
+            base_value,
+            total,
+            out=np.zeros_like(total),
+            where=total > 0,
+        )
+
+    def _avg_cost(self) -> np.ndarray:
+        return np.divide(
+            self.cost_basis,
+            self.base,
+            out=np.zeros_like(self.base),
+            where=self.base > 0,
+        )
+
+    def step(self, now: Optional[float] = None) -> int:
+        """
+        Evaluate every pair once; same rules as `MarketMaker.on_market_data`
+        with instant paper fills. Returns the number of pairs requoted.
+        """
+        now = self.clock.time() if now is None else now
+        p = self.params
+        mid = (self.best_bid + self.best_ask) / 2
+
+        new = self.has_data & np.isnan(self.last_mid)
+        with np.errstate(invalid="ignore"):
+            moved = (
+                np.abs(mid - self.last_mid)
+                > p["requote_tolerance"] * self.last_mid
+            )
+        moved &= self.dirty & ~new
+        shifted = (
+            (
+                np.abs(self._ratio(mid) - self.last_ratio)
+                > p["rebalance_threshold"]
+            )
+            & self.dirty
+            & ~new
+        )
+        stale = (
+            (now - self.last_quote_time >= p["quote_ttl"])
+            & self.has_data
+            & ~new
+        )
+        requote = (new | moved | shifted | stale) & (
+            self.last_price > 0
+        )
+        self.requote_stats["kept"] += int(
+            np.count_nonzero(self.dirty & ~requote)
+        )
+        for name, mask in (
+            ("new", new),
+            ("mid", moved),
+            ("inventory", shifted),
+            ("stale", stale),
+        ):
+            self.requote_stats[name] += int(np.count_nonzero(mask))
+        self.dirty[:] = False
+        if not requote.any():
+            return 0
+
+        size = np.divide(
+            np.minimum(
+                p["order_size_percentage"],
+                p["max_inventory_exposure"],
+            )
+            * p["total_capital"],
+            self.last_price,
+            out=np.zeros_like(self.last_price),
+            where=self.last_price > 0,
+        )
+        buy_price = self.best_bid * (1 - p["spread_percentage"] / 2)
+        sell_price = self.best_ask * (1 + p["spread_percentage"] / 2)
+        avg_cost = self._avg_cost()
+        sell_ok = (avg_cost == 0) | (
+            sell_price >= avg_cost * (1 + p["min_profit_threshold"])
+        )
+        self.requote_stats["sell_skipped"] += int(
+            np.count_nonzero(requote & ~sell_ok)
+        )
+
+        # Buy leg, then sell leg, as the single-pair strategy does
+        buys = requote & (self.quote >= buy_price * size)
+        self.base = np.where(buys, self.base + size, self.base)
+        self.quote = np.where(
+            buys, self.quote - buy_price * size, self.quote
+        )
+        self.cost_basis = np.where(
+            buys, self.cost_basis + buy_price * size, self.cost_basis
+        )
+        base_after_buy, quote_after_buy = (
+            self.base.copy(),
+            self.quote.copy(),
+        )
+
+        sells = requote & sell_ok & (self.base >= size)
+        self.cost_basis = np.where(
+            sells,
+            self.cost_basis - self._avg_cost() * size,
+            self.cost_basis,
+        )
+        self.base = np.where(sells, self.base - size, self.base)
+        self.quote = np.where(
+            sells, self.quote + sell_price * size, self.quote
+        )
+        self.trade_count += buys.astype(np.int64) + sells
+
+        self.last_mid = np.where(requote, mid, self.last_mid)
+        self.last_quote_time = np.where(
+            requote, now, self.last_quote_time
+        )
+        self.last_ratio = np.where(
+            requote, self._ratio(mid), self.last_ratio
+        )
+
+        for i in np.flatnonzero(buys | sells):
+            if buys[i]:
+                self._journal(
+                    i,
+                    "BUY",
+                    buy_price[i],
+                    size[i],
+                    now,
+                    base_after_buy[i],
+                    quote_after_buy[i],
+                )
+            if sells[i]:
+                self._journal(
+                    i,
+                    "SELL",
+                    sell_price[i],
+                    size[i],
+                    now,
+                    self.base[i],
+                    self.quote[i],
+                )
+
+        n_requoted = int(np.count_nonzero(requote))
+        logger.debug(
+            f"Requoted {n_requoted}/{len(self.pairs)} pairs: "
+            f"{int(buys.sum())} buys, {int(sells.sum())} sells"
+        )
+        return n_requoted
+
+    def _journal(
+        self, i, event_type, price, amount, now, base, quote
+    ) -> None:
+        self.journal.record({
+            "timestamp": now,
+            "trading_pair": self.pairs[i],
+            "event_type": event_type,
+            "price": float(price),
+            "amount": float(amount),
+            "base_inventory": float(base),
+            "quote_inventory": float(quote),
+            "total_value": float(base * price + quote),
+        })
+
+    def performance(self) -> Dict[str, Dict]:
+        """
+        Per-pair summary, marking inventory at the last seen price.
+        """
+        capital = self.params["total_capital"]
+        final = self.base * self.last_price + self.quote
+        return {
+            pair: {
+                "initial_capital": float(capital[i]),
+                "final_value": float(final[i]),
+                "total_return_percentage": float(
+                    (final[i] - capital[i]) / capital[i] * 100
+                ),
+                "total_trades": int(self.trade_count[i]),
+            }
+            for i, pair in enumerate(self.pairs)
+        }
+
+    async def run(self) -> None:
+        """
+        Consume the shared feed and step all pairs on every batch.
+        """
+        logger.info(
+            "Starting multi-pair market making for"
+            f" {len(self.pairs)} pairs"
+        )
+        subscription = self.feed.subscribe(self.pairs)
+        timeout = (
+            float(self.params["quote_ttl"].min())
+            if self.pairs
+            else None
+        )
+        await self.feed.start()
+        await self.journal.start()
+        try:
+            while True:
+                try:
+                    updates = await asyncio.wait_for(
+                        subscription.get(), timeout=timeout
+                    )
+                    self.on_market_data(updates)
+                except asyncio.TimeoutError:
+                    pass
+                try:
+                    self.step()
+                except Exception as e:
+                    logger.error(f"Multi-pair strategy error: {e}")
+                    await self.clock.sleep(10)  # Pause on error
+        finally:
+            if self._owns_feed:
+                await self.feed.close()
+            if self._owns_journal:
+                await self.journal.close()
@@ -0,0 +1,468 @@
+"""
+L2 order book and queue-aware fill simulator for the market maker.
+
+Prices are stored as integer ticks. Each side keeps a tick -> size map
+plus a sorted list of level ticks (best level at the end for bids and
+the start for asks). Size changes at an existing level are O(1) dict
+writes and top-of-book reads are O(1); adding or removing a level finds
+its slot by binary search but shifts the list, O(n) in the number of
+levels - a memmove that stays cheap at realistic book depths.
+
+`FillSimulator` models our resting quotes against that book: orders go
+live after a configurable latency, join the back of the queue at their
+level, only fill once the size ahead of them has traded, can be partially
+filled, and fill outright when the market trades through their price.
+"""
+
+import itertools
+from bisect import bisect_left, insort
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from experimental.market_feeds import MarketData
+
+BID = True
+ASK = False
+
+
+class BookSide:
+    """One side of an L2 book keyed by integer price ticks."""
+
+    __slots__ = ("is_bid", "ticks", "sizes")
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self.ticks: List[int] = []  # ascending
+        self.sizes: Dict[int, float] = {}
+
+    def update(self, tick: int, size: float) -> None:
+        sizes = self.sizes
+        if size <= 0.0:
+            if sizes.pop(tick, None) is not None:
+                ticks = self.ticks
+                del ticks[bisect_left(ticks, tick)]
+        else:
+            if tick not in sizes:
+                insort(self.ticks, tick)
+            sizes[tick] = size
+
+    def clear(self) -> None:
+        self.ticks.clear()
+        self.sizes.clear()
+
+    def best(self) -> Optional[int]:
+        if not self.ticks:
+            return None
+        return self.ticks[-1] if self.is_bid else self.ticks[0]
+
+    def levels(self, depth: int) -> List[Tuple[int, float]]:
+        """Best `depth` levels, best first."""
+        ticks = (
+            self.ticks[-depth:][::-1]
+            if self.is_bid
+            else self.ticks[:depth]
+        )
+        return [(t, self.sizes[t]) for t in ticks]
+
+    def __len__(self) -> int:
+        return len(self.ticks)
+
+
+class OrderBook:
+    """
+    L2 book for one trading pair with snapshot and sequenced diff
+    application.
+    """
+
+    def __init__(self, trading_pair: str, tick_size: float = 0.01):
+        self.trading_pair = trading_pair
+        self.tick_size = tick_size
+        self._inv_tick = 1.0 / tick_size
+        self.bids = BookSide(BID)
+        self.asks = BookSide(ASK)
+        self.sequence: Optional[int] = None
+        self.timestamp = 0.0
+        self.needs_snapshot = True
+
+    def to_tick(self, price: float) -> int:
+        return int(round(price * self._inv_tick))
+
+    def to_price(self, tick: int) -> float:
+        return round(tick * self.tick_size, 10)
+
+    def apply_snapshot(
+        self,
+        bids: Iterable[Tuple[float, float]],
+        asks: Iterable[Tuple[float, float]],
+        sequence: Optional[int] = None,
+        timestamp: float = 0.0,
+    ) -> None:
+        """Replace the whole book."""
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            side.clear()
+            for price, size in levels:
+                if size > 0:
+                    side.sizes[self.to_tick(price)] = size
+            side.ticks = sorted(side.sizes)
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.needs_snapshot = False
+
+    def apply_diff(
+        self,
+        is_bid: bool,
+        price: float,
+        size: float,
+        sequence: Optional[int] = None,
+        timestamp: float = 0.0,
+    ) -> bool:
+        """
+        Set the size of one level (0 removes it). Returns False and flags
+        `needs_snapshot` if a sequence gap is detected; stale diffs are
+        ignored.
+        """
+        if sequence is not None and self.sequence is not None:
+            if sequence <= self.sequence:
+                return True
+            if sequence != self.sequence + 1:
+                logger.warning(
+                    f"{self.trading_pair} book gap:"
+                    f" {self.sequence} -> {sequence}"
+                )
+                self.needs_snapshot = True
+                return False
+        (self.bids if is_bid else self.asks).update(
+            int(round(price * self._inv_tick)), size
+        )
+        if sequence is not None:
+            self.sequence = sequence
+        self.timestamp = timestamp
+        return True
+
+    def apply_diffs(
+        self,
+        sides: np.ndarray,
+        prices: np.ndarray,
+        sizes: np.ndarray,
+    ) -> None:
+        """
+        Apply a batch of unsequenced diffs given as parallel arrays; the
+        fast path for replay and bulk feeds.
+        """
+        ticks = np.rint(np.asarray(prices) * self._inv_tick).astype(
+            np.int64
+        )
+        bid_update = self.bids.update
+        ask_update = self.asks.update
+        for is_bid, tick, size in zip(
+            np.asarray(sides, dtype=bool).tolist(),
+            ticks.tolist(),
+            np.asarray(sizes, dtype=np.float64).tolist(),
+        ):
+            if is_bid:
+                bid_update(tick, size)
+            else:
+                ask_update(tick, size)
+
+    def best_bid(self) -> Optional[float]:
+        tick = self.bids.best()
+        return None if tick is None else self.to_price(tick)
+
+    def best_ask(self) -> Optional[float]:
+        tick = self.asks.best()
+        return None if tick is None else self.to_price(tick)
+
+    def mid(self) -> Optional[float]:
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return round((bid + ask) * self.tick_size / 2, 10)
+
+    def size_at(self, is_bid: bool, price: float) -> float:
+        side = self.bids if is_bid else self.asks
+        return side.sizes.get(self.to_tick(price), 0.0)
+
+    def depth(self, levels: int = 10) -> Dict[str, np.ndarray]:
+        """Top-of-book snapshot as numpy arrays, best level first."""
+        out = {}
+        for name, side in (("bid", self.bids), ("ask", self.asks)):
+            top = side.levels(levels)
+            out[f"{name}_prices"] = np.round(
+                np.array([t for t, _ in top]) * self.tick_size, 10
+            )
+            out[f"{name}_sizes"] = np.array(
+                [s for _, s in top], dtype=np.float64
+            )
+        return out
+
+    def to_market_data(self) -> MarketData:
+        bid, ask = self.best_bid(), self.best_ask()
+        mid = self.mid()
+        return MarketData(
+            timestamp=self.timestamp,
+            best_bid=bid or 0.0,
+            best_ask=ask or 0.0,
+            last_price=mid or 0.0,
+            trading_pair=self.trading_pair,
+        )
+
+
+@dataclass
+class RestingOrder:
+    order_id: str
+    is_bid: bool
+    tick: int
+    size: float
+    placed_at: float
+    active_at: float
+    remaining: float = 0.0
+    queue_ahead: float = 0.0
+    cancel_at: Optional[float] = None
+    status: str = "pending"  # pending, open, filled, cancelled
+
+    def __post_init__(self):
+        self.remaining = self.size
+
+
+@dataclass
+class Fill:
+    order_id: str
+    is_bid: bool
+    price: float
+    size: float
+    timestamp: float
+    liquidity: str = "maker"
+    remaining: float = 0.0
+
+
+@dataclass
+class FillSimulator:
+    """
+    Simulates fills of our resting orders against an `OrderBook`.
+
+    Args:
+        book: The book our orders rest in.
+        latency: Seconds before a placed order reaches the exchange.
+        cancel_latency: Seconds before a cancel takes effect; the order can
+            still fill in between. Defaults to `latency`.
+        max_history: Filled or cancelled orders kept in `orders`, and
+            fills kept in `fills`; the oldest go first, so a long replay
+            or live run stays bounded. Live orders are always kept.
+    """
+
+    book: OrderBook
+    latency: float = 0.05
+    cancel_latency: Optional[float] = None
+    orders: Dict[str, RestingOrder] = field(default_factory=dict)
+    fills: Deque[Fill] = field(default_factory=deque)
+    max_history: int = 10_000
+
+    def __post_init__(self):
+        if self.cancel_latency is None:
+            self.cancel_latency = self.latency
+        self._ids = itertools.count(1)
+        # Pending and open orders only, so per-update work stays bounded
+        self._live: Dict[str, RestingOrder] = {}
+        self._done: Deque[str] = deque()
+        self.fills = deque(self.fills, maxlen=self.max_history)
+
+    def place(
+        self, is_bid: bool, price: float, size: float, now: float
+    ) -> str:
+        order_id = f"sim_{next(self._ids)}"
+        self.orders[order_id] = RestingOrder(
+            order_id=order_id,
+            is_bid=is_bid,
+            tick=self.book.to_tick(price),
+            size=size,
+            placed_at=now,
+            active_at=now + self.latency,
+        )
+        self._live[order_id] = self.orders[order_id]
+        return order_id
+
+    def cancel(self, order_id: str, now: float) -> None:
+        order = self._live.get(order_id)
+        if order is not None and order.cancel_at is None:
+            order.cancel_at = now + self.cancel_latency
+
+    def open_orders(self) -> List[RestingOrder]:
+        return list(self._live.values())
+
+    def _retire(self, order: RestingOrder) -> None:
+        """Move a filled or cancelled order into the bounded history."""
+        self._live.pop(order.order_id, None)
+        self._done.append(order.order_id)
+        if len(self._done) > self.max_history:
+            self.orders.pop(self._done.popleft(), None)
+
+    def _fill(
+        self,
+        order: RestingOrder,
+        size: float,
+        now: float,
+        liquidity: str,
+        tick: Optional[int] = None,
+    ) -> Fill:
+        """Fill at `tick` (our own price unless we take liquidity)."""
+        size = min(size, order.remaining)
+        order.remaining -= size
+        if order.remaining <= 1e-12:
+            order.remaining = 0.0
+            order.status = "filled"
+            self._retire(order)
+        fill = Fill(
+            order_id=order.order_id,
+            is_bid=order.is_bid,
+            price=self.book.to_price(
+                order.tick if tick is None else tick
+            ),
+            size=size,
+            timestamp=now,
+            liquidity=liquidity,
+            remaining=order.remaining,
+        )
+        self.fills.append(fill)
+        return fill
+
+    def advance(self, now: float) -> List[Fill]:
+        """
+        Apply due cancels and activations, and fill orders the book has
+        moved through. Call after every book update.
+        """
+        fills = []
+        best_bid, best_ask = (
+            self.book.bids.best(),
+            self.book.asks.best(),
+        )
+        for order in self.open_orders():
+            if order.cancel_at is not None and now >= order.cancel_at:
+                order.status = "cancelled"
+                self._retire(order)
+                continue
+            if order.status == "pending":
+                if now < order.active_at:
+                    continue
+                order.status = "open"
+                crosses = (
+                    best_ask is not None and order.tick >= best_ask
+                    if order.is_bid
+                    else best_bid is not None
+                    and order.tick <= best_bid
+                )
+                if crosses:
+                    # Marketable on arrival: take opposing levels up to our
+                    # limit at their prices; any rest is first in queue
+                    side = (
+                        self.book.asks
+                        if order.is_bid
+                        else self.book.bids
+                    )
+                    for tick, size in side.levels(len(side)):
+                        if (
+                            (tick > order.tick)
+                            if order.is_bid
+                            else (tick < order.tick)
+                        ):
+                            break
+                        fills.append(
+                            self._fill(
+                                order, size, now, "taker", tick
+                            )
+                        )
+                        if order.status == "filled":
+                            break
+                    continue
+                # Join the back of the queue at our level
+                side = (
+                    self.book.bids if order.is_bid else self.book.asks
+                )
+                order.queue_ahead = side.sizes.get(order.tick, 0.0)
+                continue
+
+            # The opposite side trading through our price fills us fully
+            if (
+                order.is_bid
+                and best_ask is not None
+                and best_ask < order.tick
+            ):
+                fills.append(
+                    self._fill(order, order.remaining, now, "maker")
+                )
+            elif (
+                not order.is_bid
+                and best_bid is not None
+                and best_bid > order.tick
+            ):
+                fills.append(
+                    self._fill(order, order.remaining, now, "maker")
+                )
+        return fills
+
+    def on_level_update(
+        self, is_bid: bool, price: float, size: float
+    ) -> None:
+        """
+        Size at a level changed. The queue ahead of us can never exceed
+        what is left at the level, so reductions (cancels ahead of us)
+        move us forward; additions queue behind us.
+        """
+        tick = self.book.to_tick(price)
+        for order in self.open_orders():
+            if (
+                order.status == "open"
+                and order.is_bid == is_bid
+                and order.tick == tick
+            ):
+                order.queue_ahead = min(order.queue_ahead, size)
+
+    def on_trade(
+        self,
+        price: float,
+        size: float,
+        aggressor_is_bid: bool,
+        now: float,
+    ) -> List[Fill]:
+        """
+        A trade printed. Sell aggression consumes bids at or above the
+        trade price, buy aggression asks at or below it; at the trade
+        price the queue ahead of us is consumed first.
+        """
+        fills = []
+        tick = self.book.to_tick(price)
+        remaining = size
+        resting_bid = not aggressor_is_bid
+        candidates = sorted(
+            (
+                o
+                for o in self.open_orders()
+                if o.status == "open" and o.is_bid == resting_bid
+            ),
+            key=lambda o: -o.tick if resting_bid else o.tick,
+        )
+        for order in candidates:
+            if remaining <= 0:
+                break
+            through = (
+                order.tick > tick
+                if resting_bid
+                else order.tick < tick
+            )
+            at_price = order.tick == tick
+            if through:
+                fill = self._fill(order, remaining, now, "maker")
+                remaining -= fill.size
+                fills.append(fill)
+            elif at_price:
+                consumed = min(order.queue_ahead, remaining)
+                order.queue_ahead -= consumed
+                remaining -= consumed
+                if remaining > 0:
+                    fill = self._fill(order, remaining, now, "maker")
+                    remaining -= fill.size
+                    fills.append(fill)
+        return fills
@@ -0,0 +1,256 @@
+"""
+Tick-level replay for the market maker.
+
+`ReplayEngine` drives the same `MarketMaker.on_market_data` step the live
+loop uses, but from recorded events on a `SimulatedClock`, with fills
+coming from a per-pair `FillSimulator`. Events are processed strictly in
+order on one thread, so repeated runs produce identical fill sequences,
+and nothing waits on wall-clock time unless a `speed` is given.
+
+Recorded events are JSON lines (or CSV rows for tickers) with a
+``timestamp`` and ``trading_pair`` plus one of:
+
+- ``{"type": "ticker", "best_bid", "best_ask", "last_price", "volume"}``
+- ``{"type": "snapshot", "bids": [[price, size], ...], "asks": [...]}``
+- ``{"type": "diff", "side": "bid"|"ask", "price", "size", "sequence"}``
+- ``{"type": "trade", "price", "size", "side": "buy"|"sell"}`` (aggressor)
+
+CSV files with only a ``close`` column (the old backtest input) are read
+as tickers with a synthetic spread.
+"""
+
+import asyncio
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from loguru import logger
+
+from experimental.order_book import FillSimulator, OrderBook
+
+
+class WallClock:
+    """Real time; what the live market maker runs on."""
+
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class SimulatedClock:
+    """Virtual time advanced by the replay; sleeping costs nothing."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def time(self) -> float:
+        return self.now
+
+    def advance_to(self, timestamp: float) -> None:
+        if timestamp > self.now:
+            self.now = timestamp
+
+    async def sleep(self, seconds: float) -> None:
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def _ticker_from_row(row: Dict, synthetic_spread: float) -> Dict:
+    if "close" in row and "last_price" not in row:
+        price = float(row["close"])
+        half = price * synthetic_spread / 2
+        return {
+            "type": "ticker",
+            "best_bid": price - half,
+            "best_ask": price + half,
+            "last_price": price,
+            "volume": float(row.get("volume") or 0.0),
+            "synthetic": True,
+        }
+    return {
+        "type": "ticker",
+        "best_bid": float(row["best_bid"]),
+        "best_ask": float(row["best_ask"]),
+        "last_price": float(row["last_price"]),
+        "volume": float(row.get("volume") or 0.0),
+    }
+
+
+def load_events(
+    path: str,
+    trading_pair: Optional[str] = None,
+    synthetic_spread: float = 0.001,
+) -> List[Dict]:
+    """
+    Load recorded events from a .jsonl or .csv file, ordered by timestamp
+    (ties keep file order). `trading_pair` fills in rows that lack one.
+    """
+    path = Path(path)
+    events = []
+    if path.suffix == ".csv":
+        with open(path, newline="") as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                event = _ticker_from_row(row, synthetic_spread)
+                event["timestamp"] = float(row.get("timestamp") or i)
+                event["trading_pair"] = (
+                    row.get("trading_pair") or trading_pair
+                )
+                events.append(event)
+    else:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    event = json.loads(line)
+                    event.setdefault("type", "ticker")
+                    event.setdefault("trading_pair", trading_pair)
+                    events.append(event)
+    events.sort(key=lambda e: float(e["timestamp"]))
+    return events
+
+
+class ReplayEngine:
+    """
+    Runs market makers against recorded events.
+
+    Args:
+        makers: MarketMaker instances; each gets the engine's clock and a
+            fill simulator on its pair's book.
+        events: Events as produced by `load_events`.
+        latency: Order latency passed to each FillSimulator (seconds).
+        tick_size: Book tick size.
+        ticker_depth: Size given to each side when a ticker event is
+            turned into a one-level book.
+        speed: None replays as fast as possible; otherwise the replay is
+            paced at `speed` x real time (e.g. 100 or 10000).
+    """
+
+    def __init__(
+        self,
+        makers: Iterable,
+        events: Iterable[Dict],
+        clock: Optional[SimulatedClock] = None,
+        latency: float = 0.05,
+        tick_size: float = 0.01,
+        ticker_depth: float = 1.0,
+        speed: Optional[float] = None,
+    ):
+        self.makers = {
+            maker.config.trading_pair: maker for maker in makers
+        }
+        self.events = events
+        self.clock = clock or SimulatedClock()
+        self.ticker_depth = ticker_depth
+        self.speed = speed
+        self.books: Dict[str, OrderBook] = {}
+        self.simulators: Dict[str, FillSimulator] = {}
+        for pair, maker in self.makers.items():
+            book = OrderBook(pair, tick_size=tick_size)
+            self.books[pair] = book
+            self.simulators[pair] = FillSimulator(
+                book, latency=latency
+            )
+            maker.clock = self.clock
+            maker.simulator = self.simulators[pair]
+        self.events_processed = 0
+
+    def _pace(
+        self, timestamp: float, started: float, first: float
+    ) -> None:
+        target = started + (timestamp - first) / self.speed
+        delay = target - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _apply(
+        self,
+        event: Dict,
+        book: OrderBook,
+        sim: FillSimulator,
+        now: float,
+    ):
+        """Apply one event; returns (fills, book_changed)."""
+        kind = event["type"]
+        if kind == "ticker":
+            depth = self.ticker_depth
+            book.apply_snapshot(
+                [(float(event["best_bid"]), depth)],
+                [(float(event["best_ask"]), depth)],
+                timestamp=now,
+            )
+            return [], True
+        if kind == "snapshot":
+            book.apply_snapshot(
+                event["bids"],
+                event["asks"],
+                event.get("sequence"),
+                now,
+            )
+            return [], True
+        if kind == "diff":
+            is_bid = event["side"] == "bid"
+            price, size = float(event["price"]), float(event["size"])
+            if not book.apply_diff(
+                is_bid, price, size, event.get("sequence"), now
+            ):
+                return [], False
+            sim.on_level_update(is_bid, price, size)
+            return [], True
+        if kind == "trade":
+            fills = sim.on_trade(
+                float(event["price"]),
+                float(event["size"]),
+                event["side"] == "buy",
+                now,
+            )
+            return fills, False
+        raise ValueError(f"Unknown replay event type: {kind}")
+
+    def run(
+        self,
+        on_event: Optional[
+            Callable[[float, object, OrderBook], None]
+        ] = None,
+    ) -> Dict[str, Dict]:
+        """
+        Replay every event and return each maker's performance summary.
+        `on_event(timestamp, maker, book)` is called after each event, e.g.
+        to sample an equity curve.
+        """
+        events: Iterator[Dict] = iter(self.events)
+        started = time.monotonic()
+        first = None
+        for event in events:
+            pair = event["trading_pair"]
+            maker = self.makers.get(pair)
+            if maker is None:
+                continue
+            now = float(event["timestamp"])
+            if self.speed:
+                first = now if first is None else first
+                self._pace(now, started, first)
+            self.clock.advance_to(now)
+
+            sim = self.simulators[pair]
+            book = self.books[pair]
+            fills, changed = self._apply(event, book, sim, now)
+            fills.extend(sim.advance(now))
+            for fill in fills:
+                maker.apply_fill(fill)
+            if changed and book.mid() is not None:
+                maker.on_market_data(book.to_market_data())
+            if on_event is not None:
+                on_event(now, maker, book)
+            self.events_processed += 1
+
+        logger.info(
+            f"Replayed {self.events_processed} events for"
+            f" {len(self.makers)} pairs"
+        )
+        return {
+            pair: maker.performance(self.books[pair].mid())
+            for pair, maker in self.makers.items()
+        }
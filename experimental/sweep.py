@@ -0,0 +1,425 @@
+"""
+Parallel parameter sweeps over `MarketMakingConfig`.
+
+The price history is loaded once into a shared memory block; pool workers
+map it as a numpy array without copying and replay each config through
+the same `ReplayEngine` path as `backtest_market_maker`. Every finished
+config is appended to a JSONL results file, so an interrupted sweep picks
+up where it stopped when run again with the same file.
+
+Example:
+    configs = grid_configs(
+        spread_percentage=[0.0005, 0.001, 0.002],
+        order_size_percentage=[0.01, 0.02],
+        max_inventory_exposure=[0.1, 0.2, 0.4],
+    )
+    results = run_sweep("historical_prices.csv", configs, "sweep.jsonl")
+    print(format_table(results))
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, replace
+from multiprocessing import get_context, shared_memory
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from experimental.market_making import (
+    MarketMaker,
+    MarketMakingConfig,
+    configure_logging,
+)
+from experimental.replay import ReplayEngine, load_events
+from experimental.trade_journal import MemoryJournal
+
+SECONDS_PER_YEAR = 365 * 24 * 3600  # crypto trades around the clock
+RANK_METRICS = ("sharpe", "pnl", "return_percentage", "max_drawdown")
+
+# timestamp, best_bid, best_ask, last_price
+_COLUMNS = 4
+_worker: Dict = {}
+
+
+def load_price_history(
+    path: str, trading_pair: Optional[str] = None
+) -> np.ndarray:
+    """
+    Load ticker history as a (4, n) float64 array of timestamp, best_bid,
+    best_ask and last_price. Close-only CSV rows get NaN bid/ask, so each
+    config can apply its own synthetic spread as `backtest_market_maker`
+    does.
+    """
+    events = [
+        e
+        for e in load_events(path, trading_pair)
+        if e["type"] == "ticker"
+    ]
+    prices = np.empty((_COLUMNS, len(events)), dtype=np.float64)
+    for i, e in enumerate(events):
+        if e.get("synthetic"):
+            bid = ask = math.nan
+        else:
+            bid, ask = e["best_bid"], e["best_ask"]
+        prices[:, i] = (e["timestamp"], bid, ask, e["last_price"])
+    return prices
+
+
+def config_key(config: MarketMakingConfig) -> str:
+    return json.dumps(asdict(config), sort_keys=True)
+
+
+def grid_configs(
+    base: Optional[MarketMakingConfig] = None, **grid: Sequence
+) -> List[MarketMakingConfig]:
+    """
+    Every combination of the given field values on top of `base`.
+    """
+    base = base or MarketMakingConfig()
+    names = list(grid)
+    return [
+        replace(base, **dict(zip(names, values)))
+        for values in itertools.product(*(grid[n] for n in names))
+    ]
+
+
+def random_configs(
+    n: int,
+    base: Optional[MarketMakingConfig] = None,
+    seed: int = 0,
+    **ranges: Tuple[float, float],
+) -> List[MarketMakingConfig]:
+    """
+    `n` configs with fields drawn uniformly from ``(low, high)`` ranges.
+    Seeded, so a resumed random search regenerates the same configs.
+    """
+    base = base or MarketMakingConfig()
+    rng = random.Random(seed)
+    return [
+        replace(
+            base,
+            **{
+                name: rng.uniform(lo, hi)
+                for name, (lo, hi) in ranges.items()
+            },
+        )
+        for _ in range(n)
+    ]
+
+
+def _attach(shm_name: str, length: int, settings: Dict) -> None:
+    """Pool initializer: map the shared price block into this worker."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker["shm"] = shm
+    _worker["prices"] = np.ndarray(
+        (_COLUMNS, length), dtype=np.float64, buffer=shm.buf
+    )
+    _worker.update(settings)
+    # Fill-level logging from hundreds of replays is noise
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    configure_logging(None)
+
+
+def _events(
+    prices: np.ndarray,
+    trading_pair: str,
+    spread: float,
+    chunk: int = 4096,
+) -> Iterator[Dict]:
+    """
+    Ticker events read straight from the shared array, a chunk at a time.
+    """
+    length = prices.shape[1]
+    for start in range(0, length, chunk):
+        block = prices[:, start : start + chunk]
+        for ts, bid, ask, last in zip(
+            *(column.tolist() for column in block)
+        ):
+            if (
+                bid != bid
+            ):  # NaN: synthesize the spread like the backtest
+                half = last * spread / 2
+                bid, ask = last - half, last + half
+            yield {
+                "type": "ticker",
+                "timestamp": ts,
+                "trading_pair": trading_pair,
+                "best_bid": bid,
+                "best_ask": ask,
+                "last_price": last,
+            }
+
+
+def performance_metrics(
+    timestamps: Sequence[float],
+    equity: Sequence[float],
+    initial: float,
+) -> Dict[str, float]:
+    """
+    PnL, max drawdown (fraction of peak) and annualized Sharpe of an
+    equity curve.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    final = float(equity[-1]) if len(equity) else initial
+    metrics = {
+        "pnl": final - initial,
+        "return_percentage": (final - initial) / initial * 100,
+        "max_drawdown": 0.0,
+        "sharpe": 0.0,
+    }
+    if len(equity) < 3:
+        return metrics
+    peaks = np.maximum.accumulate(equity)
+    metrics["max_drawdown"] = float(np.max((peaks - equity) / peaks))
+    returns = np.diff(equity) / equity[:-1]
+    std = returns.std()
+    step = float(
+        np.median(np.diff(np.asarray(timestamps, dtype=np.float64)))
+    )
+    if std > 0 and step > 0:
+        metrics["sharpe"] = float(
+            returns.mean() / std * math.sqrt(SECONDS_PER_YEAR / step)
+        )
+    return metrics
+
+
+def evaluate_config(params: Dict) -> Dict:
+    """
+    Replay one config over the shared history (runs in a pool worker).
+    """
+    config = MarketMakingConfig(**params)
+    prices = _worker["prices"]
+    pair = config.trading_pair
+    maker = MarketMaker(config, journal=MemoryJournal())
+    engine = ReplayEngine(
+        [maker],
+        _events(prices, pair, config.spread_percentage),
+        latency=_worker["latency"],
+    )
+
+    sample_every = _worker["sample_every"]
+    timestamps: List[float] = []
+    equity: List[float] = []
+
+    def sample(now, maker, book):
+        if engine.events_processed % sample_every == 0:
+            timestamps.append(now)
+            inventory = maker.current_inventory
+            equity.append(
+                inventory["base"] * book.mid() + inventory["quote"]
+            )
+
+    summary = engine.run(on_event=sample)[pair]
+    timestamps.append(float(prices[0, -1]))
+    equity.append(summary["final_value"])
+    return {
+        "config": params,
+        "total_trades": summary["total_trades"],
+        **performance_metrics(
+            timestamps, equity, config.total_capital
+        ),
+    }
+
+
+def load_results(path: Optional[str]) -> Dict[str, Dict]:
+    results = {}
+    if path and Path(path).exists():
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    result = json.loads(line)
+                    results[
+                        json.dumps(result["config"], sort_keys=True)
+                    ] = result
+    return results
+
+
+def rank_results(
+    results: List[Dict], rank_by: str = "sharpe"
+) -> List[Dict]:
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"rank_by must be one of {RANK_METRICS}")
+    # Lower drawdown is better; higher is better for everything else
+    return sorted(
+        results,
+        key=lambda r: r[rank_by],
+        reverse=rank_by != "max_drawdown",
+    )
+
+
+def run_sweep(
+    history_path: str,
+    configs: List[MarketMakingConfig],
+    results_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    trading_pair: Optional[str] = None,
+    latency: float = 0.05,
+    sample_every: int = 100,
+    rank_by: str = "sharpe",
+) -> List[Dict]:
+    """
+    Evaluate configs in parallel and return results ranked by `rank_by`.
+
+    Args:
+        history_path: Price history (.csv or .jsonl tickers).
+        configs: Configs to evaluate.
+        results_path: JSONL file results are appended to; configs already
+            in it are skipped, which makes the sweep resumable.
+        workers: Pool size; defaults to the CPU count.
+        trading_pair: Pair for history rows that lack one.
+        latency: Simulated order latency (seconds).
+        sample_every: Events between equity samples for drawdown/Sharpe.
+    """
+    done = load_results(results_path)
+    pending, seen = [], set(done)
+    for config in configs:
+        key = config_key(config)
+        if key not in seen:
+            seen.add(key)
+            pending.append(config)
+    logger.info(
+        f"Sweep: {len(configs)} configs,"
+        f" {len(configs) - len(pending)} already done"
+    )
+
+    if pending:
+        prices = load_price_history(history_path, trading_pair)
+        shm = shared_memory.SharedMemory(
+            create=True, size=max(prices.nbytes, 1)
+        )
+        try:
+            np.ndarray(
+                prices.shape, dtype=np.float64, buffer=shm.buf
+            )[:] = prices
+            settings = {
+                "latency": latency,
+                "sample_every": sample_every,
+            }
+            out = open(results_path, "a") if results_path else None
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=workers or os.cpu_count() or 1,
+                    mp_context=get_context("spawn"),
+                    initializer=_attach,
+                    initargs=(shm.name, prices.shape[1], settings),
+                ) as pool:
+                    futures = [
+                        pool.submit(evaluate_config, asdict(config))
+                        for config in pending
+                    ]
+                    for i, future in enumerate(
+                        as_completed(futures), 1
+                    ):
+                        result = future.result()
+                        done[
+                            json.dumps(
+                                result["config"], sort_keys=True
+                            )
+                        ] = result
+                        if out is not None:
+                            out.write(json.dumps(result) + "\n")
+                            out.flush()
+                        logger.info(
+                            f"Sweep progress: {i}/{len(pending)}"
+                        )
+            finally:
+                if out is not None:
+                    out.close()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    wanted = {config_key(c) for c in configs}
+    return rank_results(
+        [r for k, r in done.items() if k in wanted], rank_by
+    )
+
+
+def format_table(
+    results: List[Dict],
+    fields: Sequence[str] = (
+        "spread_percentage",
+        "order_size_percentage",
+        "max_inventory_exposure",
+    ),
+    top: Optional[int] = 20,
+) -> str:
+    """
+    Plain-text ranking table of sweep results.
+    """
+    header = ["rank", *fields, "pnl", "drawdown", "sharpe", "trades"]
+    rows = [
+        [
+            str(rank),
+            *(f"{r['config'][f]:.6g}" for f in fields),
+            f"{r['pnl']:.2f}",
+            f"{r['max_drawdown']:.2%}",
+            f"{r['sharpe']:.2f}",
+            str(r["total_trades"]),
+        ]
+        for rank, r in enumerate(results[:top], 1)
+    ]
+    widths = [
+        max(len(row[i]) for row in [header, *rows])
+        for i in range(len(header))
+    ]
+    return "\n".join(
+        "  ".join(cell.rjust(w) for cell, w in zip(row, widths))
+        for row in [header, *rows]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="MarketMakingConfig sweep"
+    )
+    parser.add_argument("history", help="Price history CSV or JSONL")
+    parser.add_argument("--results", default="sweep_results.jsonl")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--trading-pair", default="BTC/USDT")
+    parser.add_argument(
+        "--random", type=int, default=0, help="Random search size"
+    )
+    parser.add_argument(
+        "--rank-by", default="sharpe", choices=RANK_METRICS
+    )
+    args = parser.parse_args()
+
+    base = MarketMakingConfig(trading_pair=args.trading_pair)
+    if args.random:
+        configs = random_configs(
+            args.random,
+            base,
+            spread_percentage=(0.0002, 0.005),
+            order_size_percentage=(0.005, 0.05),
+            max_inventory_exposure=(0.05, 0.5),
+        )
+    else:
+        configs = grid_configs(
+            base,
+            spread_percentage=[0.0005, 0.001, 0.002, 0.004],
+            order_size_percentage=[0.005, 0.01, 0.02],
+            max_inventory_exposure=[0.1, 0.2, 0.4],
+        )
+    results = run_sweep(
+        args.history,
+        configs,
+        args.results,
+        workers=args.workers,
+        trading_pair=args.trading_pair,
+        rank_by=args.rank_by,
+    )
+    print(format_table(results))
+
+
+if __name__ == "__main__":
+    main()
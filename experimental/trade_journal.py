@@ -0,0 +1,336 @@
+"""
+Buffered trade journal for the market maker.
+
+`TradeJournal.record` only appends to an in-memory buffer. A background
+asyncio task hands full batches (by size or age) to a worker thread, so
+disk I/O never runs on the event loop. Supported formats:
+
+- ``csv``: the original human-readable log.
+- ``binary``: fixed-size little-endian records, readable with
+  `read_binary_journal` (numpy structured array).
+- ``parquet``: one row group per flush; requires ``pyarrow``.
+
+A batch that fails to write (full disk, transient I/O error) is rolled
+back off the file and kept for the next flush; `close` raises
+`JournalWriteError` if events are still unwritten.
+"""
+
+import asyncio
+import csv
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+JOURNAL_FIELDS = [
+    "timestamp",
+    "trading_pair",
+    "event_type",
+    "price",
+    "amount",
+    "base_inventory",
+    "quote_inventory",
+    "total_value",
+]
+
+EVENT_CODES = {"BUY": 1, "SELL": 2}
+EVENT_NAMES = {code: name for name, code in EVENT_CODES.items()}
+
+# timestamp, pair (16 bytes), event code, price, amount, base, quote, total
+_RECORD = struct.Struct("<d16sBddddd")
+BINARY_DTYPE = np.dtype([
+    ("timestamp", "<f8"),
+    ("trading_pair", "S16"),
+    ("event_type", "u1"),
+    ("price", "<f8"),
+    ("amount", "<f8"),
+    ("base_inventory", "<f8"),
+    ("quote_inventory", "<f8"),
+    ("total_value", "<f8"),
+])
+
+FSYNC_POLICIES = ("never", "batch", "periodic")
+
+
+class JournalWriteError(IOError):
+    """Buffered fill events could not be written to the journal."""
+
+
+def read_binary_journal(path: str) -> np.ndarray:
+    """Load a binary journal as a numpy structured array."""
+    return np.fromfile(path, dtype=BINARY_DTYPE)
+
+
+class TradeJournal:
+    """
+    Batched, off-loop writer for fill events.
+
+    Args:
+        path: Output file.
+        format: "csv", "binary" or "parquet".
+        flush_size: Flush as soon as this many events are buffered.
+        flush_interval: Flush buffered events at least this often (seconds).
+        fsync: "never" (leave it to the OS), "batch" (fsync every flush)
+            or "periodic" (fsync at most every `fsync_interval` seconds).
+            Parquet only supports "never": its footer is written on
+            close, so a partially written file is unreadable anyway.
+        max_buffer: Events kept for retry while writes fail; beyond
+            it the oldest are dropped and counted in `events_dropped`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format: str = "csv",
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+        fsync: str = "never",
+        fsync_interval: float = 5.0,
+        max_buffer: int = 100_000,
+    ):
+        if format not in ("csv", "binary", "parquet"):
+            raise ValueError(f"Unsupported journal format: {format}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        if format == "parquet" and fsync != "never":
+            raise ValueError(
+                "fsync is not supported for parquet journals; use "
+                "'binary' or 'csv' for durable writes"
+            )
+
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.format = format
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_buffer = max_buffer
+
+        self._buffer: List[Dict] = []
+        self._write_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._file = None
+        self._parquet_writer = None
+        self._last_fsync = time.monotonic()
+        self.events_written = 0
+        self.events_dropped = 0
+        self.last_error: Optional[Exception] = None
+
+    def record(self, event: Dict) -> None:
+        """
+        Buffer a fill event. Never blocks on I/O.
+        """
+        self._buffer.append(event)
+        if (
+            len(self._buffer) >= self.flush_size
+            and self._wakeup is not None
+        ):
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush_async()
+
+    def _take_batch(self) -> List[Dict]:
+        batch, self._buffer = self._buffer, []
+        return batch
+
+    async def flush_async(self) -> None:
+        batch = self._take_batch()
+        if batch:
+            await asyncio.to_thread(self._write_batch, batch)
+
+    def flush(self) -> None:
+        """
+        Synchronously write everything buffered (for non-async callers).
+        """
+        batch = self._take_batch()
+        if batch:
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[Dict]) -> None:
+        with self._write_lock:
+            start = None
+            try:
+                if self.format == "csv":
+                    start = self._open("a").tell()
+                    self._write_csv(batch)
+                elif self.format == "binary":
+                    start = self._open("ab").tell()
+                    self._write_binary(batch)
+                else:
+                    self._write_parquet(batch)
+            except Exception as e:
+                self._rollback(start)
+                self._retain(batch, e)
+                return
+            self.events_written += len(batch)
+            try:
+                self._maybe_fsync()
+            except OSError as e:
+                self.last_error = e
+                logger.error(f"Trade journal fsync failed: {e}")
+
+    def _rollback(self, start: Optional[int]) -> None:
+        """Cut a partly written batch off the file before its retry."""
+        if start is None or self._file is None:
+            return
+        f, self._file = self._file, None
+        try:
+            f.close()
+        except Exception:
+            pass
+        try:
+            os.truncate(self.path, start)
+        except OSError as e:
+            logger.error(f"Trade journal rollback failed: {e}")
+
+    def _retain(self, batch: List[Dict], error: Exception) -> None:
+        """Put a failed batch back in front of newer events."""
+        self.last_error = error
+        self._buffer[:0] = batch
+        excess = len(self._buffer) - self.max_buffer
+        if excess > 0:
+            del self._buffer[:excess]
+            self.events_dropped += excess
+        logger.error(
+            f"Trade journal write failed, {len(batch)} events kept"
+            f" for retry: {error}"
+            + (f" ({excess} oldest dropped)" if excess > 0 else "")
+        )
+
+    def _open(self, mode: str):
+        if self._file is None:
+            new_file = (
+                not self.path.exists()
+                or self.path.stat().st_size == 0
+            )
+            newline = "" if "b" not in mode else None
+            self._file = open(self.path, mode, newline=newline)
+            if new_file and self.format == "csv":
+                csv.writer(self._file).writerow(JOURNAL_FIELDS)
+        return self._file
+
+    def _write_csv(self, batch: List[Dict]) -> None:
+        f = self._open("a")
+        csv.DictWriter(f, fieldnames=JOURNAL_FIELDS).writerows(batch)
+        f.flush()
+
+    def _write_binary(self, batch: List[Dict]) -> None:
+        f = self._open("ab")
+        pack = _RECORD.pack
+        f.write(
+            b"".join(
+                pack(
+                    e["timestamp"],
+                    e["trading_pair"].encode("ascii")[:16],
+                    EVENT_CODES[e["event_type"]],
+                    e["price"],
+                    e["amount"],
+                    e["base_inventory"],
+                    e["quote_inventory"],
+                    e["total_value"],
+                )
+                for e in batch
+            )
+        )
+        f.flush()
+
+    def _write_parquet(self, batch: List[Dict]) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "The parquet journal format requires pyarrow"
+            ) from e
+
+        table = pa.Table.from_pylist(batch)
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(
+                str(self.path), table.schema
+            )
+        self._parquet_writer.write_table(table)
+
+    def _maybe_fsync(self) -> None:
+        if self.fsync == "never" or self._file is None:
+            return
+        now = time.monotonic()
+        if (
+            self.fsync == "periodic"
+            and now - self._last_fsync < self.fsync_interval
+        ):
+            return
+        os.fsync(self._file.fileno())
+        self._last_fsync = now
+
+    async def close(self) -> None:
+        """
+        Stop the flusher, write whatever is buffered and close the file.
+        Raises JournalWriteError if events could not be written (or were
+        dropped while writes kept failing).
+        """
+        if self._task is not None:
+            # Let an in-flight batch finish rather than cancelling it
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush_async()
+        with self._write_lock:
+            if self._file is not None:
+                if self.fsync != "never":
+                    os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+                self._parquet_writer = None
+        if self._buffer or self.events_dropped:
+            raise JournalWriteError(
+                f"{len(self._buffer)} events unwritten and"
+                f" {self.events_dropped} dropped: {self.last_error}"
+            )
+
+
+class MemoryJournal:
+    """
+    In-memory journal with the `TradeJournal` interface, for replays and
+    tests that only need the fill sequence.
+    """
+
+    def __init__(self):
+        self.events: List[Dict] = []
+
+    def record(self, event: Dict) -> None:
+        self.events.append(event)
+
+    async def start(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
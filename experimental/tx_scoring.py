@@ -0,0 +1,198 @@
+"""
+Local significance scoring for BTC transactions.
+
+`TransactionScorer` rates a transaction between 0 and 1 from `tx_data`
+alone plus a rolling per-address history, so only significant activity
+is sent to the LLM agent:
+
+- value: total output value, log-scaled against ``whale_btc``
+- fan: inputs + outputs (consolidations, batch payouts, mixers)
+- round: round-number outputs, typical of deliberate payments
+- deviation: the watched address's net flow against its rolling history
+- reuse: an address paying change back to itself (routine), which
+  lowers the score
+
+Dust below ``dust_btc`` always scores 0.
+"""
+
+import math
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+SATOSHIS_PER_BTC = 100_000_000
+
+DEFAULT_WEIGHTS = {
+    "value": 0.35,
+    "fan": 0.15,
+    "round": 0.1,
+    "deviation": 0.4,
+    "reuse": -0.15,
+}
+
+
+@dataclass
+class TxScore:
+    score: float
+    value_btc: float
+    flow_btc: float
+    features: Dict[str, float] = field(default_factory=dict)
+    reasons: List[str] = field(default_factory=list)
+    escalate: bool = False
+
+
+class TransactionScorer:
+    """
+    Args:
+        threshold: Scores at or above this are escalated to the LLM.
+        whale_btc: Value that maxes out the value feature.
+        dust_btc: Transactions below this are never escalated.
+        fan_cap: Inputs + outputs that max out the fan feature.
+        round_unit_btc: Outputs that are a multiple of this are "round".
+        history: Flows remembered per address for the deviation feature.
+        max_addresses: Addresses with history kept (least recent evicted).
+        weights: Feature weights; see DEFAULT_WEIGHTS.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.5,
+        whale_btc: float = 100.0,
+        dust_btc: float = 0.001,
+        fan_cap: int = 50,
+        round_unit_btc: float = 0.1,
+        history: int = 50,
+        max_addresses: int = 100_000,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.threshold = threshold
+        self.whale_btc = whale_btc
+        self.dust_btc = dust_btc
+        self.fan_cap = fan_cap
+        self.round_unit = int(round_unit_btc * SATOSHIS_PER_BTC)
+        self.history = history
+        self.max_addresses = max_addresses
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self._flows: "OrderedDict[str, Deque[float]]" = OrderedDict()
+
+    def _deviation(self, address: str, flow: float) -> float:
+        past = self._flows.get(address)
+        if past is None or len(past) < 5:
+            return 0.5  # no baseline yet: neither routine nor unusual
+        mean = sum(past) / len(past)
+        std = math.sqrt(
+            sum((x - mean) ** 2 for x in past) / len(past)
+        )
+        if std == 0:
+            return 0.0 if flow == mean else 1.0
+        return min(1.0, abs(flow - mean) / std / 4)
+
+    def _remember(self, address: str, flow: float) -> None:
+        past = self._flows.get(address)
+        if past is None:
+            past = self._flows[address] = deque(maxlen=self.history)
+            if len(self._flows) > self.max_addresses:
+                self._flows.popitem(last=False)
+        else:
+            self._flows.move_to_end(address)
+        past.append(flow)
+
+    def score(
+        self, tx_data: Dict[str, Any], address: Optional[str] = None
+    ) -> TxScore:
+        """
+        Score a transaction, optionally relative to a watched address, and
+        add its flow to that address's history.
+        """
+        outputs = tx_data.get("out", [])
+        inputs = tx_data.get("inputs", [])
+        out_addrs = {o.get("addr") for o in outputs if o.get("addr")}
+        in_addrs = {
+            i.get("prev_out", {}).get("addr")
+            for i in inputs
+            if i.get("prev_out", {}).get("addr")
+        }
+        total = sum(o.get("value", 0) for o in outputs)
+        value_btc = total / SATOSHIS_PER_BTC
+
+        flow_btc = 0.0
+        if address:
+            received = sum(
+                o.get("value", 0)
+                for o in outputs
+                if o.get("addr") == address
+            )
+            sent = sum(
+                i.get("prev_out", {}).get("value", 0)
+                for i in inputs
+                if i.get("prev_out", {}).get("addr") == address
+            )
+            flow_btc = (received - sent) / SATOSHIS_PER_BTC
+
+        if value_btc < self.dust_btc:
+            if address:
+                self._remember(address, flow_btc)
+            return TxScore(0.0, value_btc, flow_btc, reasons=["dust"])
+
+        features = {
+            "value": min(
+                1.0,
+                math.log10(1 + value_btc)
+                / math.log10(1 + self.whale_btc),
+            ),
+            "fan": min(
+                1.0,
+                max(0, len(inputs) + len(outputs) - 2) / self.fan_cap,
+            ),
+            "round": float(
+                any(
+                    o.get("value", 0) >= self.round_unit
+                    and o.get("value", 0) % self.round_unit == 0
+                    for o in outputs
+                )
+            ),
+            "deviation": (
+                self._deviation(address, abs(flow_btc))
+                if address
+                else 0.5
+            ),
+            "reuse": float(bool(out_addrs & in_addrs)),
+        }
+        if address:
+            self._remember(address, abs(flow_btc))
+
+        score = sum(
+            self.weights.get(k, 0.0) * v for k, v in features.items()
+        )
+        score = min(1.0, max(0.0, score))
+        reasons = [
+            k
+            for k, v in features.items()
+            if self.weights.get(k, 0.0) > 0 and v >= 0.75
+        ]
+        return TxScore(
+            score=round(score, 4),
+            value_btc=value_btc,
+            flow_btc=flow_btc,
+            features=features,
+            reasons=reasons,
+            escalate=score >= self.threshold,
+        )
+
+
+def local_summary(tx_data: Dict[str, Any], result: TxScore) -> str:
+    """
+    Cheap stand-in for the LLM analysis of a routine transaction.
+    """
+    features = ", ".join(
+        f"{k}={v:.2f}" for k, v in result.features.items()
+    )
+    return (
+        f"Routine transaction {tx_data.get('hash', 'unknown')}:"
+        f" {result.value_btc:.8f} BTC total, net flow"
+        f" {result.flow_btc:+.8f} BTC for the watched address,"
+        f" {len(tx_data.get('inputs', []))} inputs,"
+        f" {len(tx_data.get('out', []))} outputs. Local significance"
+        f" {result.score:.2f} ({', '.join(result.reasons) or features or 'dust'});"
+        " not escalated for LLM analysis."
+    )
@@ -0,0 +1,132 @@
+"""
+Address watchlist for the BTC transaction monitor.
+
+`AddressWatchlist` holds watched addresses in a hash set, so matching a
+transaction costs one O(1) lookup per input/output however many
+addresses are watched. It also builds the websocket subscription
+messages in batches: per-address ``addr_sub`` for small lists and the
+unconfirmed-transaction stream (filtered locally) once the list is too
+large to subscribe address by address.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Set
+
+from loguru import logger
+
+
+def transaction_addresses(tx_data: Dict[str, Any]) -> Iterator[str]:
+    """Output and input (previous output) addresses of a transaction."""
+    for out in tx_data.get("out", []):
+        addr = out.get("addr")
+        if addr:
+            yield addr
+    for inp in tx_data.get("inputs", []):
+        addr = inp.get("prev_out", {}).get("addr")
+        if addr:
+            yield addr
+
+
+class AddressWatchlist:
+    """
+    Thread-safe set of watched addresses.
+
+    Args:
+        addresses: Initial addresses.
+        firehose_threshold: Above this many addresses, subscribe to all
+            unconfirmed transactions and match locally instead of sending
+            one subscription per address.
+        batch_size: Subscription messages per batch.
+    """
+
+    def __init__(
+        self,
+        addresses: Iterable[str] = (),
+        firehose_threshold: int = 1000,
+        batch_size: int = 100,
+    ):
+        self._addresses: Set[str] = set()
+        self._lock = threading.Lock()
+        self.firehose_threshold = firehose_threshold
+        self.batch_size = batch_size
+        self.add_many(addresses)
+
+    def add(self, address: str) -> bool:
+        """Watch an address; False if it was already watched."""
+        address = address.strip()
+        with self._lock:
+            if not address or address in self._addresses:
+                return False
+            self._addresses.add(address)
+            return True
+
+    def add_many(self, addresses: Iterable[str]) -> int:
+        return sum(self.add(address) for address in addresses)
+
+    def remove(self, address: str) -> bool:
+        """Stop watching an address; False if it was not watched."""
+        with self._lock:
+            if address not in self._addresses:
+                return False
+            self._addresses.discard(address)
+            return True
+
+    def load(self, path: str) -> int:
+        """
+        Add addresses from a file: a JSON list, or one address per line
+        (``#`` starts a comment). Returns the number of new addresses.
+        """
+        text = Path(path).read_text()
+        if text.lstrip().startswith("["):
+            addresses = json.loads(text)
+        else:
+            addresses = (
+                line.split("#", 1)[0] for line in text.splitlines()
+            )
+        added = self.add_many(addresses)
+        logger.info(
+            f"Loaded {added} addresses from"
+            f" {path} ({len(self)} watched)"
+        )
+        return added
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._addresses
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._addresses))
+
+    def match(self, tx_data: Dict[str, Any]) -> List[str]:
+        """
+        Watched addresses a transaction touches, in order of appearance.
+        """
+        watched = self._addresses
+        matched = []
+        for address in transaction_addresses(tx_data):
+            if address in watched and address not in matched:
+                matched.append(address)
+        return matched
+
+    @property
+    def firehose(self) -> bool:
+        return len(self) > self.firehose_threshold
+
+    def subscription_batches(self) -> List[List[Dict[str, str]]]:
+        """
+        Messages that (re)establish the subscriptions, in batches.
+        """
+        if self.firehose:
+            return [[{"op": "unconfirmed_sub"}]]
+        messages = [
+            {"op": "addr_sub", "addr": address} for address in self
+        ]
+        return [
+            messages[i : i + self.batch_size]
+            for i in range(0, len(messages), self.batch_size)
+        ]
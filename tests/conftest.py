@@ -0,0 +1,23 @@
+import sys
+import os
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ.setdefault("OPENAI_API_KEY", "dummy_key")
+
+from autohedge.config import settings
+
+
+@pytest.fixture(autouse=True, scope="session")
+def log_file(tmp_path_factory):
+    """Keep the JSON log pipeline out of the working tree."""
+    settings.LOG_FILE = str(
+        tmp_path_factory.mktemp("logs") / "autohedge.jsonl"
+    )
+    return settings.LOG_FILE
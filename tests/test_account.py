@@ -0,0 +1,92 @@
+import sys
+import os
+import asyncio
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from autohedge.account import AccountCache
+from autohedge.tools.broker import Balances, BrokerAdapter, Position
+
+
+class CountingBroker(BrokerAdapter):
+    name = "counting"
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def get_balances(self):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return Balances(cash=1000, buying_power=1000, equity=2000)
+
+    async def get_positions(self):
+        await asyncio.sleep(0.02)
+        return [
+            Position(
+                symbol="AAPL",
+                quantity=10,
+                average_price=100,
+                market_value=1000,
+            )
+        ]
+
+
+def test_single_flight_ttl_and_fill_patches():
+    async def run():
+        broker = CountingBroker()
+        cache = AccountCache(broker, ttl=60)
+
+        # Concurrent readers share one refresh, later readers hit the cache
+        snapshots = await asyncio.gather(
+            *(cache.snapshot() for _ in range(20))
+        )
+        assert broker.calls == 1
+        assert all(s is snapshots[0] for s in snapshots)
+        assert (await cache.snapshot()) is snapshots[0]
+
+        before = snapshots[0]
+        after = cache.apply_fill("AAPL", "BUY", 10, 110)
+        assert broker.calls == 1
+        assert after.quantity("AAPL") == 20
+        assert after.positions["AAPL"].average_price == 105
+        assert after.balances.cash == -100
+        assert after.version == before.version + 1
+        # Snapshots already handed out do not change
+        assert before.quantity("AAPL") == 10
+
+        cache.apply_fill("AAPL", "SELL", 20, 120)
+        assert "AAPL" not in cache.current.positions
+
+        cache.invalidate()
+        refreshed = await cache.snapshot()
+        assert broker.calls == 2 and refreshed.quantity("AAPL") == 10
+
+    asyncio.run(run())
+
+
+def test_fills_during_a_refresh_are_not_overwritten():
+    async def run():
+        broker = CountingBroker()
+        cache = AccountCache(broker, ttl=60)
+        await cache.snapshot()
+        cache.invalidate()
+
+        refresh = asyncio.ensure_future(cache.snapshot())
+        await asyncio.sleep(0.01)  # the broker call is in flight
+        cache.apply_fill("AAPL", "BUY", 5, 100)
+        assert (await refresh).quantity("AAPL") == 15
+        assert cache.current.quantity("AAPL") == 15
+        assert cache.stats["stale_refreshes"] == 1
+
+        # The next read refreshes again instead of trusting the TTL
+        assert (await cache.snapshot()).quantity("AAPL") == 10
+        assert broker.calls == 3
+
+    asyncio.run(run())
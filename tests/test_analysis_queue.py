@@ -0,0 +1,80 @@
+import sys
+import os
+import threading
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+from experimental.analysis_queue import (
+    AnalysisQueue,
+    AnalysisWorkerPool,
+)
+
+
+def test_coalesce_merges_per_key_and_evicts_oldest():
+    queue = AnalysisQueue(
+        maxsize=2, overflow="coalesce", max_coalesced=3
+    )
+    for i in range(5):
+        assert queue.put("addr-a", {"hash": f"a{i}"})
+    assert queue.put("addr-b", {"hash": "b0"})
+    assert len(queue) == 2
+    # A third key evicts the oldest entry with everything merged into it
+    assert queue.put("addr-c", {"hash": "c0"})
+
+    entry = queue.get(timeout=0)
+    assert (entry.key, [tx["hash"] for tx in entry.items]) == (
+        "addr-b",
+        ["b0"],
+    )
+    assert queue.get(timeout=0).latest == {"hash": "c0"}
+    assert queue.get(timeout=0) is None
+    stats = queue.metrics()
+    assert (
+        stats["coalesced"],
+        stats["dropped"],
+        stats["max_depth"],
+    ) == (4, 3, 2)
+
+
+def test_drop_policies():
+    newest = AnalysisQueue(maxsize=1, overflow="drop_newest")
+    assert newest.put("a", 1)
+    assert not newest.put("a", 2)
+    assert newest.get(timeout=0).items == [1]
+
+    oldest = AnalysisQueue(maxsize=1, overflow="drop_oldest")
+    assert oldest.put("a", 1)
+    assert oldest.put("a", 2)
+    assert oldest.get(timeout=0).items == [2]
+    assert oldest.stats["dropped"] == 1
+
+
+def test_worker_pool_drains_the_queue():
+    queue = AnalysisQueue(maxsize=100, overflow="drop_oldest")
+    seen, done = [], threading.Event()
+
+    def handler(entry):
+        if entry.latest == "boom":
+            raise RuntimeError("analysis failed")
+        seen.append(entry.latest)
+        if len(seen) == 10:
+            done.set()
+
+    pool = AnalysisWorkerPool(
+        queue, handler, workers=3, metrics_interval=0
+    )
+    pool.start()
+    try:
+        queue.put("x", "boom")
+        for i in range(10):
+            queue.put("x", i)
+        assert done.wait(5)
+    finally:
+        pool.stop()
+    assert sorted(seen) == list(range(10))
+    # Failures are still marked done
+    assert queue.metrics()["processed"] == 11
+    assert not queue.put("x", "late")
@@ -0,0 +1,78 @@
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+from experimental.analysis_store import AnalysisStore
+
+
+def record(i, address="addr-a"):
+    return {
+        "tx_hash": f"tx{i}",
+        "timestamp": 1000.0 + i,
+        "addresses": [address],
+        "analysis": f"analysis {i}",
+    }
+
+
+def test_lookups_across_segments(tmp_path):
+    store = AnalysisStore(
+        str(tmp_path), segment_bytes=300, flush_interval=60
+    )
+    try:
+        for i in range(10):
+            store.append(record(i, "addr-a" if i % 2 else "addr-b"))
+        # Unflushed records are already visible by hash
+        assert store.get("tx3")["analysis"] == "analysis 3"
+        store.flush()
+        assert len(list(tmp_path.glob("segment_*.jsonl"))) > 1
+
+        assert len(store) == 10
+        assert store.get("tx7")["timestamp"] == 1007.0
+        assert store.get("missing") is None
+        newest = store.by_address("addr-a", limit=2)
+        assert [r["tx_hash"] for r in newest] == ["tx9", "tx7"]
+        ranged = store.by_address("addr-b", start=1002.0, end=1006.0)
+        assert [r["tx_hash"] for r in ranged] == ["tx6", "tx4", "tx2"]
+        assert [
+            r["tx_hash"] for r in store.time_range(1003.0, 1005.0)
+        ] == ["tx3", "tx4", "tx5"]
+
+        # Re-storing a hash replaces what get returns
+        store.append({**record(3), "analysis": "revised"})
+        store.flush()
+        assert store.get("tx3")["analysis"] == "revised"
+        assert len(store) == 10
+    finally:
+        store.close()
+
+
+def test_unindexed_tail_is_recovered(tmp_path):
+    store = AnalysisStore(str(tmp_path), flush_interval=60)
+    store.append(record(0))
+    store.close()
+
+    # A crash after the segment write but before indexing, plus a torn line
+    segment = sorted(tmp_path.glob("segment_*.jsonl"))[-1]
+    with open(segment, "a") as f:
+        f.write(
+            '{"tx_hash":"tx1","timestamp":1001.0,"addresses":["addr-a"]}\n'
+        )
+        f.write('{"tx_hash":"tx2","tim')
+
+    store = AnalysisStore(str(tmp_path), flush_interval=60)
+    try:
+        assert len(store) == 2
+        assert store.get("tx1")["timestamp"] == 1001.0
+        store.append(record(2))
+        store.flush()
+        assert [r["tx_hash"] for r in store.by_address("addr-a")] == [
+            "tx2",
+            "tx1",
+            "tx0",
+        ]
+    finally:
+        store.close()
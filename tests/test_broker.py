@@ -0,0 +1,97 @@
+import sys
+import os
+import asyncio
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from aiohttp import web
+
+from autohedge.tools.broker import (
+    BrokerError,
+    BrokerOrder,
+    TradeStationAdapter,
+    create_session,
+)
+
+
+async def start_server(calls):
+    async def balances(request):
+        calls.append("balances")
+        if calls.count("balances") == 1:
+            return web.Response(status=503)
+        return web.json_response({
+            "Balances": [{
+                "CashBalance": "1000",
+                "BuyingPower": "2000",
+                "Equity": "1500",
+            }]
+        })
+
+    async def orders(request):
+        payload = await request.json()
+        calls.append(payload["Symbol"])
+        if payload["Symbol"] == "FAIL":
+            return web.Response(status=500)
+        return web.json_response(
+            {"Orders": [{"OrderID": f"id-{payload['Symbol']}"}]}
+        )
+
+    app = web.Application()
+    app.router.add_get(
+        "/v3/brokerage/accounts/{account}/balances", balances
+    )
+    app.router.add_post("/v3/orderexecution/orders", orders)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v3"
+
+
+def test_retries_only_idempotent_calls():
+    async def run():
+        calls = []
+        runner, url = await start_server(calls)
+        session = create_session()
+        broker = TradeStationAdapter(
+            account_id="123",
+            token="t",
+            session=session,
+            base_url=url,
+            backoff=0.01,
+        )
+        try:
+            # A 503 on a read is retried transparently
+            balances = await broker.get_balances()
+            assert balances.buying_power == 2000
+            assert calls.count("balances") == 2
+
+            orders = [
+                BrokerOrder(symbol=s, side="BUY", quantity=1)
+                for s in ["AAPL", "FAIL", "MSFT"]
+            ]
+            results = await broker.submit_many(orders, concurrency=2)
+            assert [
+                r.order_id
+                for r in results
+                if not isinstance(r, BrokerError)
+            ] == ["id-AAPL", "id-MSFT"]
+            assert (
+                isinstance(results[1], BrokerError)
+                and results[1].status == 500
+            )
+            # A failed placement is never resubmitted
+            assert calls.count("FAIL") == 1
+            assert broker.stats["retries"] == 1
+        finally:
+            await session.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
@@ -0,0 +1,118 @@
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from fastapi.testclient import TestClient
+
+from autohedge.tools.broker_simulator import (
+    BrokerSimulator,
+    SimulatorConfig,
+    create_app,
+)
+
+
+def td_order(symbol, instruction, quantity, price=None):
+    order = {
+        "orderType": "LIMIT" if price else "MARKET",
+        "orderLegCollection": [{
+            "instruction": instruction,
+            "quantity": quantity,
+            "instrument": {"symbol": symbol},
+        }],
+    }
+    if price:
+        order["price"] = price
+    return order
+
+
+def test_orders_match_against_shared_account_state():
+    sim = BrokerSimulator(SimulatorConfig(initial_cash=10_000))
+    client = TestClient(create_app(sim))
+    sim.set_price("AAPL", 50.0)
+
+    response = client.post(
+        "/td/v1/accounts/A1/orders", json=td_order("AAPL", "BUY", 10)
+    )
+    assert response.status_code == 201
+    assert response.headers["Location"].endswith("/orders/1")
+
+    # A limit sell above the mark rests until the price gets there
+    resting = client.post(
+        "/tradestation/v3/orderexecution/orders",
+        json={
+            "AccountID": "A1",
+            "Symbol": "AAPL",
+            "Quantity": "4",
+            "OrderType": "Limit",
+            "TradeAction": "SELL",
+            "LimitPrice": "60",
+        },
+    ).json()["Orders"][0]["OrderID"]
+    assert sim.orders[resting].status == "OPEN"
+    assert client.post("/sim/prices", json={"AAPL": 61}).json() == {
+        "filled": [resting]
+    }
+
+    account = client.get("/td/v1/accounts/A1").json()[
+        "securitiesAccount"
+    ]
+    assert account["positions"][0]["longQuantity"] == 6
+    assert (
+        account["currentBalances"]["cashBalance"]
+        == 10_000 - 500 + 4 * 61
+    )
+    balances = client.get(
+        "/tradestation/v3/brokerage/accounts/A1/balances"
+    ).json()
+    assert (
+        float(balances["Balances"][0]["Equity"])
+        == 10_000 - 500 + 4 * 61 + 6 * 61
+    )
+
+    # Orders beyond buying power are rejected and cancels of filled orders fail
+    assert (
+        client.post(
+            "/td/v1/accounts/A1/orders",
+            json=td_order("AAPL", "BUY", 1000),
+        ).status_code
+        == 400
+    )
+    assert (
+        client.delete(
+            f"/td/v1/accounts/A1/orders/{resting}"
+        ).status_code
+        == 400
+    )
+
+
+def test_fault_injection():
+    sim = BrokerSimulator(SimulatorConfig(rate_limit=2))
+    client = TestClient(create_app(sim))
+    sim.fail_next("etrade", count=1, status=503)
+
+    assert (
+        client.get("/etrade/v1/accounts/A1/balance").status_code
+        == 503
+    )
+    assert (
+        client.get("/etrade/v1/accounts/A1/balance").status_code
+        == 200
+    )
+    assert (
+        client.get("/etrade/v1/accounts/A1/balance").status_code
+        == 200
+    )
+    limited = client.get("/etrade/v1/accounts/A1/balance")
+    assert (
+        limited.status_code == 429
+        and "Retry-After" in limited.headers
+    )
+    # Rate limits are per broker
+    assert client.get("/td/v1/accounts/A1").status_code == 200
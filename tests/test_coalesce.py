@@ -0,0 +1,141 @@
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from autohedge.coalesce import AnalysisCancelled, AnalysisCoalescer
+
+STAGES = [
+    "thesis",
+    "sentiment",
+    "quant",
+    "risk",
+    "execution",
+    "decision",
+]
+
+
+def make_compute(gate, calls, ticker="AAPL"):
+    def compute(on_stage):
+        calls.append(ticker)
+        on_stage("thesis", ticker, "thesis")
+        gate.wait(5)
+        for stage in STAGES[1:]:
+            on_stage(stage, ticker, stage)
+        return f"decision for {ticker}"
+
+    return compute
+
+
+def test_identical_requests_share_one_analysis():
+    coalescer = AnalysisCoalescer(ttl=60, workers=2)
+    key = coalescer.key(
+        "aapl", "Analyze  the market.", "momentum", version=3
+    )
+    assert key == coalescer.key(
+        "AAPL", "analyze the market", "momentum", version=3
+    )
+    assert key != coalescer.key(
+        "AAPL", "analyze the market", "momentum", version=4
+    )
+
+    gate, calls = threading.Event(), []
+    first_stages, second_stages = [], []
+    first = coalescer.submit(
+        key,
+        make_compute(gate, calls),
+        lambda *s: first_stages.append(s[0]),
+    )
+    while not first_stages:
+        time.sleep(0.01)
+    # A late joiner gets the stages already emitted, then live ones
+    second = coalescer.submit(
+        key,
+        make_compute(gate, calls),
+        lambda *s: second_stages.append(s[0]),
+    )
+    gate.set()
+
+    assert first.result(5) == second.result(5) == "decision for AAPL"
+    assert calls == ["AAPL"]
+    assert first_stages == second_stages == STAGES
+
+    cached = coalescer.submit(key, make_compute(gate, calls))
+    assert cached.cached and cached.result() == "decision for AAPL"
+    assert coalescer.stats["computed"] == 1
+    assert (
+        coalescer.stats["joined"]
+        == coalescer.stats["cache_hits"]
+        == 1
+    )
+    coalescer.invalidate("aapl")
+    assert not coalescer.submit(key, make_compute(gate, calls)).cached
+    coalescer.shutdown()
+
+
+def test_cancel_stops_only_when_every_waiter_left():
+    coalescer = AnalysisCoalescer(ttl=0, workers=2)
+    gate, calls = threading.Event(), []
+    key = coalescer.key("MSFT", "t")
+    first = coalescer.submit(key, make_compute(gate, calls, "MSFT"))
+    second = coalescer.submit(key, make_compute(gate, calls, "MSFT"))
+
+    first.cancel()
+    gate.set()
+    assert second.result(5) == "decision for MSFT"
+
+    gate.clear()
+    only = coalescer.submit(key, make_compute(gate, calls, "MSFT"))
+    only.cancel()
+    gate.set()
+    with pytest.raises(AnalysisCancelled):
+        only.result(5)
+    assert coalescer.stats["cancelled"] == 1
+    coalescer.shutdown()
+
+
+def test_cancelled_flight_does_not_drop_its_replacement():
+    coalescer = AnalysisCoalescer(ttl=0, workers=2)
+    old_gate, new_gate, calls = (
+        threading.Event(),
+        threading.Event(),
+        [],
+    )
+    key = coalescer.key("TSLA", "t")
+    stale = coalescer.submit(
+        key, make_compute(old_gate, calls, "TSLA")
+    )
+    while not calls:
+        time.sleep(0.01)
+    stale.cancel()
+    replacement = coalescer.submit(
+        key, make_compute(new_gate, calls, "TSLA")
+    )
+
+    # The cancelled run unwinds while the replacement is still in flight
+    old_gate.set()
+    with pytest.raises(AnalysisCancelled):
+        stale.result(5)
+    joined = coalescer.submit(
+        key, make_compute(new_gate, calls, "TSLA")
+    )
+    new_gate.set()
+    assert (
+        replacement.result(5)
+        == joined.result(5)
+        == "decision for TSLA"
+    )
+    assert (
+        calls == ["TSLA", "TSLA"] and coalescer.stats["joined"] == 1
+    )
+    coalescer.shutdown()
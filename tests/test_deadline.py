@@ -0,0 +1,195 @@
+import sys
+import os
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from autohedge.deadline import Deadline, StageBudgets, StageClock
+from autohedge.main import AutoHedge
+from autohedge.orders import OrderRouter
+
+
+class SlowAgents:
+    """Stand-ins for every agent; `delays` maps a stage to seconds."""
+
+    def __init__(self, delays, verdict="APPROVE"):
+        self.delays = delays
+        self.verdict = verdict
+
+    def _stage(self, stage, result):
+        time.sleep(self.delays.get(stage, 0))
+        return result
+
+    def generate_thesis(self, task, stock):
+        return self._stage(
+            "thesis", (f"thesis {stock}", " market data")
+        )
+
+    def analyze(self, *args):
+        stage = "sentiment" if len(args) == 1 else "quant"
+        return self._stage(stage, stage)
+
+    def assess_risk(self, *args):
+        return self._stage("risk", "risk")
+
+    def generate_order(self, *args):
+        return self._stage(
+            "execution",
+            '{"side": "BUY", "quantity": 10, "order_type": "MARKET"}',
+        )
+
+    def make_decision(self, task, thesis):
+        return self._stage(
+            "decision",
+            f"decided with {task}\nDecision: {self.verdict}",
+        )
+
+
+@patch("autohedge.agents.director.TickrAgent", MagicMock())
+@patch("autohedge.agents.sentiment.Agent", MagicMock())
+@patch("autohedge.agents.execution.Agent", MagicMock())
+@patch("autohedge.agents.risk.Agent", MagicMock())
+@patch("autohedge.agents.quant.Agent", MagicMock())
+@patch("autohedge.agents.director.Agent", MagicMock())
+def make_hedge(
+    delays, stocks=("AAPL",), verdict="APPROVE", router=None
+):
+    hedge = AutoHedge(
+        stocks=list(stocks),
+        output_dir="tests/outputs",
+        stage_budgets=StageBudgets(skippable=["sentiment", "quant"]),
+        router=router,
+    )
+    agents = SlowAgents(delays, verdict)
+    hedge.director = hedge.quant = hedge.risk = hedge.execution = (
+        agents
+    )
+    hedge.sentiment = MagicMock(
+        analyze=lambda news, fast_path=True: agents._stage(
+            "sentiment", "sentiment"
+        )
+    )
+    return hedge
+
+
+def test_stage_budgets_roll_unused_time_forward():
+    clock = [0.0]
+    stages = StageClock(Deadline(10, clock=lambda: clock[0]))
+    assert stages.budget("thesis") == 3.0
+    clock[0] = 1.0  # thesis finished early
+    assert abs(stages.budget("quant") - 9 * 0.2 / 0.7) < 1e-9
+    assert StageClock().budget("quant") is None
+
+
+def test_overrunning_stages_degrade_or_time_out():
+    hedge = make_hedge({"sentiment": 0.5})
+    output = hedge.process_stock(
+        "AAPL", "task", deadline=Deadline(0.3)
+    )
+    assert (
+        output.skipped_stages == ["sentiment"]
+        and not output.timed_out
+    )
+    assert (
+        output.decision
+        and output.trade_order is not None
+        and output.approved
+    )
+
+    hedge = make_hedge({"risk": 0.5})
+    output = hedge.process_stock(
+        "AAPL", "task", deadline=Deadline(0.3)
+    )
+    assert output.timed_out and output.trade_order is None
+    assert output.skipped_stages == ["risk", "execution", "decision"]
+    assert output.analysis == "quant" and output.decision is None
+
+
+def test_run_finishes_inside_the_deadline():
+    hedge = make_hedge(
+        {"thesis": 0.3}, stocks=["AAPL", "MSFT", "TSLA"]
+    )
+    started = time.monotonic()
+    hedge.run("task", deadline=0.5)
+    assert time.monotonic() - started < 0.75
+    assert all(o.timed_out for o in hedge.logs.logs)
+    assert [o.current_stock for o in hedge.logs.logs] == [
+        "AAPL",
+        "MSFT",
+        "TSLA",
+    ]
+
+
+def test_abandoned_stage_calls_are_bounded():
+    hedge = make_hedge({"sentiment": 0.5})
+    with patch("autohedge.main.settings.MAX_ABANDONED_STAGES", 1):
+        output = hedge.process_stock(
+            "AAPL", "task", deadline=Deadline(0.2)
+        )
+        assert output.skipped_stages == ["sentiment"]
+        assert hedge.abandoned_stages == 1
+
+        # With the limit reached, stages are refused instead of queued
+        started = time.monotonic()
+        output = hedge.process_stock(
+            "AAPL", "task", deadline=Deadline(2)
+        )
+        assert time.monotonic() - started < 0.1
+        assert output.timed_out and output.thesis is None
+
+        deadline = time.monotonic() + 2
+        while hedge.abandoned_stages and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert hedge.abandoned_stages == 0
+        hedge.director.delays = {}
+        output = hedge.process_stock(
+            "AAPL", "task", deadline=Deadline(2)
+        )
+        assert not output.timed_out and not output.skipped_stages
+    hedge.close()
+
+
+def test_only_approved_orders_are_routed():
+    broker = MagicMock(
+        submit_many=AsyncMock(return_value=[]), close=AsyncMock()
+    )
+    hedge = make_hedge(
+        {}, verdict="REJECT", router=OrderRouter(broker)
+    )
+    hedge.run("task")
+    (output,) = hedge.logs.logs
+    assert output.trade_order is not None and not output.approved
+    assert broker.submit_many.call_count == 0
+
+    hedge = make_hedge(
+        {}, verdict="APPROVE", router=OrderRouter(broker)
+    )
+    hedge.run("task")
+    (orders,), _ = broker.submit_many.call_args
+    assert [o.symbol for o in orders] == ["AAPL"]
+
+
+def test_shared_analyses_are_routed_once():
+    from autohedge.coalesce import AnalysisCoalescer
+
+    coalescer = AnalysisCoalescer(ttl=60)
+    broker = MagicMock(
+        submit_many=AsyncMock(return_value=[]), close=AsyncMock()
+    )
+    hedges = [
+        make_hedge({}, router=OrderRouter(broker)) for _ in range(2)
+    ]
+    for hedge in hedges:
+        hedge.coalescer = coalescer
+        hedge.run("task")
+    # The second hedge got the cached output, whose order was already sent
+    assert hedges[0].logs.logs[0] is hedges[1].logs.logs[0]
+    assert broker.submit_many.call_count == 1
+    coalescer.shutdown()
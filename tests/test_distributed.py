@@ -0,0 +1,122 @@
+import sys
+import os
+import time
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from autohedge.distributed import WorkQueue
+from autohedge.utils import AutoHedgeOutput
+
+
+def test_claim_complete_and_results(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    assert queue.enqueue("c1", ["AAPL", "TSLA"], "task") == 2
+    assert queue.enqueue("c1", ["AAPL"], "task") == 0
+
+    first = queue.claim("w1")
+    second = queue.claim("w2")
+    assert {first.ticker, second.ticker} == {"AAPL", "TSLA"}
+    assert queue.claim("w3") is None
+
+    output = AutoHedgeOutput(
+        current_stock=first.ticker, decision="hold"
+    )
+    assert queue.complete(first.id, "w1", output.model_dump_json())
+    # Only the lease owner may complete a job
+    assert not queue.complete(
+        second.id, "w1", output.model_dump_json()
+    )
+    assert not queue.cycle_finished("c1")
+
+    queue.complete(
+        second.id,
+        "w2",
+        AutoHedgeOutput(
+            current_stock=second.ticker
+        ).model_dump_json(),
+    )
+    assert queue.cycle_finished("c1")
+    assert queue.results("c1")[first.ticker].decision == "hold"
+
+
+def test_expired_lease_is_retried_then_failed(tmp_path):
+    queue = WorkQueue(
+        str(tmp_path / "queue.db"), lease_seconds=0.05, max_attempts=2
+    )
+    queue.enqueue("c1", ["AAPL"], "task")
+
+    crashed = queue.claim("w1")
+    time.sleep(0.1)
+    retried = queue.claim("w2")
+    assert retried.id == crashed.id
+    assert retried.attempts == 2
+    assert not queue.heartbeat(crashed.id, "w1")
+
+    time.sleep(0.1)
+    assert queue.claim("w3") is None
+    assert queue.cycle_status("c1") == {"failed": 1}
+    assert queue.cycle_finished("c1")
+
+
+class DeadProcess:
+    exitcode = 1
+
+    def is_alive(self):
+        return False
+
+    def join(self, timeout=None):
+        pass
+
+
+def test_crash_looping_workers_fail_the_cycle(tmp_path):
+    import pytest
+    from autohedge.distributed import Coordinator, WorkerCrashLoop
+
+    coordinator = Coordinator(
+        str(tmp_path / "queue.db"),
+        workers=2,
+        poll_interval=0.01,
+        max_restarts=3,
+        restart_backoff=0.01,
+    )
+    spawned = []
+    coordinator._spawn = (
+        lambda *args, **kwargs: spawned.append(args) or DeadProcess()
+    )
+    with pytest.raises(WorkerCrashLoop):
+        coordinator.run_cycle(["AAPL", "TSLA"], "task")
+    assert 2 < len(spawned) <= 2 + 3
+
+
+def test_jobs_carry_the_coordinators_news(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "queue.db")
+    # A queue file from before jobs carried news
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " cycle_id TEXT NOT NULL, ticker TEXT NOT NULL, task TEXT NOT"
+        " NULL, status TEXT NOT NULL DEFAULT 'pending', attempts"
+        " INTEGER NOT NULL DEFAULT 0, lease_owner TEXT, lease_expires"
+        " REAL, result TEXT, error TEXT, created_at REAL NOT NULL,"
+        " updated_at REAL NOT NULL, UNIQUE (cycle_id, ticker))"
+    )
+    conn.close()
+
+    queue = WorkQueue(path)
+    queue.enqueue(
+        "c1", ["AAPL", "TSLA"], "task", news={"AAPL": "Stock: AAPL"}
+    )
+    jobs = {
+        job.ticker: job
+        for job in (queue.claim("w1"), queue.claim("w2"))
+    }
+    assert jobs["AAPL"].news == "Stock: AAPL"
+    assert jobs["TSLA"].news is None
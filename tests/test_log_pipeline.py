@@ -0,0 +1,67 @@
+import sys
+import os
+import json
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from loguru import logger
+
+from autohedge.log_pipeline import QueuedJSONSink
+
+
+def test_queued_sink_writes_compact_json(tmp_path):
+    path = tmp_path / "pipeline.jsonl"
+    sink = QueuedJSONSink(str(path), flush_interval=0.01)
+    handler_id = logger.add(sink.write, format="{message}")
+    try:
+        logger.bind(stage="quant", ticker="AAPL").info("analysed")
+        sink.flush()
+    finally:
+        logger.remove(handler_id)
+        sink.close()
+
+    lines = path.read_text().splitlines()
+    entry = json.loads(lines[-1])
+    assert entry["msg"] == "analysed"
+    assert entry["stage"] == "quant"
+    assert entry["ticker"] == "AAPL"
+    assert ", " not in lines[-1]
+
+
+def test_flush_returns_once_records_are_on_disk(tmp_path):
+    path = tmp_path / "pipeline.jsonl"
+    # A long interval: only the flush marker wakes the writer
+    sink = QueuedJSONSink(str(path), flush_interval=60)
+    handler_id = logger.add(sink.write, format="{message}")
+    try:
+        for i in range(1000):
+            logger.info(f"record {i}")
+        assert sink.flush()
+        assert len(path.read_text().splitlines()) == 1000
+    finally:
+        logger.remove(handler_id)
+        sink.close()
+
+
+def test_full_queue_drops_new_records_but_not_flushes(tmp_path):
+    path = tmp_path / "pipeline.jsonl"
+    sink = QueuedJSONSink(str(path), max_queue=10, flush_interval=60)
+    handler_id = logger.add(sink.write, format="{message}")
+    try:
+        for i in range(25):
+            logger.info(f"record {i}")
+        assert sink.flush(timeout=1)
+        lines = path.read_text().splitlines()
+        assert [json.loads(line)["msg"] for line in lines] == [
+            f"record {i}" for i in range(10)
+        ]
+        assert sink.dropped == 15
+    finally:
+        logger.remove(handler_id)
+        sink.close()
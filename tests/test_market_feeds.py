@@ -0,0 +1,94 @@
+import sys
+import os
+import asyncio
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+from experimental.market_feeds import (
+    LocalTickerServer,
+    MarketData,
+    MarketFeed,
+    WebSocketTickerFeed,
+)
+
+
+def test_websocket_feed_against_local_server():
+    async def run():
+        server = LocalTickerServer()
+        url = await server.start()
+        feed = WebSocketTickerFeed(["BTC/USD", "ETH/USD"], url=url)
+        await feed.start()
+        try:
+            await asyncio.wait_for(feed.connected.wait(), 5)
+            while server.subscribers("BTC/USD") == 0:
+                await asyncio.sleep(0.01)
+            assert (
+                await server.publish(
+                    "BTC/USD", 50000.0, 49990.0, 50010.0
+                )
+                == 1
+            )
+            # Not subscribed: never sent
+            assert await server.publish("SOL/USD", 150.0) == 0
+            update = await asyncio.wait_for(
+                feed.next_update("BTC/USD"), 5
+            )
+            return update, feed.latest("BTC/USD")
+        finally:
+            await feed.close()
+            await server.stop()
+
+    update, latest = asyncio.run(run())
+    assert (update.best_bid, update.best_ask, update.last_price) == (
+        49990.0,
+        50010.0,
+        50000.0,
+    )
+    assert latest is update
+
+
+def test_updates_are_conflated_per_pair():
+    async def run():
+        feed = MarketFeed()
+        subscription = feed.subscribe(["BTC/USD"])
+        for price in (1.0, 2.0, 3.0):
+            feed.publish(
+                MarketData(last_price=price, trading_pair="BTC/USD")
+            )
+        feed.publish(
+            MarketData(last_price=9.0, trading_pair="ETH/USD")
+        )
+        return await subscription.get()
+
+    changed = asyncio.run(run())
+    # A slow consumer only sees the freshest BTC snapshot
+    assert [(d.trading_pair, d.last_price) for d in changed] == [
+        ("BTC/USD", 3.0)
+    ]
+
+
+def test_multi_pair_feed_uses_each_pairs_spread():
+    from experimental.market_making import (
+        MarketMakingConfig,
+        configure_logging,
+    )
+    from experimental.multi_pair import MultiPairMarketMaker
+    from experimental.trade_journal import MemoryJournal
+
+    configure_logging(None)
+    maker = MultiPairMarketMaker(
+        [
+            MarketMakingConfig(trading_pair="BTC/USD"),
+            MarketMakingConfig(
+                trading_pair="ETH/USD", spread_percentage=0.01
+            ),
+        ],
+        journal=MemoryJournal(),
+    )
+    btc = maker.feed._snapshot("BTC/USD", 100.0)
+    eth = maker.feed._snapshot("ETH/USD", 100.0)
+    assert round(btc.best_ask - btc.best_bid, 6) == 0.1
+    assert round(eth.best_ask - eth.best_bid, 6) == 1.0
@@ -0,0 +1,152 @@
+import sys
+import os
+import json
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from autohedge.news import JSONLNewsSource, NewsIngestor
+
+STORY = (
+    "Apple shares rose after the company reported quarterly revenue "
+    "above analyst expectations, driven by strong iPhone demand in "
+    "China and record services growth across every region."
+)
+
+
+def write_lines(path, records):
+    with open(path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_near_duplicates_are_dropped(tmp_path):
+    feed = tmp_path / "news.jsonl"
+    write_lines(
+        feed,
+        [
+            {
+                "id": "1",
+                "tickers": ["AAPL"],
+                "title": "Apple beats",
+                "body": STORY,
+            },
+            # Syndicated copy with a different id and trivial edits
+            {
+                "id": "2",
+                "symbols": "aapl",
+                "headline": "Apple beats",
+                "summary": f"<p>{STORY}</p> (Reuters)",
+            },
+            {
+                "id": "3",
+                "tickers": ["AAPL"],
+                "title": "Apple recall",
+                "body": (
+                    "Apple announced a recall of chargers sold in"
+                    " Europe over overheating risk."
+                ),
+            },
+            {
+                "id": "4",
+                "tickers": ["TSLA"],
+                "title": "Tesla deliveries",
+                "body": STORY,
+            },
+        ],
+    )
+    news = NewsIngestor(
+        [JSONLNewsSource(str(feed))], min_poll_interval=0
+    )
+
+    articles = news.take("AAPL")
+    assert sorted(a.id for a in articles) == ["1", "3"]
+    assert news.stats["duplicates"] == 1
+    # The same text under another ticker is not a duplicate for that ticker
+    assert [a.id for a in news.take("TSLA")] == ["4"]
+
+    # Already delivered articles are not repeated
+    assert news.take("AAPL") == []
+    assert "No new news" in news.render("AAPL")
+
+    write_lines(
+        feed,
+        [{
+            "id": "5",
+            "tickers": ["AAPL"],
+            "title": "Apple buyback",
+            "body": "Board approves a new buyback.",
+        }],
+    )
+    assert "Apple buyback" in news.render("AAPL")
+    assert news.item_ids("AAPL") == ["1", "3", "5"]
+
+
+def test_token_budget_limits_articles(tmp_path):
+    feed = tmp_path / "news.jsonl"
+    write_lines(
+        feed,
+        [
+            {
+                "id": str(i),
+                "tickers": ["MSFT"],
+                "title": f"Story {i}",
+                "body": f"Unique story number {i} " * 40,
+            }
+            for i in range(10)
+        ],
+    )
+    news = NewsIngestor(
+        [JSONLNewsSource(str(feed))],
+        token_budget=500,
+        min_poll_interval=0,
+    )
+    articles = news.take("MSFT")
+    assert 0 < len(articles) < 10
+    # Newest stories are preferred
+    assert articles[0].id == "9"
+    # What did not fit is delivered next time, not dropped
+    delivered = [a.id for a in articles]
+    while True:
+        batch = news.take("MSFT")
+        if not batch:
+            break
+        delivered += [a.id for a in batch]
+    assert sorted(delivered, key=int) == [str(i) for i in range(10)]
+
+
+def test_seen_ids_are_bounded(tmp_path):
+    feed = tmp_path / "news.jsonl"
+    write_lines(
+        feed,
+        [
+            {
+                "id": str(i),
+                "tickers": ["MSFT"],
+                "title": f"Story {i}",
+                "body": f"Unique story number {i} " * 10,
+            }
+            for i in range(50)
+        ],
+    )
+    news = NewsIngestor(
+        [JSONLNewsSource(str(feed))],
+        max_history=10,
+        min_poll_interval=0,
+    )
+    news.ingest()
+    assert len(news._seen_ids["MSFT"]) == 10
+    assert len(news.item_ids("MSFT")) == 10
+
+
+def test_ingestor_pickles_for_worker_processes(tmp_path):
+    import pickle
+
+    ingestor = NewsIngestor([])
+    copy = pickle.loads(pickle.dumps(ingestor))
+    assert copy.ingest(force=True) == 0
@@ -0,0 +1,104 @@
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+from experimental.order_book import BID, ASK, FillSimulator, OrderBook
+
+
+def make_book():
+    book = OrderBook("BTC/USD", tick_size=0.5)
+    book.apply_snapshot(
+        bids=[(100.0, 5.0), (99.5, 3.0), (99.0, 1.0)],
+        asks=[(100.5, 2.0), (101.0, 4.0), (102.0, 6.0)],
+        sequence=10,
+    )
+    return book
+
+
+def test_snapshot_diffs_and_gaps():
+    book = make_book()
+    assert (book.best_bid(), book.best_ask(), book.mid()) == (
+        100.0,
+        100.5,
+        100.25,
+    )
+
+    assert book.apply_diff(BID, 100.0, 0.0, sequence=11)
+    assert book.best_bid() == 99.5
+    assert book.apply_diff(ASK, 100.0, 1.0, sequence=12)
+    assert book.best_ask() == 100.0
+    # Stale diffs are ignored, gaps ask for a snapshot
+    assert book.apply_diff(ASK, 100.0, 9.0, sequence=12)
+    assert book.size_at(ASK, 100.0) == 1.0
+    assert not book.apply_diff(BID, 99.0, 2.0, sequence=14)
+    assert book.needs_snapshot
+
+    depth = book.depth(2)
+    assert depth["bid_prices"].tolist() == [99.5, 99.0]
+    assert depth["ask_prices"].tolist() == [100.0, 100.5]
+
+
+def test_queue_position_and_partial_fills():
+    book = make_book()
+    sim = FillSimulator(book, latency=0.1)
+    order_id = sim.place(BID, 100.0, 2.0, now=0.0)
+    assert sim.advance(0.05) == []  # still in flight
+    sim.advance(0.1)
+    assert sim.orders[order_id].queue_ahead == 5.0
+
+    # Cancels ahead of us move us up; trades eat the queue first
+    sim.on_level_update(BID, 100.0, 3.0)
+    assert (
+        sim.on_trade(100.0, 3.0, aggressor_is_bid=False, now=1.0)
+        == []
+    )
+    (partial,) = sim.on_trade(
+        100.0, 1.5, aggressor_is_bid=False, now=1.1
+    )
+    assert (partial.price, partial.size, partial.remaining) == (
+        100.0,
+        1.5,
+        0.5,
+    )
+
+    # The market trading through our price fills the rest
+    book.apply_snapshot(bids=[(99.0, 1.0)], asks=[(99.5, 1.0)])
+    (rest,) = sim.advance(1.2)
+    assert (rest.size, rest.liquidity) == (0.5, "maker")
+    assert sim.orders[order_id].status == "filled"
+
+
+def test_marketable_order_fills_at_the_touch():
+    book = make_book()
+    sim = FillSimulator(book, latency=0.0)
+    order_id = sim.place(BID, 101.0, 5.0, now=0.0)
+    fills = sim.advance(0.0)
+    # Takes 2 @ 100.5 and 3 of 4 @ 101.0, never above the touch levels
+    assert [(f.price, f.size, f.liquidity) for f in fills] == [
+        (100.5, 2.0, "taker"),
+        (101.0, 3.0, "taker"),
+    ]
+    assert sim.orders[order_id].status == "filled"
+
+    # A limit only through the first level rests the remainder
+    sim = FillSimulator(make_book(), latency=0.0)
+    order_id = sim.place(BID, 100.5, 3.0, now=0.0)
+    (fill,) = sim.advance(0.0)
+    assert (fill.price, fill.size) == (100.5, 2.0)
+    assert sim.orders[order_id].remaining == 1.0
+    assert sim.orders[order_id].status == "open"
+
+
+def test_finished_orders_and_fills_are_bounded():
+    sim = FillSimulator(make_book(), latency=0.0, max_history=3)
+    live = sim.place(BID, 99.0, 1.0, now=0.0)
+    for i in range(5):
+        order_id = sim.place(BID, 101.0, 1.0, now=float(i))
+        sim.advance(float(i))
+        assert sim.orders[order_id].status == "filled"
+    assert len(sim.fills) == 3
+    assert set(sim.orders) == {live, "sim_4", "sim_5", "sim_6"}
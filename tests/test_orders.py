@@ -0,0 +1,203 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from autohedge.orders import (
+    OrderParseError,
+    OrderRouter,
+    TradeOrder,
+    parse_decision,
+    parse_order,
+)
+from autohedge.account import AccountCache
+from autohedge.tools.broker import (
+    Balances,
+    BrokerAdapter,
+    BrokerError,
+    OrderAck,
+)
+
+
+def test_parse_json_block_and_free_text():
+    structured = """Buy on the pullback.
+```json
+{"symbol": "aapl", "side": "buy", "quantity": 100, "order_type": "limit",
+ "limit_price": 187.5, "stop_price": null, "time_in_force": "GTC",
+ "stop_loss": 180, "take_profit": 205}
+```"""
+    order = parse_order(structured, symbol="AAPL")
+    assert (
+        order.symbol,
+        order.side,
+        order.quantity,
+        order.order_type,
+    ) == ("AAPL", "BUY", 100, "LIMIT")
+    assert order.time_in_force == "GTC" and order.stop_loss == 180
+
+    text = """1. Order type: Market
+2. Quantity: 1,200 shares
+3. Stop loss: $250.00
+4. Time in force: Day
+Action: Sell"""
+    order = parse_order(text, symbol="TSLA")
+    assert (
+        order.side,
+        order.quantity,
+        order.order_type,
+        order.limit_price,
+    ) == ("SELL", 1200, "MARKET", None)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Mocked Response",
+        "Quantity: 10. We could buy now or sell later.",
+        "Action: buy, Quantity: 10.5",
+        "Action: buy, Quantity: 10, Order type: limit",
+        "Action: buy, Quantity: 10, Entry price: 100, Stop loss: 110",
+        (
+            '```json\n{"symbol": "MSFT", "side": "BUY", "quantity":'
+            " 1}\n```"
+        ),
+    ],
+)
+def test_parse_rejects_invalid_orders(text):
+    with pytest.raises(OrderParseError):
+        parse_order(text, symbol="AAPL")
+
+
+def test_parse_decision():
+    assert parse_decision("Strong setup.\nDecision: APPROVE")
+    assert not parse_decision(
+        "I would approve a smaller size.\n**Decision:** reject"
+    )
+    # The final verdict wins over earlier drafts
+    assert parse_decision(
+        "Decision: hold for now... on reflection, Decision: Approved"
+    )
+    with pytest.raises(OrderParseError):
+        parse_decision("Looks good, execute it.")
+
+
+class RecordingBroker(BrokerAdapter):
+    name = "recording"
+
+    def __init__(self):
+        super().__init__()
+        self.placed = []
+
+    async def place_order(self, order):
+        await asyncio.sleep(0.01)
+        if order.symbol == "FAIL":
+            raise BrokerError(self.name, "rejected", 400)
+        self.placed.append(order)
+        return OrderAck(
+            broker=self.name,
+            order_id=str(len(self.placed)),
+            client_order_id=order.client_order_id,
+            latency=0.01,
+        )
+
+
+def test_router_nets_and_batches():
+    broker = RecordingBroker()
+    router = OrderRouter(broker, batch_size=2)
+    orders = [
+        TradeOrder(symbol="AAPL", side="BUY", quantity=100),
+        TradeOrder(symbol="AAPL", side="SELL", quantity=30),
+        TradeOrder(symbol="MSFT", side="BUY", quantity=10),
+        TradeOrder(symbol="MSFT", side="SELL", quantity=10),
+        # Different terms are not netted
+        TradeOrder(
+            symbol="AAPL",
+            side="SELL",
+            quantity=5,
+            order_type="LIMIT",
+            limit_price=200,
+        ),
+        TradeOrder(symbol="FAIL", side="BUY", quantity=1),
+    ]
+    report = router.route_blocking(orders)
+
+    assert report.received == 6 and report.netted_out == 3
+    assert [
+        (o.symbol, o.side, o.quantity) for o in broker.placed
+    ] == [("AAPL", "BUY", 70), ("AAPL", "SELL", 5)]
+    assert len(report.acked) == 2 and len(report.failed) == 1
+    assert all(r.latency > 0 for r in report.acked)
+    assert router.latency_stats()["count"] == 2
+
+
+class FillingBroker(RecordingBroker):
+    """Reports market orders filled at $10 in the ack."""
+
+    def __init__(self):
+        super().__init__()
+        self.account_reads = 0
+
+    async def place_order(self, order):
+        ack = await super().place_order(order)
+        if order.order_type == "MARKET":
+            ack.filled_quantity, ack.fill_price = order.quantity, 10.0
+        return ack
+
+    async def get_balances(self):
+        self.account_reads += 1
+        await asyncio.sleep(0.02)
+        return Balances(cash=1000, buying_power=1000, equity=1000)
+
+    async def get_positions(self):
+        return []
+
+
+def test_fills_patch_the_account_cache():
+    from concurrent.futures import ThreadPoolExecutor
+
+    broker = FillingBroker()
+    cache = AccountCache(broker, ttl=60)
+    # Blocking readers on many threads share one refresh
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: cache.snapshot_blocking(), range(8)))
+    assert broker.account_reads == 1
+
+    router = OrderRouter(broker, account=cache)
+    router.route_blocking(
+        [TradeOrder(symbol="AAPL", side="BUY", quantity=10)]
+    )
+    assert (
+        cache.current.quantity("AAPL") == 10
+        and cache.current.balances.cash == 900
+    )
+    # Filled in the ack: patched, not refetched
+    assert cache.snapshot_blocking().quantity("AAPL") == 10
+    assert broker.account_reads == 1 and not router.working
+
+    report = router.route_blocking([
+        TradeOrder(
+            symbol="AAPL",
+            side="BUY",
+            quantity=10,
+            order_type="LIMIT",
+            limit_price=9.5,
+        )
+    ])
+    order_id = report.acked[0].ack.order_id
+    assert order_id in router.working
+    assert router.on_fill(order_id, 4, 9.5)
+    assert cache.current.quantity("AAPL") == 14
+    assert router.on_fill(
+        order_id, 10, 9.5
+    )  # capped at the open quantity
+    assert cache.current.quantity("AAPL") == 20 and not router.working
+    assert not router.on_fill("unknown", 1, 9.5)
@@ -0,0 +1,274 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from autohedge.pretrade import (
+    PreTradeRisk,
+    RiskCheckedBroker,
+    RiskLimits,
+    RiskRejection,
+    SymbolLimits,
+)
+from autohedge.account import AccountSnapshot
+from autohedge.orders import OrderRouter, TradeOrder
+from autohedge.tools.broker import (
+    BrokerAdapter,
+    BrokerError,
+    BrokerOrder,
+    OrderAck,
+    Position,
+)
+
+
+def make_risk(clock):
+    limits = RiskLimits(
+        default=SymbolLimits(
+            max_order_notional=10_000, max_position=200, collar=0.05
+        ),
+        symbols={
+            "TSLA": SymbolLimits(
+                max_order_notional=50_000, max_orders_per_minute=2
+            )
+        },
+        max_gross_exposure=30_000,
+    )
+    risk = PreTradeRisk(limits, clock=lambda: clock[0])
+    risk.update_price("AAPL", 100.0)
+    risk.update_price("TSLA", 200.0)
+    return risk
+
+
+def test_limits_exposure_and_rates():
+    clock = [0.0]
+    risk = make_risk(clock)
+
+    assert risk.check(
+        BrokerOrder(symbol="AAPL", side="BUY", quantity=50)
+    ).accepted
+    reasons = risk.check(
+        BrokerOrder(symbol="AAPL", side="BUY", quantity=150)
+    ).reasons
+    assert any("notional" in r for r in reasons)
+    collar = risk.check(
+        BrokerOrder(
+            symbol="AAPL",
+            side="BUY",
+            quantity=1,
+            order_type="LIMIT",
+            limit_price=110,
+        )
+    )
+    assert any("collar" in r for r in collar.reasons)
+    assert (
+        "no reference price for MSFT"
+        in risk.check(
+            BrokerOrder(symbol="MSFT", side="BUY", quantity=1)
+        ).reasons
+    )
+
+    # Acked orders count towards position and gross exposure
+    risk.on_ack(BrokerOrder(symbol="AAPL", side="BUY", quantity=90))
+    risk.on_fill("AAPL", "BUY", 90, 100.0)
+    assert risk.gross_exposure == 9_000
+    assert any(
+        "position" in r
+        for r in risk.check(
+            BrokerOrder(symbol="AAPL", side="BUY", quantity=111)
+        ).reasons
+    )
+    assert any(
+        "gross" in r
+        for r in risk.check(
+            BrokerOrder(symbol="TSLA", side="BUY", quantity=120)
+        ).reasons
+    )
+    # Reducing a position frees exposure
+    assert risk.check(
+        BrokerOrder(symbol="AAPL", side="SELL", quantity=90)
+    ).accepted
+
+    # Sliding window: two TSLA orders per minute
+    for _ in range(2):
+        assert risk.check(
+            BrokerOrder(symbol="TSLA", side="BUY", quantity=1)
+        ).accepted
+    assert not risk.check(
+        BrokerOrder(symbol="TSLA", side="BUY", quantity=1)
+    ).accepted
+    clock[0] = 61.0
+    assert risk.check(
+        BrokerOrder(symbol="TSLA", side="BUY", quantity=1)
+    ).accepted
+    assert risk.stats["rejected"] == len(risk.rejections) == 6
+
+
+def test_share_limits_apply_without_a_price():
+    risk = PreTradeRisk(
+        RiskLimits(
+            default=SymbolLimits(
+                max_position=100, max_order_quantity=500
+            )
+        )
+    )
+    decision = risk.check(
+        BrokerOrder(symbol="NVDA", side="BUY", quantity=1_000_000)
+    )
+    assert not decision.accepted
+    assert any("position" in r for r in decision.reasons)
+    assert any("quantity" in r for r in decision.reasons)
+    assert risk.check(
+        BrokerOrder(symbol="NVDA", side="BUY", quantity=100)
+    ).accepted
+
+
+class RecordingBroker(BrokerAdapter):
+    name = "recording"
+
+    def __init__(self):
+        super().__init__()
+        self.placed = []
+
+    async def place_order(self, order):
+        self.placed.append(order)
+        return OrderAck(
+            broker=self.name,
+            order_id=str(len(self.placed)),
+            client_order_id=order.client_order_id,
+        )
+
+    async def cancel_order(self, order_id):
+        return {"cancelled": order_id}
+
+
+def test_rejections_never_reach_the_broker():
+    inner = RecordingBroker()
+    risk = make_risk([0.0])
+    broker = RiskCheckedBroker(inner, risk)
+
+    async def run():
+        await broker.place_order(
+            BrokerOrder(symbol="AAPL", side="BUY", quantity=10)
+        )
+        with pytest.raises(RiskRejection) as rejected:
+            await broker.place_order(
+                BrokerOrder(symbol="AAPL", side="BUY", quantity=500)
+            )
+        return rejected.value
+
+    rejection = asyncio.run(run())
+    assert len(inner.placed) == 1
+    assert risk.working["AAPL"] == 10
+    assert rejection.decision.reasons
+
+
+def test_router_reports_fills_and_cancels_to_the_risk_counters():
+    inner = RecordingBroker()
+    risk = make_risk([0.0])
+    broker = RiskCheckedBroker(inner, risk)
+    assert (
+        broker.stats is inner.stats
+        and broker.retries == inner.retries
+    )
+    router = OrderRouter(broker)
+
+    report = router.route_blocking(
+        [TradeOrder(symbol="AAPL", side="BUY", quantity=10)]
+    )
+    order_id = report.acked[0].ack.order_id
+    assert risk.working["AAPL"] == 10
+
+    assert router.on_fill(order_id, 4, 101.0)
+    assert (risk.positions["AAPL"], risk.working["AAPL"]) == (4, 6)
+    assert risk.last_price["AAPL"] == 101.0
+
+    assert router.cancel_blocking(order_id)
+    assert (risk.positions["AAPL"], risk.working["AAPL"]) == (4, 0)
+    assert not router.working
+
+
+class FailingBroker(RecordingBroker):
+    async def place_order(self, order):
+        await asyncio.sleep(0)
+        if order.quantity == 13:
+            raise BrokerError(self.name, "rejected upstream")
+        return await super().place_order(order)
+
+
+def test_concurrent_orders_are_checked_against_each_other():
+    inner = FailingBroker()
+    risk = PreTradeRisk(
+        RiskLimits(
+            default=SymbolLimits(max_position=100),
+            max_gross_exposure=20_000,
+        )
+    )
+    risk.update_price("AAPL", 100.0)
+    risk.update_price("MSFT", 100.0)
+    broker = RiskCheckedBroker(inner, risk)
+
+    results = asyncio.run(
+        broker.submit_many([
+            BrokerOrder(symbol="AAPL", side="BUY", quantity=50)
+            for _ in range(6)
+        ])
+    )
+    assert sum(not isinstance(r, BrokerError) for r in results) == 2
+    assert risk.working["AAPL"] == 100
+    assert risk.gross_exposure == 10_000
+
+    # A failed placement releases its reservation
+    with pytest.raises(BrokerError):
+        asyncio.run(
+            broker.place_order(
+                BrokerOrder(symbol="MSFT", side="BUY", quantity=13)
+            )
+        )
+    assert risk.working["MSFT"] == risk.reserved["MSFT"] == 0
+    assert risk.gross_exposure == 10_000
+
+
+def test_sync_rebuilds_working_from_open_orders():
+    inner = RecordingBroker()
+    risk = make_risk([0.0])
+    router = OrderRouter(RiskCheckedBroker(inner, risk))
+
+    report = router.route_blocking(
+        [TradeOrder(symbol="AAPL", side="BUY", quantity=10)]
+    )
+    order_id = report.acked[0].ack.order_id
+    assert router.on_fill(order_id, 4, 100.0)
+    assert risk.reserved["AAPL"] == 0
+    # Reserved but not yet routed
+    risk.check(
+        BrokerOrder(symbol="TSLA", side="SELL", quantity=5),
+        reserve=True,
+    )
+
+    account = AccountSnapshot(
+        positions={
+            "AAPL": Position(
+                symbol="AAPL", quantity=4, market_value=400
+            )
+        }
+    )
+    risk.sync(account, router.open_orders())
+    assert risk.working == {"AAPL": 6, "TSLA": -5}
+    assert risk.gross_exposure == 10 * 100 + 5 * 200
+
+    # The resting remainder fills without driving working negative
+    assert router.on_fill(order_id, 6, 100.0)
+    assert (risk.positions["AAPL"], risk.working["AAPL"]) == (10, 0)
+
+    # Without open orders, working is kept
+    risk.sync(account)
+    assert risk.working["TSLA"] == -5
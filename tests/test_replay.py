@@ -0,0 +1,73 @@
+import sys
+import os
+import json
+import random
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+from experimental.market_making import (
+    MarketMaker,
+    MarketMakingConfig,
+    configure_logging,
+)
+from experimental.replay import ReplayEngine, load_events
+from experimental.trade_journal import MemoryJournal
+
+# No market_maker.log from the tests
+configure_logging(None)
+
+
+def make_events(n=400, seed=7):
+    rng = random.Random(seed)
+    price, events = 100.0, []
+    for i in range(n):
+        price *= 1 + rng.gauss(0, 0.002)
+        t = float(i)
+        events.append({
+            "type": "ticker",
+            "timestamp": t,
+            "trading_pair": "BTC/USDT",
+            "best_bid": round(price - 0.05, 2),
+            "best_ask": round(price + 0.05, 2),
+            "last_price": round(price, 2),
+        })
+        # Trades through our quotes on both sides
+        side = "buy" if rng.random() < 0.5 else "sell"
+        through = price * (1.01 if side == "buy" else 0.99)
+        events.append({
+            "type": "trade",
+            "timestamp": t + 0.5,
+            "trading_pair": "BTC/USDT",
+            "price": round(through, 2),
+            "size": rng.uniform(0.1, 2.0),
+            "side": side,
+        })
+    return events
+
+
+def replay(events):
+    config = MarketMakingConfig(
+        trading_pair="BTC/USDT", requote_tolerance=0.0
+    )
+    maker = MarketMaker(config, journal=MemoryJournal())
+    result = ReplayEngine([maker], events, latency=0.1).run()[
+        "BTC/USDT"
+    ]
+    return result, maker.journal.events
+
+
+def test_replay_is_deterministic(tmp_path):
+    path = tmp_path / "events.jsonl"
+    with open(path, "w") as f:
+        for event in make_events():
+            f.write(json.dumps(event) + "\n")
+
+    first, first_fills = replay(load_events(str(path)))
+    second, second_fills = replay(load_events(str(path)))
+    assert first_fills, "the replay should produce fills"
+    assert first_fills == second_fills
+    assert first == second
+    assert first["total_trades"] == len(first_fills)
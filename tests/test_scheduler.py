@@ -0,0 +1,117 @@
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from autohedge.scheduler import ContinuousScheduler
+from autohedge.utils import AutoHedgeOutput
+
+
+class FakeHedge:
+    screener = None
+
+    def __init__(self, stocks):
+        self.stocks = stocks
+        self.calls = []
+        self.routed = []
+        self.recorded = []
+
+    def select_stocks(self):
+        return self.stocks
+
+    def cycle_snapshot(self):
+        return None
+
+    def analyze_stock(self, stock, task, account=None, deadline=None):
+        self.calls.append(stock)
+        return AutoHedgeOutput(current_stock=stock, decision=task)
+
+    def reset_history(self, task=None):
+        self.recorded = []
+
+    def record(self, output):
+        self.recorded.append(output)
+
+    def route_orders(self, outputs):
+        self.routed.append([o.current_stock for o in outputs])
+
+
+def test_only_changed_tickers_are_rerun():
+    prices = {"AAPL": (100.0, 2.0), "TSLA": (200.0, 5.0)}
+    news = {"AAPL": ["a1"], "TSLA": ["t1"]}
+    hedge = FakeHedge(["AAPL", "TSLA"])
+    scheduler = ContinuousScheduler(
+        hedge,
+        task="cycle",
+        atr_multiple=1.0,
+        price_source=lambda tickers: {t: prices[t] for t in tickers},
+        news_source=lambda ticker: news[ticker],
+    )
+
+    scheduler.run_cycle()
+    assert hedge.calls == ["AAPL", "TSLA"]
+
+    # Small move, no news: everything is reused
+    prices["AAPL"] = (101.0, 2.0)
+    scheduler.run_cycle()
+    assert hedge.calls == ["AAPL", "TSLA"]
+    assert scheduler.last_cycle_stats["reused"] == 2
+
+    # AAPL moves > 1 ATR, TSLA gets a new story
+    prices["AAPL"] = (103.0, 2.0)
+    news["TSLA"] = ["t1", "t2"]
+    results = scheduler.run_cycle()
+    assert hedge.calls == ["AAPL", "TSLA", "AAPL", "TSLA"]
+    assert set(results) == {"AAPL", "TSLA"}
+    # Only fresh decisions are routed
+    assert hedge.routed == [["AAPL", "TSLA"], [], ["AAPL", "TSLA"]]
+    # The history holds the latest output per ticker, not every cycle
+    assert hedge.recorded == list(results.values())
+
+
+def test_saved_price_cache_is_reloaded(tmp_path):
+    import numpy as np
+
+    from autohedge.screener import PriceCache
+
+    path = str(tmp_path / "prices.npz")
+    closes = np.array([[100.0, 101.0, 100.0, 101.0]])
+    PriceCache(["AAPL"], closes, np.ones_like(closes)).save(path)
+    hedge = FakeHedge(["AAPL"])
+    scheduler = ContinuousScheduler(
+        hedge, task="t", price_cache_path=path
+    )
+    scheduler.run_cycle()
+    scheduler.run_cycle()
+    assert hedge.calls == ["AAPL"]
+
+    # A market data job rewrites the cache with a big move
+    closes = np.append(closes, [[110.0]], axis=1)
+    PriceCache(["AAPL"], closes, np.ones_like(closes)).save(path)
+    os.utime(path, ns=(0, 10**18))
+    scheduler.run_cycle()
+    assert hedge.calls == ["AAPL", "AAPL"]
+
+
+def test_ttl_and_task_change_trigger_rerun():
+    hedge = FakeHedge(["AAPL"])
+    scheduler = ContinuousScheduler(
+        hedge, task="one", decision_ttl=3600
+    )
+    scheduler.run_cycle()
+    scheduler.run_cycle()
+    assert hedge.calls == ["AAPL"]
+
+    scheduler.decision_ttl = 0
+    scheduler.run_cycle()
+    assert len(hedge.calls) == 2
+
+    scheduler.decision_ttl = 3600
+    scheduler.task = "two"
+    assert scheduler.run_cycle()["AAPL"].decision == "two"
@@ -0,0 +1,76 @@
+import sys
+import os
+import time
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+import numpy as np
+import pytest
+
+from autohedge.screener import PriceCache, UniverseScreener
+
+
+def make_cache(
+    n_tickers: int = 5000, n_bars: int = 252
+) -> PriceCache:
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0005, 0.02, size=(n_tickers, n_bars))
+    closes = 100 * np.exp(np.cumsum(returns, axis=1))
+    volumes = rng.uniform(1e5, 1e7, size=(n_tickers, n_bars))
+    opens = closes * (1 + rng.normal(0, 0.005, size=closes.shape))
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    return PriceCache(tickers, closes, volumes, opens=opens)
+
+
+def test_screen_top_k_is_fast():
+    cache = make_cache()
+    screener = UniverseScreener(
+        cache,
+        factors={"quality": "momentum / (volatility + 1e-9)"},
+        weights={"quality": 1.0, "liquidity": 0.25},
+        filter_expression="(liquidity > 5) & (abs(gap) < 0.05)",
+        top_k=50,
+    )
+
+    start = time.perf_counter()
+    selected = screener.screen(cache.tickers)
+    elapsed = time.perf_counter() - start
+
+    assert len(selected) == 50
+    scores = [screener.last_scores[t] for t in selected]
+    assert scores == sorted(scores, reverse=True)
+    assert elapsed < 1.0
+
+
+def test_unknown_tickers_are_skipped():
+    cache = make_cache(n_tickers=10)
+    screener = UniverseScreener(cache, top_k=None)
+    assert set(screener.screen(["T0001", "MISSING"])) == {"T0001"}
+
+
+def test_expression_rejects_arbitrary_code():
+    cache = make_cache(n_tickers=10)
+    with pytest.raises(ValueError):
+        UniverseScreener(cache, factors={"bad": "__import__('os')"})
+
+
+def test_single_bar_history():
+    closes = np.array([[10.0], [20.0]])
+    cache = PriceCache(
+        ["A", "B"],
+        closes,
+        np.full((2, 1), 1e6),
+        opens=closes * 0.99,
+        highs=closes * 1.01,
+        lows=closes * 0.98,
+    )
+    screener = UniverseScreener(
+        cache, filter_expression="abs(gap) < 0.05", top_k=None
+    )
+    assert set(screener.screen(["A", "B"])) == {"A", "B"}
@@ -0,0 +1,98 @@
+import sys
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from autohedge.sentiment_scorer import LexiconSentimentScorer
+
+
+def test_polarity_and_negation():
+    scorer = LexiconSentimentScorer()
+    positive, negated, neutral = scorer.score_many([
+        (
+            "Shares surged after earnings beat estimates on strong"
+            " growth"
+        ),
+        "Earnings did not beat estimates and growth was not strong",
+        "The company will hold its annual meeting on Tuesday",
+    ])
+    assert positive.score > 0.7
+    assert negated.score < 0.4
+    assert neutral.score == 0.5
+    assert not positive.escalate and not neutral.escalate
+
+
+def test_high_impact_and_mixed_news_escalate():
+    scorer = LexiconSentimentScorer()
+    impact, mixed = scorer.score_many([
+        "Regulators opened a fraud investigation into the lender",
+        (
+            "Revenue beat and margins were strong, but losses widened"
+            " and guidance weak after a downgrade"
+        ),
+    ])
+    assert impact.escalate and "fraud" in impact.high_impact
+    assert mixed.escalate
+
+
+def test_bulk_throughput():
+    scorer = LexiconSentimentScorer()
+    article = (
+        "Shares jumped as the company reported record profit, though"
+        " analysts warned that costs could weigh on margins and there"
+        " was no sign of a slowdown in demand across its key"
+        " markets. "
+        * 3
+    )
+    start = time.perf_counter()
+    scorer.score_many([article] * 5000)
+    assert time.perf_counter() - start < 5.0
+
+
+@patch("autohedge.agents.sentiment.Agent")
+def test_agent_only_escalates_hard_cases(mock_agent):
+    from autohedge.agents import SentimentAgent
+
+    mock_instance = MagicMock()
+    mock_instance.run.return_value = "LLM analysis"
+    mock_agent.return_value = mock_instance
+
+    agent = SentimentAgent(scorer=LexiconSentimentScorer())
+    assert "Overall Sentiment Score" in agent.analyze(
+        "Shares rallied on strong results"
+    )
+    assert (
+        agent.analyze("Company files for bankruptcy")
+        == "LLM analysis"
+    )
+    assert agent.stats == {"local": 1, "escalated": 1}
+    # Without real articles (no NewsIngestor) the LLM is always used
+    assert (
+        agent.analyze(
+            "Market sentiment analysis for AAPL", fast_path=False
+        )
+        == "LLM analysis"
+    )
+    assert agent.stats == {"local": 1, "escalated": 1}
+
+
+def test_ambiguous_words_only_escalate_as_phrases():
+    scorer = LexiconSentimentScorer()
+    benign, seconds, probe, default = scorer.score_many([
+        "The app now ships dark mode by default",
+        "Orders are matched within 30 sec on average",
+        "The SEC   investigation into the lender widened",
+        "The retailer warned of a possible debt default",
+    ])
+    assert not benign.escalate and benign.score == 0.5
+    assert not seconds.escalate
+    assert probe.escalate and "sec investigation" in probe.high_impact
+    assert default.escalate and "debt default" in default.high_impact
@@ -0,0 +1,255 @@
+import sys
+import os
+import json
+import threading
+import time
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+# Set dummy API key for testing
+os.environ["OPENAI_API_KEY"] = "dummy_key"
+
+from fastapi.testclient import TestClient
+
+from autohedge.deadline import Deadline
+from autohedge.server import CycleService, create_app
+from autohedge.orders import RoutingReport
+from autohedge.utils import AutoHedgeOutput
+
+STAGES = [
+    "thesis",
+    "sentiment",
+    "quant",
+    "risk",
+    "execution",
+    "decision",
+]
+
+
+class FakeHedge:
+    def __init__(self, release):
+        self.release = release
+
+    def process_stock(
+        self, stock, task, account=None, on_stage=None, deadline=None
+    ):
+        self.deadline = deadline
+        if stock == "SLOW":
+            time.sleep(1)
+        self.release.wait(5)
+        if stock == "FAIL":
+            raise RuntimeError("agent error")
+        for stage in STAGES:
+            on_stage(stage, stock, f"{stage} for {stock}: {task}")
+        return AutoHedgeOutput(
+            current_stock=stock, decision=f"hold {stock}"
+        )
+
+
+def read_events(client, job_id, headers=None):
+    events = []
+    with client.stream(
+        "GET", f"/cycles/{job_id}/events", headers=headers or {}
+    ) as response:
+        event = {}
+        for line in response.iter_lines():
+            if line.startswith("id: "):
+                event["id"] = int(line[4:])
+            elif line.startswith("event: "):
+                event["event"] = line[7:]
+            elif line.startswith("data: "):
+                event["data"] = json.loads(line[6:])
+            elif not line and event:
+                events.append(event)
+                event = {}
+    return events
+
+
+def test_cycles_stream_stage_events_and_results():
+    release = threading.Event()
+    service = CycleService(
+        hedge_factory=lambda: FakeHedge(release),
+        workers=1,
+        queue_size=1,
+    )
+    with TestClient(create_app(service)) as client:
+        first = client.post(
+            "/cycles",
+            json={
+                "stocks": ["aapl", "FAIL"],
+                "task": "Rebalance",
+                "strategy": "momentum",
+            },
+        )
+        assert first.status_code == 202
+        job_id = first.json()["id"]
+
+        # One cycle running, one queued, then the queue is full
+        deadline = time.time() + 5
+        while service.busy == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert (
+            client.post(
+                "/cycles", json={"stocks": ["MSFT"], "task": "t"}
+            ).status_code
+            == 202
+        )
+        full = client.post(
+            "/cycles", json={"stocks": ["TSLA"], "task": "t"}
+        )
+        assert full.status_code == 503
+        assert (
+            client.post(
+                "/cycles", json={"stocks": [], "task": "t"}
+            ).status_code
+            == 422
+        )
+
+        release.set()
+        events = read_events(client, job_id)
+        kinds = [e["event"] for e in events]
+        assert kinds[0] == "status" and kinds[-1] == "status"
+        assert [
+            e["data"]["stage"]
+            for e in events
+            if e["event"] == "stage"
+        ] == STAGES
+        assert "Strategy: momentum" in events[1]["data"]["output"]
+        assert (
+            kinds.count("result") == 1 and kinds.count("error") == 1
+        )
+        assert events[-1]["data"]["status"] == "done"
+
+        # Resuming after an event id only replays what came later
+        assert (
+            read_events(
+                client,
+                job_id,
+                {"Last-Event-ID": str(events[-2]["id"])},
+            )
+            == events[-1:]
+        )
+
+        result = client.get(f"/cycles/{job_id}").json()
+        assert result["status"] == "done"
+        assert [r["current_stock"] for r in result["results"]] == [
+            "AAPL"
+        ]
+        assert result["errors"] == {"FAIL": "agent error"}
+        assert client.get("/cycles/unknown").status_code == 404
+
+        metrics = client.get("/metrics").json()
+        assert metrics["jobs"]["submitted"] == 2
+        assert set(metrics["avg_stage_seconds"]) == set(STAGES)
+
+
+def test_cancel_cycle():
+    release = threading.Event()
+    service = CycleService(
+        hedge_factory=lambda: FakeHedge(release),
+        workers=1,
+        queue_size=2,
+    )
+    with TestClient(create_app(service)) as client:
+        running = client.post(
+            "/cycles", json={"stocks": ["AAPL", "MSFT"], "task": "t"}
+        ).json()["id"]
+        queued = client.post(
+            "/cycles", json={"stocks": ["TSLA"], "task": "t"}
+        ).json()["id"]
+        assert client.delete(f"/cycles/{running}").status_code == 200
+        assert client.delete(f"/cycles/{queued}").status_code == 200
+        release.set()
+
+        assert (
+            read_events(client, running)[-1]["data"]["status"]
+            == "cancelled"
+        )
+        assert (
+            read_events(client, queued)[-1]["data"]["status"]
+            == "cancelled"
+        )
+        # AAPL may finish before the cancel is seen, MSFT never starts
+        results = client.get(f"/cycles/{running}").json()["results"]
+        assert "MSFT" not in [r["current_stock"] for r in results]
+        assert client.delete(f"/cycles/{running}").status_code == 409
+
+
+class RoutingHedge(FakeHedge):
+    def __init__(self, release, routed):
+        super().__init__(release)
+        self.routed = routed
+
+    def cycle_snapshot(self):
+        self.routed.append("snapshot")
+
+    def route_orders(self, outputs):
+        self.routed.append([o.current_stock for o in outputs])
+        return RoutingReport(received=len(outputs))
+
+
+def test_cycles_route_their_orders():
+    release, routed = threading.Event(), []
+    release.set()
+    service = CycleService(
+        hedge_factory=lambda: RoutingHedge(release, routed), workers=1
+    )
+    with TestClient(create_app(service)) as client:
+        job_id = client.post(
+            "/cycles", json={"stocks": ["AAPL", "MSFT"], "task": "t"}
+        ).json()["id"]
+        events = read_events(client, job_id)
+        assert [e["event"] for e in events][-2:] == [
+            "routing",
+            "status",
+        ]
+        assert routed == ["snapshot", ["AAPL", "MSFT"]]
+        assert (
+            client.get(f"/cycles/{job_id}").json()["routing"][
+                "received"
+            ]
+            == 2
+        )
+
+
+def test_cycle_deadline_times_out_slow_tickers():
+    release = threading.Event()
+    release.set()
+    hedges = []
+
+    def factory():
+        hedges.append(FakeHedge(release))
+        return hedges[-1]
+
+    service = CycleService(hedge_factory=factory, workers=2)
+    with TestClient(create_app(service)) as client:
+        job_id = client.post(
+            "/cycles",
+            json={
+                "stocks": ["SLOW", "AAPL"],
+                "task": "t",
+                "deadline": 0.4,
+            },
+        ).json()["id"]
+        assert (
+            read_events(client, job_id)[-1]["data"]["status"]
+            == "done"
+        )
+        results = client.get(f"/cycles/{job_id}").json()["results"]
+        assert [
+            (r["current_stock"], r["timed_out"]) for r in results
+        ] == [
+            ("SLOW", True),
+            ("AAPL", False),
+        ]
+        assert all(isinstance(h.deadline, Deadline) for h in hedges)
+        assert (
+            client.post(
+                "/cycles",
+                json={"stocks": ["A"], "task": "t", "deadline": 0},
+            ).status_code
+            == 422
+        )
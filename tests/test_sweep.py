@@ -0,0 +1,46 @@
+import sys
+import os
+import json
+import math
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+from experimental.sweep import grid_configs, load_results, run_sweep
+
+
+def write_history(path, n=300):
+    with open(path, "w") as f:
+        f.write("timestamp,close\n")
+        for i in range(n):
+            f.write(f"{i},{100 + 2 * math.sin(i / 10):.4f}\n")
+
+
+def test_sweep_resumes_from_results_file(tmp_path):
+    history = tmp_path / "prices.csv"
+    results = tmp_path / "sweep.jsonl"
+    write_history(history)
+
+    first = grid_configs(spread_percentage=[0.001, 0.002])
+    assert (
+        len(run_sweep(str(history), first, str(results), workers=1))
+        == 2
+    )
+
+    # The rerun only evaluates the config it has not seen before
+    more = grid_configs(spread_percentage=[0.001, 0.002, 0.004])
+    ranked = run_sweep(
+        str(history), more, str(results), workers=1, rank_by="pnl"
+    )
+    with open(results) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    assert len(lines) == 3
+    assert len(load_results(str(results))) == 3
+    assert sorted(
+        r["config"]["spread_percentage"] for r in ranked
+    ) == [0.001, 0.002, 0.004]
+    assert [r["pnl"] for r in ranked] == sorted(
+        (r["pnl"] for r in ranked), reverse=True
+    )
@@ -0,0 +1,97 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add project root to sys.path
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+)
+
+from experimental.trade_journal import (
+    JournalWriteError,
+    TradeJournal,
+    read_binary_journal,
+)
+
+
+def fill(i):
+    return {
+        "timestamp": 1000.0 + i,
+        "trading_pair": "BTC/USD",
+        "event_type": "BUY" if i % 2 else "SELL",
+        "price": 50000.0 + i,
+        "amount": 0.01,
+        "base_inventory": 1.0,
+        "quote_inventory": 1000.0,
+        "total_value": 51000.0,
+    }
+
+
+def test_binary_journal_round_trip(tmp_path):
+    path = tmp_path / "fills.bin"
+
+    async def run():
+        journal = TradeJournal(
+            str(path), format="binary", flush_size=10, fsync="batch"
+        )
+        await journal.start()
+        for i in range(25):
+            journal.record(fill(i))
+        await journal.close()
+        return journal.events_written
+
+    assert asyncio.run(run()) == 25
+    records = read_binary_journal(str(path))
+    assert len(records) == 25
+    assert records["price"][-1] == 50024.0
+    assert records["trading_pair"][0] == b"BTC/USD"
+
+
+def test_parquet_rejects_fsync(tmp_path):
+    with pytest.raises(ValueError):
+        TradeJournal(
+            str(tmp_path / "fills.parquet"),
+            format="parquet",
+            fsync="batch",
+        )
+
+
+def test_failed_batches_are_retried(tmp_path):
+    path = tmp_path / "fills.bin"
+    journal = TradeJournal(str(path), format="binary")
+    write = journal._write_binary
+
+    def torn_write(batch):
+        # Half a record reaches the file before the disk fills up
+        journal._open("ab").write(b"\0" * 10)
+        raise OSError("No space left on device")
+
+    journal._write_binary = torn_write
+    for i in range(5):
+        journal.record(fill(i))
+    journal.flush()
+    assert journal.events_written == 0 and path.stat().st_size == 0
+
+    journal._write_binary = write
+    journal.record(fill(5))
+    journal.flush()
+    asyncio.run(journal.close())
+    records = read_binary_journal(str(path))
+    assert list(records["price"]) == [50000.0 + i for i in range(6)]
+
+
+def test_close_reports_unwritten_events(tmp_path):
+    journal = TradeJournal(str(tmp_path / "fills.csv"), max_buffer=3)
+
+    def fail(batch):
+        raise OSError("No space left on device")
+
+    journal._write_csv = fail
+    for i in range(5):
+        journal.record(fill(i))
+    journal.flush()
+    assert journal.events_dropped == 2
+    with pytest.raises(JournalWriteError):
+        asyncio.run(journal.close())